@@ -0,0 +1,8 @@
+"""
+Benchmarks
+Synthetic feed generator and micro/macro benchmarks for the digest pipeline.
+
+Run from the project root:
+    python -m benchmarks run --save benchmarks/baselines/local.json
+    python -m benchmarks compare benchmarks/baselines/local.json --threshold 0.2
+"""
@@ -0,0 +1,234 @@
+"""
+Benchmark runner
+
+    python -m benchmarks run [--scales 10,100,1000] [--only parse,clean_html] [--save FILE]
+    python -m benchmarks compare BASELINE [CURRENT] [--threshold 0.2]
+
+`compare` without CURRENT runs the suite first. It exits with status 1 when any
+benchmark's median is slower than the baseline by more than the threshold.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+from datetime import datetime
+
+from benchmarks import feedgen
+
+DEFAULT_SCALES = (10, 100, 1000)
+
+
+def _timeit(func, rounds=5, min_time=0.05):
+    """
+    Median/min seconds per call over `rounds` rounds; short calls are looped until min_time
+    per round. One untimed warm-up call (imports, caches) and the calibration of the loop
+    count don't go into the timings.
+    """
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops)
+    return {'median': statistics.median(timings), 'min': min(timings), 'rounds': rounds, 'loops': loops}
+
+
+def _synthetic_scraper(payloads):
+    """NewsScraper reading pre-generated feeds instead of the network"""
+    from news_scraper import NewsScraper
+    scraper = NewsScraper()
+    scraper.sources = {name: name for name in payloads}
+    scraper.fetch_feed = lambda url, source_name=None, deadline=None: payloads[url]
+    return scraper
+
+
+# Each benchmark takes a scale and returns a zero-argument callable to time
+def bench_parse(scale):
+    scraper = _synthetic_scraper({})
+    content = feedgen.generate_feed(scale, html_complexity=2)
+    return lambda: scraper.parse_feed(content, 'bench')
+
+
+def bench_parse_atom(scale):
+    scraper = _synthetic_scraper({})
+    content = feedgen.generate_feed(scale, html_complexity=2, fmt='atom')
+    return lambda: scraper.parse_feed(content, 'bench')
+
+
+def bench_clean_html(scale):
+    scraper = _synthetic_scraper({})
+    summaries = [e['summary'] for e in feedgen.generate_entries(scale, html_complexity=4)]
+    return lambda: [scraper._clean_html(s) for s in summaries]
+
+
+def bench_scrape_all_sources(scale):
+    # scale = total entries, spread over 10 sources with 20% cross-feed duplicates
+    payloads = feedgen.generate_sources(10, max(1, scale // 10), html_complexity=2, duplicate_rate=0.2)
+    scraper = _synthetic_scraper(payloads)
+    return scraper.scrape_all_sources
+
+
+def bench_dedup(scale):
+    scraper = _synthetic_scraper({})
+    articles = feedgen.generate_articles(scale, duplicate_rate=0.3)
+    return lambda: scraper.deduplicate(articles)
+
+
+def bench_rank_article(scale):
+    from content_processor import ContentProcessor
+    processor = ContentProcessor()
+    articles = feedgen.generate_articles(scale)
+    return lambda: [processor.rank_article(a) for a in articles]
+
+
+def bench_filter_and_rank(scale):
+    from content_processor import ContentProcessor
+    processor = ContentProcessor()
+    articles = feedgen.generate_articles(scale)
+    return lambda: processor.filter_and_rank([dict(a) for a in articles])
+
+
+def _processor():
+    from content_processor import ContentProcessor
+    from summarizer import Summarizer
+    processor = ContentProcessor()
+    processor.summarizer = Summarizer(cache_file=None)  # Don't read or write data/
+    return processor
+
+
+def bench_format_email(scale):
+    processor = _processor()
+    articles = feedgen.generate_articles(scale)
+    return lambda: processor.format_for_email(articles)
+
+
+def bench_format_whatsapp(scale):
+    processor = _processor()
+    articles = feedgen.generate_articles(scale)
+    return lambda: processor.format_for_whatsapp(articles)
+
+
+def bench_summarize(scale):
+    # Uncached: every call scores all sentences of the batch
+    from summarizer import Summarizer
+    summarizer = Summarizer(cache_file=None)
+    scraper = _synthetic_scraper({})
+    texts = [scraper._clean_html(e['summary']) for e in feedgen.generate_entries(scale, html_complexity=4)]
+    return lambda: summarizer._summarize_batch(texts, 200)
+
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'parse_atom': bench_parse_atom,
+    'clean_html': bench_clean_html,
+    'scrape_all_sources': bench_scrape_all_sources,
+    'dedup': bench_dedup,
+    'rank_article': bench_rank_article,
+    'filter_and_rank': bench_filter_and_rank,
+    'format_email': bench_format_email,
+    'format_whatsapp': bench_format_whatsapp,
+    'summarize': bench_summarize,
+}
+
+
+def run_suite(scales=DEFAULT_SCALES, only=None, rounds=5):
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        for scale in scales:
+            key = f'{name}[{scale}]'
+            results[key] = _timeit(factory(scale), rounds=rounds)
+            print(f"{key:<32} median {results[key]['median'] * 1000:10.3f} ms   "
+                  f"min {results[key]['min'] * 1000:10.3f} ms")
+    return {
+        'meta': {
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print a comparison table; returns the list of regressed benchmark keys"""
+    regressions = []
+    print(f"{'Benchmark':<32}{'Baseline ms':>14}{'Current ms':>14}{'Change':>10}")
+    for key, base in baseline['results'].items():
+        now = current['results'].get(key)
+        if now is None:
+            continue
+        change = now['median'] / base['median'] - 1 if base['median'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"{key:<32}{base['median'] * 1000:>14.3f}{now['median'] * 1000:>14.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Digest pipeline benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmark suite')
+    compare_parser = commands.add_parser('compare', help='Compare against a JSON baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current', nargs='?', help='Results file (default: run the suite now)')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='Allowed slowdown of the median, as a fraction (default: 0.2)')
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES))
+        sub.add_argument('--only', help='Comma-separated benchmark names: ' + ', '.join(BENCHMARKS))
+        sub.add_argument('--rounds', type=int, default=5)
+        sub.add_argument('--save', help='Write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    # The scraper logs a line per feed; keep the output readable
+    logging.disable(logging.WARNING)
+
+    scales = [int(s) for s in args.scales.split(',')]
+    only = set(args.only.split(',')) if args.only else None
+
+    if args.command == 'compare' and args.current:
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        current = run_suite(scales, only, args.rounds)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.command == 'compare':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
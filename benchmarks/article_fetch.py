@@ -0,0 +1,161 @@
+"""
+Full-article fetch benchmark
+
+    python -m benchmarks.article_fetch [--hosts 5] [--pages 40] [--latency 0.1] [--per-host 1,2,4]
+
+Serves --pages synthetic article pages (navigation, share buttons, related links
+and a footer around the article body) from --hosts local HTTP servers that each
+answer after --latency seconds, and fetches them all through ArticleFetcher with
+different per-host limits. Reports wall time and the most requests any one host
+saw at once (never above the limit), then fetches again to show that every page
+now comes from the cache. Also reports extraction speed and how much of the
+article body and of the boilerplate ended up in the extracted text.
+"""
+
+import sys
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.feedgen import _sentence
+
+BOILERPLATE = 'Subscribe to our newsletter for the latest updates'
+
+
+def _page(rng, paragraphs=12):
+    """(HTML, the article's paragraphs)"""
+    body = [' '.join(_sentence(rng, 14) for _ in range(3)) for _ in range(paragraphs)]
+    related = ''.join(f'<li><a href="/story/{rng.randint(0, 9999)}">{_sentence(rng, 8)}</a></li>' for _ in range(8))
+    html = (
+        '<!DOCTYPE html><html><head><title>Story</title><style>body { margin: 0 }</style>'
+        '<script>window.analytics = {track: function () {}};</script></head><body>'
+        '<header><a href="/">Home</a> <a href="/tech">Tech</a> <a href="/ai">AI</a></header>'
+        f'<nav><ul>{related}</ul></nav>'
+        '<div class="layout"><article><h1>' + _sentence(rng, 9) + '</h1>'
+        '<div class="byline">By Staff Writer</div>'
+        + ''.join(f'<p>{p} <a href="/ref">source</a></p>' for p in body) +
+        '<div class="share"><button>Share</button> <a href="/tw">Tweet</a></div></article>'
+        f'<div class="sidebar"><h3>Related</h3><ul>{related}</ul><p>{BOILERPLATE} and offers.</p></div></div>'
+        '<footer><p>Copyright 2024 Example Media. All rights reserved. Privacy policy, terms of use.</p></footer>'
+        '</body></html>'
+    )
+    return html, body
+
+
+class _Host:
+    """A local HTTP server that answers every request after a delay and tracks concurrent requests"""
+
+    def __init__(self, pages, latency):
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with host.lock:
+                    host.active += 1
+                    host.requests += 1
+                    host.peak = max(host.peak, host.active)
+                try:
+                    time.sleep(latency)
+                    body = pages.get(self.path.split('?')[0], '').encode('utf-8')
+                    self.send_response(200 if body else 404)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with host.lock:
+                        host.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset(self):
+        self.peak = self.requests = 0
+
+
+def run(num_hosts, num_pages, latency, per_host_limits):
+    from article_fetcher import ArticleFetcher, extract_text
+
+    rng = random.Random(7)
+    pages = [_page(rng) for _ in range(num_pages)]
+    by_host = [{} for _ in range(num_hosts)]
+    for i, (html, _) in enumerate(pages):
+        by_host[i % num_hosts][f'/story/{i}'] = html
+    hosts = [_Host(host_pages, latency) for host_pages in by_host]
+    # Tracking parameters vary per link but not the canonical URL: each page is still fetched once
+    urls = [f'http://127.0.0.1:{hosts[i % num_hosts].port}/story/{i}?utm_source=feed{j}'
+            for j in range(2) for i in range(num_pages)]
+
+    results = []
+    for per_host in per_host_limits:
+        cache_dir = tempfile.mkdtemp(prefix='article-fetch-bench-')
+        try:
+            fetcher = ArticleFetcher(cache_dir=cache_dir, per_host=per_host, max_workers=8)
+            for host in hosts:
+                host.reset()
+            started = time.perf_counter()
+            cold = fetcher.fetch_texts(urls)
+            cold_seconds = time.perf_counter() - started
+            peak = max(host.peak for host in hosts)
+            requests = sum(host.requests for host in hosts)
+            started = time.perf_counter()
+            warm = fetcher.fetch_texts(urls)
+            warm_seconds = time.perf_counter() - started
+            results.append({'per_host': per_host, 'cold': cold_seconds, 'warm': warm_seconds, 'peak': peak,
+                            'requests': requests, 'warm_requests': sum(host.requests for host in hosts) - requests,
+                            'complete': all(cold) and warm == cold})
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    for host in hosts:
+        host.server.shutdown()
+        host.server.server_close()
+
+    started = time.perf_counter()
+    texts = [extract_text(html) for html, _ in pages]
+    extract_seconds = (time.perf_counter() - started) / len(pages)
+    body_kept = sum(sum(p in text for p in body) / len(body) for text, (_, body) in zip(texts, pages)) / len(pages)
+    boilerplate = sum(BOILERPLATE in text or 'Copyright' in text for text in texts) / len(pages)
+    page_bytes = sum(len(html) for html, _ in pages) / len(pages)
+    return results, (extract_seconds, body_kept, boilerplate, page_bytes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.article_fetch', description=__doc__.split('\n\n')[2])
+    parser.add_argument('--hosts', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=40, help='Pages, spread evenly over the hosts')
+    parser.add_argument('--latency', type=float, default=0.1, help='Seconds each response takes')
+    parser.add_argument('--per-host', default='1,2,4', help='Comma-separated per-host concurrency limits')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    limits = [int(n) for n in args.per_host.split(',')]
+    results, (extract_seconds, body_kept, boilerplate, page_bytes) = run(args.hosts, args.pages, args.latency, limits)
+
+    print(f"{args.pages} pages on {args.hosts} hosts, {args.latency * 1000:.0f} ms per response, 8 workers; "
+          f"each page linked twice with different tracking parameters\n")
+    print(f"{'Per host':>9}{'Cold (s)':>10}{'Requests':>10}{'Peak/host':>11}{'Cached (ms)':>13}{'Requests':>10}  Output")
+    for r in results:
+        print(f"{r['per_host']:>9}{r['cold']:>10.2f}{r['requests']:>10}{r['peak']:>11}{r['warm'] * 1000:>13.1f}"
+              f"{r['warm_requests']:>10}  {'complete' if r['complete'] else 'INCOMPLETE'}")
+    print(f"\nExtraction: {extract_seconds * 1000:.2f} ms per {page_bytes / 1024:.0f} KB page, "
+          f"{body_kept:.0%} of article paragraphs kept, boilerplate in {boilerplate:.0%} of pages")
+    ok = all(r['complete'] and r['peak'] <= r['per_host'] and r['warm_requests'] == 0 for r in results)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
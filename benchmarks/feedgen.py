@@ -0,0 +1,118 @@
+"""
+Synthetic Feed Generator
+Builds RSS 2.0 / Atom feeds of configurable size, HTML complexity and duplicate rate
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+WORDS = (
+    'openai anthropic deepmind nvidia meta google microsoft model launch release research '
+    'study robotics autonomous quantum transformer neural network training inference chip '
+    'startup funding billion data center energy policy regulation benchmark agent reasoning '
+    'open source gpu cloud safety alignment vision language speech dataset paper lab team '
+    'announces unveils raises ships delays tests builds partners acquires expands warns'
+).split()
+
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _html_summary(rng, complexity):
+    """Summary HTML; complexity 0 is plain text, higher adds paragraphs, nesting, links and entities"""
+    if complexity <= 0:
+        return _sentence(rng)
+    parts = []
+    for i in range(complexity):
+        sentence = escape(_sentence(rng))
+        inner = f'<a href="https://example.com/{rng.randint(0, 99999)}" rel="nofollow">{sentence}</a>'
+        for depth in range(min(i, 4)):
+            inner = f'<span class="c{depth}" style="color:#333">{inner}</span>'
+        parts.append(f'<p>{inner} &amp; more&nbsp;&mdash; {escape(_sentence(rng, 6))}</p>')
+    if complexity >= 3:
+        parts.append('<ul>' + ''.join(f'<li>{escape(_sentence(rng, 5))}</li>' for _ in range(complexity)) + '</ul>')
+        parts.append('<img src="https://example.com/img.png" alt="figure"/><script>var x = 1;</script>')
+    return ''.join(parts)
+
+
+def generate_entries(count, html_complexity=1, duplicate_rate=0.0, seed=0, title_pool=None):
+    """
+    Entry dicts (title, link, summary, published). A duplicate_rate share of the
+    titles repeat a title from title_pool (or an earlier entry), differing only in case.
+    """
+    rng = random.Random(seed)
+    now = datetime(2025, 11, 3, 9, 0, tzinfo=timezone.utc)
+    pool = list(title_pool) if title_pool else []
+    entries = []
+    for i in range(count):
+        if pool and rng.random() < duplicate_rate:
+            title = rng.choice(pool)
+            title = title.upper() if rng.random() < 0.5 else title
+        else:
+            title = _sentence(rng, 8).rstrip('.') + f' {seed}-{i}'
+            pool.append(title)
+        entries.append({
+            'title': title,
+            'link': f'https://example.com/{seed}/{i}',
+            'summary': _html_summary(rng, html_complexity),
+            'published': now - timedelta(minutes=7 * i),
+        })
+    return entries
+
+
+def render_rss(entries, title='Synthetic feed'):
+    items = ''.join(
+        f"<item><title>{escape(e['title'])}</title><link>{escape(e['link'])}</link>"
+        f"<guid>{escape(e['link'])}</guid><pubDate>{format_datetime(e['published'])}</pubDate>"
+        f"<description>{escape(e['summary'])}</description></item>"
+        for e in entries
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f'<title>{escape(title)}</title><link>https://example.com/</link>'
+            f'<description>Benchmark feed</description>{items}</channel></rss>').encode('utf-8')
+
+
+def render_atom(entries, title='Synthetic feed'):
+    items = ''.join(
+        f"<entry><title>{escape(e['title'])}</title><link href=\"{escape(e['link'])}\"/>"
+        f"<id>{escape(e['link'])}</id><updated>{e['published'].isoformat()}</updated>"
+        f"<summary type=\"html\">{escape(e['summary'])}</summary></entry>"
+        for e in entries
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>{escape(title)}</title><id>urn:bench</id>'
+            f'<updated>2025-11-03T09:00:00+00:00</updated>{items}</feed>').encode('utf-8')
+
+
+def generate_feed(count, html_complexity=1, duplicate_rate=0.0, fmt='rss', seed=0, title_pool=None):
+    """Feed bytes in 'rss' or 'atom' format"""
+    entries = generate_entries(count, html_complexity, duplicate_rate, seed, title_pool)
+    return render_rss(entries) if fmt == 'rss' else render_atom(entries)
+
+
+def generate_sources(num_sources, entries_per_source, html_complexity=1, duplicate_rate=0.1, seed=0):
+    """{source_name: feed bytes}; duplicates are drawn across all sources, like syndicated stories"""
+    pool = []
+    sources = {}
+    for i in range(num_sources):
+        entries = generate_entries(entries_per_source, html_complexity, duplicate_rate, seed + i, pool)
+        pool.extend(e['title'] for e in entries)
+        fmt = 'rss' if i % 2 == 0 else 'atom'
+        sources[f'source_{i}'] = render_rss(entries) if fmt == 'rss' else render_atom(entries)
+    return sources
+
+
+def generate_articles(count, html_complexity=0, duplicate_rate=0.0, seed=0):
+    """Article dicts as produced by NewsScraper (clean summary), for ranking/formatting benchmarks"""
+    rng = random.Random(seed)
+    return [{
+        'title': e['title'],
+        'link': e['link'],
+        'summary': e['summary'][:300],
+        'published': e['published'].strftime('%Y-%m-%d %H:%M'),
+        'source': f'source_{rng.randint(0, 9)}',
+    } for e in generate_entries(count, html_complexity, duplicate_rate, seed)]
@@ -0,0 +1,146 @@
+"""
+Article history benchmark: daily JSON dumps vs the partitioned Parquet export
+
+    python -m benchmarks.history_export [--days 365] [--per-day 600] [--sources 20]
+
+Builds a year of synthetic scored articles, writes them both as one
+articles.json-style dump per day and through ParquetExporter (one export per
+day), then times the same queries against each: a full scan, a per-source
+score aggregate, and a filtered lookup (one source, last 30 days, score >= 5).
+The JSON reader gets to skip dump files by their date, as a script would.
+Needs pyarrow.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks import feedgen
+
+
+def _articles(days, per_day, num_sources):
+    """{day: [scored article dicts]} for days ending 2025-11-03"""
+    from content_processor import ContentProcessor
+    processor = ContentProcessor()
+    rng = random.Random(0)
+    last = datetime(2025, 11, 3)
+    history = {}
+    for offset in range(days):
+        day = last - timedelta(days=days - 1 - offset)
+        articles = feedgen.generate_articles(per_day, seed=offset)
+        for article in articles:
+            article['source'] = f'source_{rng.randrange(num_sources)}'
+            article['published'] = (day + timedelta(minutes=rng.randrange(24 * 60))).strftime('%Y-%m-%d %H:%M')
+            article['score'] = processor.rank_article(article)
+        history[day.strftime('%Y-%m-%d')] = articles
+    return history
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _timed(func, rounds=3):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def _json_rows(json_dir, since=None):
+    for name in sorted(os.listdir(json_dir)):
+        if since and name[:10] < since:
+            continue
+        with open(os.path.join(json_dir, name), 'r', encoding='utf-8') as f:
+            yield from json.load(f)['articles']
+
+
+def run(days, per_day, num_sources):
+    from parquet_export import ParquetExporter, read_history
+
+    history = _articles(days, per_day, num_sources)
+    workdir = tempfile.mkdtemp(prefix='history-bench-')
+    json_dir = os.path.join(workdir, 'json')
+    parquet_dir = os.path.join(workdir, 'parquet')
+    os.makedirs(json_dir)
+    try:
+        started = time.perf_counter()
+        for day, articles in history.items():
+            with open(os.path.join(json_dir, f'{day}-articles.json'), 'w', encoding='utf-8') as f:
+                json.dump({'date': f'{day} 09:00', 'articles': articles, 'count': len(articles)},
+                          f, indent=2, ensure_ascii=False)
+        json_write = time.perf_counter() - started
+
+        exporter = ParquetExporter(parquet_dir)
+        started = time.perf_counter()
+        for day, articles in history.items():
+            exporter.export(articles, day.replace('-', ''), run_date=day)
+        parquet_write = time.perf_counter() - started
+
+        since = sorted(history)[-30]
+        source = 'source_3'
+
+        def json_aggregate():
+            totals = {}
+            for article in _json_rows(json_dir):
+                count, total = totals.get(article['source'], (0, 0))
+                totals[article['source']] = (count + 1, total + article['score'])
+            return len(totals)
+
+        def parquet_aggregate():
+            table = read_history(parquet_dir, columns=['source', 'score'])
+            return table.group_by('source').aggregate([('score', 'mean')]).num_rows
+
+        queries = [
+            ('Full scan', lambda: sum(1 for _ in _json_rows(json_dir)),
+             lambda: read_history(parquet_dir).num_rows),
+            ('Mean score by source', json_aggregate, parquet_aggregate),
+            ('1 source, 30 days, score>=5',
+             lambda: sum(1 for a in _json_rows(json_dir, since) if a['source'] == source and a['score'] >= 5),
+             lambda: read_history(parquet_dir, columns=['title', 'link', 'score'], sources=[source],
+                                  since=since, min_score=5).num_rows),
+        ]
+        results = []
+        for name, json_query, parquet_query in queries:
+            json_seconds, json_result = _timed(json_query)
+            parquet_seconds, parquet_result = _timed(parquet_query)
+            results.append((name, json_seconds, parquet_seconds, json_result == parquet_result))
+
+        sizes = (_dir_size(json_dir), _dir_size(parquet_dir))
+        return sum(len(a) for a in history.values()), (json_write, parquet_write), sizes, results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.history_export',
+                                     description=__doc__.split('\n\n')[2])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--per-day', type=int, default=600, help='Articles per daily run')
+    parser.add_argument('--sources', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    rows, (json_write, parquet_write), (json_size, parquet_size), results = run(args.days, args.per_day, args.sources)
+
+    print(f"{rows} articles over {args.days} days from {args.sources} sources\n")
+    print(f"{'':<30}{'JSON':>12}{'Parquet':>12}")
+    print(f"{'Size on disk (MB)':<30}{json_size / 1e6:>12.1f}{parquet_size / 1e6:>12.1f}")
+    print(f"{'Write, all days (s)':<30}{json_write:>12.2f}{parquet_write:>12.2f}")
+    for name, json_seconds, parquet_seconds, matches in results:
+        print(f"{name + ' (s)':<30}{json_seconds:>12.3f}{parquet_seconds:>12.3f}  "
+              f"{json_seconds / parquet_seconds:.1f}x{'' if matches else '  MISMATCH'}")
+    return 0 if all(matches for *_, matches in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Parse/clean process-pool scaling benchmark
+
+    python -m benchmarks.parse_offload [--sources 1000] [--workers 1,2,4,8,16] [--html 3]
+
+Runs the streaming pipeline over pre-generated feeds (fetching is instant, so the
+run is bound by feed parsing and HTML cleaning) once with parse and clean in
+threads, then with them offloaded to 1..N worker processes (PARSE_WORKERS).
+Reports wall time, articles per second and speedup over the threaded run, and
+checks that every run returns the same articles. Also shows the pickled size of
+the rows a worker sends back per article, as tuples versus article dicts.
+Speedup is capped by the machine's core count, printed in the header.
+"""
+
+import os
+import sys
+import time
+import pickle
+import logging
+import argparse
+
+from benchmarks import feedgen
+
+
+def _pipeline(payloads, parse_workers):
+    from news_scraper import NewsScraper
+    from content_processor import ContentProcessor
+    from pipeline import StreamingPipeline
+    scraper = NewsScraper()
+    scraper.sources = {name: name for name in payloads}
+    scraper.fetch_feed = lambda url, source_name=None, deadline=None: payloads[url]
+    return StreamingPipeline(scraper, ContentProcessor(), parse_workers=parse_workers)
+
+
+def _row_sizes(payloads):
+    """Pickled bytes per article returned by a worker: compact tuples vs dicts"""
+    from news_scraper import parse_batch
+    results = parse_batch(list(payloads.items())[:50])
+    rows = [row for _, feed_rows, *_ in results for row in feed_rows]
+    dicts = [{'title': t, 'link': l, 'summary': s, 'published': p, 'source': source}
+             for source, feed_rows, *_ in results for t, l, s, p in feed_rows]
+    return len(pickle.dumps(rows)) / len(rows), len(pickle.dumps(dicts)) / len(dicts)
+
+
+def _timed_run(pipeline):
+    started = time.perf_counter()
+    articles, _ = pipeline.run(deadline_seconds=3600)
+    return time.perf_counter() - started, sorted((a['link'], a['summary']) for a in articles)
+
+
+def run(num_sources, worker_counts, html_complexity):
+    payloads = feedgen.generate_sources(num_sources, 10, html_complexity=html_complexity, duplicate_rate=0.0)
+
+    baseline, expected = _timed_run(_pipeline(payloads, 0))
+    results = [(0, baseline, len(expected), True)]
+    for workers in worker_counts:
+        pipeline = _pipeline(payloads, workers)
+        try:
+            pipeline.run(sources=dict(list(pipeline.scraper.sources.items())[:workers]))  # Start the processes
+            elapsed, articles = _timed_run(pipeline)
+        finally:
+            pipeline.close()
+        results.append((workers, elapsed, len(articles), articles == expected))
+    return results, _row_sizes(payloads)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.parse_offload', description=__doc__.split('\n\n')[2])
+    parser.add_argument('--sources', type=int, default=1000, help='Feeds of 10 entries each')
+    parser.add_argument('--workers', default='1,2,4,8,16', help='Comma-separated worker process counts')
+    parser.add_argument('--html', type=int, default=3, help='HTML complexity of the summaries (0-5)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    results, (tuple_bytes, dict_bytes) = run(args.sources, [int(w) for w in args.workers.split(',')], args.html)
+
+    baseline = results[0][1]
+    print(f"{args.sources} feeds, {results[0][2]} articles, {os.cpu_count()} CPU core(s)")
+    print(f"Returned per article: {tuple_bytes:.0f} bytes pickled as tuples, {dict_bytes:.0f} as dicts\n")
+    print(f"{'Workers':>8}{'Wall (s)':>10}{'Articles/s':>12}{'Speedup':>10}  Output")
+    for workers, elapsed, count, matches in results:
+        label = 'threads' if workers == 0 else workers
+        print(f"{label:>8}{elapsed:>10.2f}{count / elapsed:>12.0f}{baseline / elapsed:>9.2f}x  "
+              f"{'matches threads' if matches else 'MISMATCH'}")
+    return 0 if all(matches for *_, matches in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
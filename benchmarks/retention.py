@@ -0,0 +1,103 @@
+"""
+History retention benchmark
+
+    python -m benchmarks.retention [--days 730] [--per-day 300] [--hot-days 90] [--warm-days 365]
+
+Exports --days of synthetic scored articles through ParquetExporter (one export
+per day), then runs one RetentionManager job: months older than --hot-days move
+to the warm tier (metadata plus summary hash, one segment per month) and months
+older than --warm-days are dropped. Reports the size of each tier and the time of
+typical queries before and after the job, and how long the job itself took.
+Needs pyarrow.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+
+from benchmarks.history_export import _articles, _dir_size, _timed
+
+
+def run(days, per_day, num_sources, hot_days, warm_days):
+    from parquet_export import ParquetExporter, read_history
+    from retention import RetentionManager, read_warm
+
+    history = _articles(days, per_day, num_sources)
+    last_day = max(history)
+    now = datetime.strptime(last_day, '%Y-%m-%d')
+    workdir = tempfile.mkdtemp(prefix='retention-bench-')
+    hot_root = os.path.join(workdir, 'history')
+    warm_root = os.path.join(workdir, 'history_warm')
+    try:
+        exporter = ParquetExporter(hot_root)
+        for day, articles in history.items():
+            exporter.export(articles, day.replace('-', ''), run_date=day)
+
+        since = sorted(history)[-30]
+        queries = [
+            ('Hot: full scan', lambda: read_history(hot_root, columns=['source', 'score']).num_rows),
+            ('Hot: last 30 days', lambda: read_history(hot_root, columns=['title', 'score'], since=since).num_rows),
+            ('Hot: 1 source, score>=5', lambda: read_history(hot_root, columns=['title', 'link'],
+                                                             sources=['source_3'], min_score=5).num_rows),
+        ]
+        before = {name: _timed(query) for name, query in queries}
+        sizes_before = (_dir_size(hot_root), 0)
+
+        manager = RetentionManager(exporter, warm_root=warm_root, hot_days=hot_days, warm_days=warm_days,
+                                   report_file=None)
+        started = time.perf_counter()
+        report = manager.run(now)
+        job_seconds = time.perf_counter() - started
+
+        after = {name: _timed(query) for name, query in queries}
+        sizes_after = (_dir_size(hot_root), _dir_size(warm_root))
+        warm_seconds, warm_rows = _timed(lambda: read_warm(warm_root, columns=['title', 'summary_hash'],
+                                                           sources=['source_3']).num_rows)
+        return {
+            'rows': sum(len(a) for a in history.values()),
+            'sizes': (sizes_before, sizes_after),
+            'queries': [(name, before[name], after[name]) for name, _ in queries],
+            'warm_query': (warm_seconds, warm_rows),
+            'job_seconds': job_seconds,
+            'report': report,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.retention', description=__doc__.split('\n\n')[2])
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--per-day', type=int, default=300, help='Articles per daily run')
+    parser.add_argument('--sources', type=int, default=20)
+    parser.add_argument('--hot-days', type=int, default=90)
+    parser.add_argument('--warm-days', type=int, default=365)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    result = run(args.days, args.per_day, args.sources, args.hot_days, args.warm_days)
+    report = result['report']
+    (hot_before, _), (hot_after, warm_after) = result['sizes']
+
+    print(f"{result['rows']} articles over {args.days} days; tiers: hot {args.hot_days} days, "
+          f"warm to {args.warm_days} days\n")
+    print(f"Retention job: {result['job_seconds']:.2f}s, {len(report['demoted_months'])} months "
+          f"({report['rows_demoted']} articles) to warm, {len(report['dropped_months'])} months dropped\n")
+    print(f"{'':<28}{'Before':>12}{'After':>12}")
+    print(f"{'Hot tier (MB)':<28}{hot_before / 1e6:>12.1f}{hot_after / 1e6:>12.1f}")
+    print(f"{'Warm tier (MB)':<28}{0:>12.1f}{warm_after / 1e6:>12.1f}")
+    for name, (before_seconds, before_rows), (after_seconds, after_rows) in result['queries']:
+        print(f"{name + ' (ms)':<28}{before_seconds * 1000:>12.1f}{after_seconds * 1000:>12.1f}  "
+              f"{before_rows} -> {after_rows} rows")
+    warm_seconds, warm_rows = result['warm_query']
+    print(f"{'Warm: 1 source (ms)':<28}{'':>12}{warm_seconds * 1000:>12.1f}  {warm_rows} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Digest API load test
+
+    python -m benchmarks.server_load [--articles 5000] [--clients 4] [--duration 5]
+
+Starts the `--serve` HTTP server in its own process pinned to one CPU core (where the
+OS supports it) over a synthetic run of --articles articles, then drives it from
+--clients keep-alive client processes for --duration seconds per scenario. Reports
+requests per second and latency percentiles for each endpoint.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+import http.client
+import multiprocessing
+
+from benchmarks import feedgen
+
+SCENARIOS = [
+    ('digest (gzip)', '/digest', {'Accept-Encoding': 'gzip'}),
+    ('digest (304)', '/digest', {'If-None-Match': None}),
+    ('email html', '/digest/email', {'Accept-Encoding': 'gzip'}),
+    ('articles by keyword', '/articles?q=openai&limit=20', {'Accept-Encoding': 'gzip'}),
+    ('articles by source+date', '/articles?source=source_3&since=2025-11-01&limit=20', {'Accept-Encoding': 'gzip'}),
+    ('articles, all filters', '/articles?source=source_1&q=model+launch&since=2025-10-01', {'Accept-Encoding': 'gzip'}),
+]
+
+
+def _write_run(base_dir, num_articles):
+    """A completed checkpointed run with synthetic articles, ranking and rendered digest"""
+    from checkpoint import CheckpointStore
+    from content_processor import ContentProcessor
+
+    store = CheckpointStore(base_dir)
+    processor = ContentProcessor()
+    articles = feedgen.generate_articles(num_articles)
+    ranked = processor.filter_and_rank([dict(a) for a in articles], max_articles=10)
+    rendered = {
+        'whatsapp_message': processor.format_for_whatsapp(ranked),
+        'email_html': processor.format_for_email(ranked),
+        'email_subject': 'Benchmark digest',
+    }
+    run_id = '20251103-090000'
+    store.save(run_id, 'scrape', articles, 'bench')
+    store.save(run_id, 'rank', ranked, 'bench')
+    store.save(run_id, 'render', rendered, 'bench')
+
+
+def _serve(base_dir, port, ready):
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    from checkpoint import CheckpointStore
+    from server import DigestServer, DigestStore
+
+    server = DigestServer(DigestStore(CheckpointStore(base_dir)), port=port, reload_interval=3600)
+    server.start()
+    ready.put(server.port)
+    server.stopped.wait()
+
+
+def _client(port, path, headers, duration, results):
+    if hasattr(os, 'sched_setaffinity') and len(os.sched_getaffinity(0)) > 1:
+        # Keep clients off the server's core
+        os.sched_setaffinity(0, os.sched_getaffinity(0) - {min(os.sched_getaffinity(0))})
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while True:
+        started = time.perf_counter()
+        if started > deadline:
+            break
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    results.put(latencies)
+
+
+def _etag(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.getheader('ETag')
+
+
+def run(num_articles, clients, duration):
+    workdir = tempfile.mkdtemp(prefix='serve-bench-')
+    ready = multiprocessing.Queue()
+    server_process = None
+    try:
+        _write_run(workdir, num_articles)
+        server_process = multiprocessing.Process(target=_serve, args=(workdir, 0, ready), daemon=True)
+        server_process.start()
+        port = ready.get(timeout=30)
+
+        rows = []
+        for name, path, headers in SCENARIOS:
+            headers = {k: (v if v is not None else _etag(port, path)) for k, v in headers.items()}
+            _etag(port, path)  # Warm the response cache
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=_client, args=(port, path, headers, duration, results))
+                         for _ in range(clients)]
+            for process in processes:
+                process.start()
+            latencies = []
+            for _ in processes:
+                latencies.extend(results.get())
+            for process in processes:
+                process.join()
+            latencies.sort()
+            rows.append((name, len(latencies) / duration, statistics.median(latencies),
+                         latencies[int(len(latencies) * 0.99) - 1]))
+        return rows
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.server_load', description=__doc__.split('\n\n')[2])
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per scenario')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    rows = run(args.articles, args.clients, args.duration)
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"{args.articles} articles, {args.clients} keep-alive clients, server pinned to 1 core "
+          f"({cores} available{'; clients share it' if cores == 1 else ''})\n")
+    print(f"{'Scenario':<26}{'Req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, rps, p50, p99 in rows:
+        print(f"{name:<26}{rps:>10.0f}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Sharded scrape scaling benchmark
+
+    python -m benchmarks.sharding [--sources 48] [--latency 0.25] [--workers 1,2,4,8]
+
+Scrapes synthetic feeds through the lease queue with 1..N local worker processes.
+Each fetch sleeps for --latency seconds to stand in for network time, so a
+perfectly sharded run takes sources * latency / workers. Reports wall time,
+speedup and parallel efficiency per worker count, and checks that every run
+returns the same merged, deduplicated article set as a serial scrape.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from functools import partial
+
+from benchmarks import feedgen
+
+
+def _simulated_scraper(num_sources, latency):
+    """NewsScraper over generated feeds with a fixed per-fetch delay (rebuilt identically in each worker)"""
+    from news_scraper import NewsScraper
+    payloads = feedgen.generate_sources(num_sources, 10, html_complexity=2, duplicate_rate=0.2)
+    scraper = NewsScraper()
+    scraper.sources = {name: name for name in payloads}
+
+    def fetch_feed(url, source_name=None, deadline=None):
+        time.sleep(latency)
+        return payloads[url]
+
+    scraper.fetch_feed = fetch_feed
+    return scraper
+
+
+def _worker(num_sources, latency, queue_path, run_id):
+    from work_queue import run_worker
+    logging.disable(logging.WARNING)
+    run_worker(queue_path, run_id, scraper=_simulated_scraper(num_sources, latency))
+
+
+def run(num_sources, latency, worker_counts):
+    from work_queue import ShardCoordinator
+
+    serial = _simulated_scraper(num_sources, 0)
+    expected = [a['link'] for a in serial.scrape_all_sources()]
+
+    workdir = tempfile.mkdtemp(prefix='shard-bench-')
+    results = []
+    try:
+        for workers in worker_counts:
+            coordinator = ShardCoordinator(_simulated_scraper(num_sources, latency),
+                                           os.path.join(workdir, f'queue-{workers}.db'), workers=workers)
+            started = time.perf_counter()
+            articles = coordinator.scrape(f'bench-{workers}',
+                                          worker_target=partial(_worker, num_sources, latency))
+            elapsed = time.perf_counter() - started
+            results.append((workers, elapsed, [a['link'] for a in articles] == expected))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.sharding', description=__doc__.split('\n\n')[2])
+    parser.add_argument('--sources', type=int, default=48)
+    parser.add_argument('--latency', type=float, default=0.25, help='Simulated seconds per feed fetch')
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker process counts')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    worker_counts = [int(w) for w in args.workers.split(',')]
+    results = run(args.sources, args.latency, worker_counts)
+
+    ideal = args.sources * args.latency
+    base = results[0][1] * results[0][0]
+    print(f"{args.sources} sources x {args.latency:.2f}s simulated fetch latency (serial ideal {ideal:.1f}s)\n")
+    print(f"{'Workers':>8}{'Wall (s)':>10}{'Speedup':>10}{'Efficiency':>12}  Output")
+    for workers, elapsed, matches in results:
+        speedup = base / elapsed
+        print(f"{workers:>8}{elapsed:>10.2f}{speedup:>9.2f}x{speedup / workers:>12.0%}  "
+              f"{'matches serial' if matches else 'MISMATCH'}")
+    return 0 if all(matches for _, _, matches in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Startup benchmark
+
+    python -m benchmarks.startup [--budget-ms 100] [--runs 5] [--args "--help"]
+
+Runs `python -X importtime main.py ARGS` several times and reports the import time
+spent on the application's own imports (interpreter startup modules are excluded),
+the slowest imports, and total process wall time. Exits with status 1 if the
+median import time exceeds the budget.
+"""
+
+import os
+import re
+import sys
+import shlex
+import argparse
+import statistics
+import subprocess
+import time
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _importtime(command):
+    """Run a command under -X importtime; returns (entries, wall seconds)"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command, cwd=PROJECT_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - started
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({'name': name, 'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                            'top_level': len(indent) == 1})
+    return entries, wall
+
+
+def measure(args, runs):
+    # Modules the bare interpreter imports anyway aren't the app's cost
+    startup_entries, _ = _importtime(['-c', 'pass'])
+    interpreter_modules = {e['name'] for e in startup_entries}
+
+    totals, walls, last = [], [], []
+    for _ in range(runs):
+        entries, wall = _importtime(['main.py'] + args)
+        app = [e for e in entries if e['name'] not in interpreter_modules]
+        totals.append(sum(e['cumulative_us'] for e in app if e['top_level']) / 1000)
+        walls.append(wall * 1000)
+        last = app
+    return statistics.median(totals), statistics.median(walls), last
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__.split('\n\n')[1])
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='Import time budget (default: 100 ms)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--args', default='--help', help='Arguments passed to main.py (default: --help)')
+    parser.add_argument('--top', type=int, default=10, help='How many of the slowest imports to list')
+    args = parser.parse_args(argv)
+
+    import_ms, wall_ms, entries = measure(shlex.split(args.args), args.runs)
+
+    print(f"main.py {args.args}: app imports {import_ms:.1f} ms (median of {args.runs}), "
+          f"process wall time {wall_ms:.1f} ms")
+    print(f"\nSlowest imports (cumulative):")
+    for entry in sorted(entries, key=lambda e: e['cumulative_us'], reverse=True)[:args.top]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['name']}")
+
+    if import_ms > args.budget_ms:
+        print(f"\nOver budget: {import_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    print(f"\nWithin budget ({args.budget_ms:.0f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
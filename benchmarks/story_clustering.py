@@ -0,0 +1,104 @@
+"""
+Story clustering scaling benchmark
+
+    python -m benchmarks.story_clustering [--threads 1000,10000,50000] [--queries 500]
+
+Fills a StoryClusterer with N synthetic story threads, then assigns --queries new
+articles: half are follow-ups to random existing stories, half start new ones.
+Reports the time per assignment and the centroids compared per article through
+the index, next to a brute-force scan over every thread; how often the index
+finds the same nearest thread as the brute-force scan; and how many follow-ups
+joined the right thread (similarity above the threshold). Titles mix a few
+story-specific names from a large vocabulary with common words, like headlines.
+"""
+
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+COMMON = ('launches announces raises new model update deal report says plans ai chip data cloud '
+          'security startup funding billion users app open source research lab team ceo market').split()
+
+
+def _title(rng, names):
+    words = list(names) + rng.sample(COMMON, 4)
+    rng.shuffle(words)
+    return ' '.join(words)
+
+
+def _story_names(rng, vocabulary):
+    return [f'{rng.choice("bcdfgklmnprstvz")}{rng.randrange(vocabulary)}x' for _ in range(3)]
+
+
+def run(thread_counts, queries, vocabulary=200000):
+    from clustering import StoryClusterer, _cosine
+
+    results = []
+    for count in thread_counts:
+        rng = random.Random(count)
+        clusterer = StoryClusterer(max_threads=count * 2, state_file=tempfile.mktemp(suffix='.json'))
+        day = datetime(2025, 11, 1)
+        stories = []
+        seed_articles = []
+        for i in range(count):
+            names = _story_names(rng, vocabulary)
+            stories.append(names)
+            seed_articles.append({'title': _title(rng, names), 'summary': '', 'link': f'seed/{i}',
+                                  'source': 'bench', 'published': '2025-11-01 09:00'})
+        clusterer.assign(seed_articles, now=day)
+        thread_of = {i: seed_articles[i]['story']['id'] for i in range(count)}
+
+        batch = []
+        expected = {}
+        for q in range(queries):
+            if q % 2 == 0:
+                story = rng.randrange(count)
+                names = stories[story][:2] + [rng.choice(stories[story])]
+                expected[f'query/{q}'] = thread_of[story]
+            else:
+                names = _story_names(rng, vocabulary)
+            batch.append({'title': _title(rng, names), 'summary': '', 'link': f'query/{q}',
+                          'source': 'bench', 'published': '2025-11-02 09:00'})
+
+        # Brute force over every centroid, for reference (timed on a sample of follow-ups)
+        sample = [clusterer.vectorize(a) for a in batch[:100:2]]
+        started = time.perf_counter()
+        exact = [max(clusterer.threads, key=lambda tid: _cosine(vector, clusterer.threads[tid]['centroid']))
+                 for vector in sample]
+        brute = (time.perf_counter() - started) / len(sample)
+        recall = sum(clusterer.nearest(vector)[0] == best for vector, best in zip(sample, exact)) / len(sample)
+
+        clusterer.candidates_checked = 0
+        started = time.perf_counter()
+        clusterer.assign(batch, now=day + timedelta(days=1))
+        indexed = (time.perf_counter() - started) / queries
+
+        joined = sum(1 for a in batch if expected.get(a['link']) == a['story']['id'])
+        results.append((count, indexed, clusterer.candidates_checked / queries, brute, recall,
+                        joined / len(expected)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.story_clustering',
+                                     description=__doc__.split('\n\n')[2])
+    parser.add_argument('--threads', default='1000,10000,50000', help='Comma-separated stored thread counts')
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    results = run([int(n) for n in args.threads.split(',')], args.queries)
+
+    print(f"{'Threads':>8}{'Indexed (us)':>14}{'Compared':>10}{'Brute force (us)':>18}{'Index recall':>14}"
+          f"{'Follow-ups joined':>19}")
+    for count, indexed, compared, brute, recall, joined in results:
+        print(f"{count:>8}{indexed * 1e6:>14.0f}{compared:>10.1f}{brute * 1e6:>18.0f}{recall:>14.0%}{joined:>19.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Checkpoint Module
+Saves each stage's output of a digest run so a failed run can be resumed
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Stages of a daily run, in order
+STAGES = ['scrape', 'rank', 'render', 'notify']
+
+
+class CheckpointStore:
+    def __init__(self, base_dir='data/runs'):
+        self.base_dir = base_dir
+
+    @staticmethod
+    def new_run_id():
+        # Microseconds: runs started in the same second (parallel scheduled runs, editions alongside
+        # a daily run) must not share a checkpoint directory. IDs still sort by start time.
+        return datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+    @staticmethod
+    def content_hash(data):
+        """Stable hash of any JSON-serializable value"""
+        encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def run_dir(self, run_id):
+        return os.path.join(self.base_dir, run_id)
+
+    def _write_json(self, path, data):
+        """Write atomically so a crash never leaves a half-written checkpoint"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load_manifest(self, run_id):
+        path = os.path.join(self.run_dir(run_id), 'manifest.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'run_id': run_id, 'stages': {}}
+
+    def save(self, run_id, stage, output, input_hash):
+        """Store a stage's output together with the hash of its input"""
+        output_hash = self.content_hash(output)
+        self._write_json(os.path.join(self.run_dir(run_id), f'{stage}.json'), output)
+
+        manifest = self.load_manifest(run_id)
+        manifest['stages'][stage] = {
+            'input_hash': input_hash,
+            'output_hash': output_hash,
+            'completed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self._write_json(os.path.join(self.run_dir(run_id), 'manifest.json'), manifest)
+        logger.info(f"Checkpointed {stage} for run {run_id}")
+        return output_hash
+
+    def load(self, run_id, stage):
+        """Load a stage's output, or None if it was never completed"""
+        if stage not in self.load_manifest(run_id)['stages']:
+            return None
+        with open(os.path.join(self.run_dir(run_id), f'{stage}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def is_current(self, run_id, stage, input_hash):
+        """True if the stage already completed for exactly this input"""
+        info = self.load_manifest(run_id)['stages'].get(stage)
+        return bool(info) and info['input_hash'] == input_hash
+
+    def exists(self, run_id):
+        """Whether any stage of run_id was checkpointed"""
+        return os.path.isfile(os.path.join(self.run_dir(run_id), 'manifest.json'))
+
+    def completed_stages(self, run_id):
+        stages = self.load_manifest(run_id)['stages']
+        return [stage for stage in STAGES if stage in stages]
+
+    def latest_run_id(self):
+        """Most recent run ID, or None if there are no checkpoints"""
+        try:
+            runs = [d for d in os.listdir(self.base_dir)
+                    if os.path.isfile(os.path.join(self.base_dir, d, 'manifest.json'))]
+        except FileNotFoundError:
+            return None
+        return max(runs) if runs else None
+
+    def prune(self, keep_days, now=None):
+        """Delete runs started more than keep_days ago (never the latest); returns how many were removed"""
+        cutoff = ((now or datetime.now()) - timedelta(days=keep_days)).strftime('%Y%m%d')
+        latest = self.latest_run_id()
+        try:
+            run_ids = os.listdir(self.base_dir)
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for run_id in run_ids:
+            # Run IDs start with their date (YYYYMMDD-HHMMSS)
+            if run_id[:8].isdigit() and run_id[:8] < cutoff and run_id != latest:
+                shutil.rmtree(self.run_dir(run_id), ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} checkpointed run(s) older than {keep_days} days")
+        return removed
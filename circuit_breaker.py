@@ -0,0 +1,185 @@
+"""
+Circuit Breaker Module
+Per-source circuit breakers: sources that keep failing are skipped for a cool-down period,
+then probed once (half-open) before being trusted again. State persists across runs and is
+shared by every process that scrapes (daily run, --watch, shard workers).
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+DEADLINE_REACHED = 'scrape deadline reached'  # Skip reason of sources the scrape ran out of time for
+
+
+class SourceSkipped(Exception):
+    """A source was not fetched (circuit open or scrape deadline reached)"""
+
+    def __init__(self, source, reason):
+        super().__init__(f"{source} skipped: {reason}")
+        self.source = source
+        self.reason = reason
+
+
+class DeadlineExceeded(SourceSkipped, TimeoutError):
+    def __init__(self, source):
+        super().__init__(source, DEADLINE_REACHED)
+
+
+class CircuitBreaker:
+    def __init__(self, state_file='data/circuit_breakers.json', failure_threshold=None,
+                 cooldown=None, max_cooldown=24 * 3600):
+        self.state_file = state_file
+        self.failure_threshold = failure_threshold or int(os.getenv('BREAKER_FAILURES', '3'))
+        self.cooldown = cooldown or float(os.getenv('BREAKER_COOLDOWN', '3600'))
+        self.max_cooldown = max_cooldown
+        self.lock = threading.Lock()
+        self.circuits = {}
+        self.mtime = None  # Of the state file as last loaded or saved
+        self._refresh()
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading circuit breaker state: {e}")
+            return {}
+
+    def _refresh(self):
+        """Reload the state if another process saved it since (call with self.lock held)"""
+        try:
+            mtime = os.stat(self.state_file).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.mtime:
+            self.circuits = self._load()
+            self.mtime = mtime
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the state file across processes (call with self.lock held)"""
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        with open(f"{self.state_file}.lock", 'a+') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def _shared_state(self):
+        """
+        Reload self.circuits from the state file under its lock, so changes apply on top of what
+        other processes recorded; save inside the block (call with self.lock held)
+        """
+        with self._file_lock():
+            self.mtime = None
+            self._refresh()
+            yield
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.circuits, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+            self.mtime = os.stat(self.state_file).st_mtime_ns
+        except Exception as e:
+            logger.error(f"Error saving circuit breaker state: {e}")
+
+    def _circuit(self, source):
+        return self.circuits.setdefault(source, {'state': CLOSED, 'failures': 0, 'open_until': 0,
+                                                 'cooldown': self.cooldown, 'last_error': None})
+
+    def state(self, source):
+        with self.lock:
+            self._refresh()
+            return self.circuits.get(source, {}).get('state', CLOSED)
+
+    def allow(self, source):
+        """True if the source may be fetched now; an expired open circuit lets one probe through"""
+        with self.lock:
+            self._refresh()
+            circuit = self.circuits.get(source)
+            if circuit is None or circuit['state'] == CLOSED:
+                return True
+            with self._shared_state():
+                circuit = self.circuits.get(source)
+                if circuit is None or circuit['state'] == CLOSED:
+                    return True
+                now = time.time()
+                if circuit['state'] == OPEN and now >= circuit['open_until']:
+                    circuit['state'] = HALF_OPEN
+                    circuit['probe_started'] = now
+                    self._save()
+                    logger.info(f"Circuit for {source} half-open: probing")
+                    return True
+                if circuit['state'] == HALF_OPEN and now - circuit.get('probe_started', 0) > circuit['cooldown']:
+                    # The previous probe never reported back (crashed run); allow another
+                    circuit['probe_started'] = now
+                    self._save()
+                    return True
+                return False
+
+    def record_success(self, source):
+        with self.lock:
+            self._refresh()
+            circuit = self.circuits.get(source)
+            if circuit is None or (circuit['state'] == CLOSED and not circuit['failures']):
+                return
+            with self._shared_state():
+                circuit = self.circuits.get(source)
+                if circuit is None or (circuit['state'] == CLOSED and not circuit['failures']):
+                    return
+                if circuit['state'] != CLOSED:
+                    logger.info(f"Circuit for {source} closed again")
+                self.circuits[source] = {'state': CLOSED, 'failures': 0, 'open_until': 0,
+                                         'cooldown': self.cooldown, 'last_error': None}
+                self._save()
+
+    def record_failure(self, source, error):
+        with self.lock, self._shared_state():
+            circuit = self._circuit(source)
+            circuit['failures'] += 1
+            circuit['last_error'] = str(error)[:200]
+            if circuit['state'] == HALF_OPEN:
+                # Failed probe: back off longer
+                circuit['cooldown'] = min(circuit['cooldown'] * 2, self.max_cooldown)
+                self._open(source, circuit)
+            elif circuit['failures'] >= self.failure_threshold:
+                self._open(source, circuit)
+            self._save()
+
+    def _open(self, source, circuit):
+        circuit['state'] = OPEN
+        circuit['open_until'] = time.time() + circuit['cooldown']
+        logger.warning(f"Circuit for {source} open for {circuit['cooldown'] / 60:.0f} min "
+                       f"after {circuit['failures']} failure(s): {circuit['last_error']}")
+
+    def open_circuits(self):
+        with self.lock:
+            self._refresh()
+            return {source: dict(c) for source, c in self.circuits.items() if c['state'] != CLOSED}
@@ -0,0 +1,222 @@
+"""
+Clustering Module
+Incremental story threads across days: each new article becomes a hashed sparse TF-IDF
+vector and joins the thread with the nearest centroid (found through an inverted index
+on the centroids' top terms) or starts a new thread
+"""
+
+import os
+import json
+import math
+import uuid
+import zlib
+import base64
+import logging
+import threading
+from array import array
+from datetime import datetime, timedelta
+from trending import extract_terms
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 1 << 18  # Hashed feature space
+
+
+def _feature(term):
+    return zlib.crc32(term.encode('utf-8')) & (DIMENSIONS - 1)
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+
+def _top(vector, n):
+    return dict(sorted(vector.items(), key=lambda item: item[1], reverse=True)[:n])
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {index: w / norm for index, w in vector.items()}
+
+
+class StoryClusterer:
+    def __init__(self, threshold=None, max_age_days=14, stale_after_days=3, max_demotion=3,
+                 vector_terms=40, centroid_terms=48, index_terms=16, max_postings=200, max_threads=5000,
+                 state_file='data/story_threads.json'):
+        self.threshold = threshold or float(os.getenv('STORY_SIMILARITY', '0.25'))
+        self.max_age_days = max_age_days          # Threads without new articles for longer are closed
+        self.stale_after_days = stale_after_days  # Days of coverage before a thread is demoted in ranking
+        self.max_demotion = max_demotion
+        self.vector_terms = vector_terms
+        self.centroid_terms = centroid_terms
+        self.index_terms = index_terms
+        self.max_postings = max_postings          # Terms in more threads than this (or 5%) are too common to search by
+        self.max_threads = max_threads
+        self.state_file = state_file
+        self.docs = 0
+        self.df = array('I', bytes(4 * DIMENSIONS))  # Document frequency per hashed feature
+        self.threads = {}   # id -> {'title', 'centroid', 'count', 'first_seen', 'days'}
+        self.assigned = {}  # article link -> thread id
+        self.postings = {}  # feature -> thread ids having it among their top index_terms
+        self.lock = threading.Lock()
+        self.candidates_checked = 0  # Centroid comparisons, for benchmarks
+        self.load()
+
+    def vectorize(self, article):
+        """Unit-length TF-IDF vector over hashed terms; title terms count double"""
+        title_terms = extract_terms({'title': article.get('title', '')})
+        vector = {}
+        for term in extract_terms(article):
+            index = _feature(term)
+            idf = math.log((self.docs + 1) / (self.df[index] + 1)) + 1
+            vector[index] = vector.get(index, 0.0) + (2 if term in title_terms else 1) * idf
+        return _normalize(_top(vector, self.vector_terms))
+
+    def _index_keys(self, centroid):
+        return list(_top(centroid, self.index_terms))
+
+    def _index(self, thread_id, keys):
+        for key in keys:
+            self.postings.setdefault(key, set()).add(thread_id)
+
+    def _unindex(self, thread_id, keys):
+        for key in keys:
+            posting = self.postings.get(key)
+            if posting is not None:
+                posting.discard(thread_id)
+                if not posting:
+                    del self.postings[key]
+
+    def nearest(self, vector):
+        """(thread id, similarity) of the most similar centroid among the index candidates, or (None, 0)"""
+        # Terms shared by many threads say little about which one is nearest: skip them
+        limit = min(self.max_postings, max(20, len(self.threads) // 20))
+        candidates = set()
+        for key in vector:
+            posting = self.postings.get(key)
+            if posting and len(posting) <= limit:
+                candidates |= posting
+        self.candidates_checked += len(candidates)
+        best, best_similarity = None, 0.0
+        for thread_id in candidates:
+            similarity = _cosine(vector, self.threads[thread_id]['centroid'])
+            if similarity > best_similarity:
+                best, best_similarity = thread_id, similarity
+        return best, best_similarity
+
+    def _add_to_thread(self, thread_id, vector, today):
+        thread = self.threads[thread_id]
+        old_keys = self._index_keys(thread['centroid'])
+        count = thread['count']
+        centroid = {index: weight * count for index, weight in thread['centroid'].items()}
+        for index, weight in vector.items():
+            centroid[index] = centroid.get(index, 0.0) + weight
+        thread['centroid'] = _normalize(_top(centroid, self.centroid_terms))
+        thread['count'] = count + 1
+        if thread['days'][-1] != today:
+            thread['days'] = (thread['days'] + [today])[-30:]
+        new_keys = self._index_keys(thread['centroid'])
+        self._unindex(thread_id, [k for k in old_keys if k not in new_keys])
+        self._index(thread_id, [k for k in new_keys if k not in old_keys])
+
+    def _new_thread(self, article, vector, today):
+        thread_id = uuid.uuid4().hex[:10]
+        self.threads[thread_id] = {'title': article.get('title', ''), 'centroid': vector, 'count': 1,
+                                   'first_seen': today, 'days': [today]}
+        self._index(thread_id, self._index_keys(vector))
+        return thread_id
+
+    def story(self, thread_id, today):
+        """What the digest shows about an article's thread"""
+        thread = self.threads[thread_id]
+        return {'id': thread_id, 'title': thread['title'], 'day': len(thread['days']),
+                'update': thread['first_seen'] < today}
+
+    def assign(self, articles, now=None):
+        """
+        Put each article in a story thread and set article['story']. Articles assigned
+        before (same link) keep their thread, so assigning a run again changes nothing.
+        """
+        today = (now or datetime.now()).strftime('%Y-%m-%d')
+        created = joined = 0
+        with self.lock:
+            self._expire(today)
+            # Oldest first, so a thread is named after the article that started it
+            for article in sorted(articles, key=lambda a: a.get('published', '')):
+                link = article.get('link', '')
+                thread_id = self.assigned.get(link)
+                if thread_id is None:
+                    vector = self.vectorize(article)
+                    if not vector:
+                        continue
+                    thread_id, similarity = self.nearest(vector)
+                    if thread_id is not None and similarity >= self.threshold:
+                        self._add_to_thread(thread_id, vector, today)
+                        joined += 1
+                    else:
+                        thread_id = self._new_thread(article, vector, today)
+                        created += 1
+                    self.assigned[link] = thread_id
+                    self.docs += 1
+                    for index in vector:
+                        self.df[index] += 1
+                article['story'] = self.story(thread_id, today)
+        logger.info(f"Story threads: {joined} article(s) joined existing threads, {created} new, "
+                    f"{len(self.threads)} open")
+
+    def demotion(self, article):
+        """Ranking penalty for articles in threads that have been covered for many days"""
+        story = article.get('story')
+        if not story:
+            return 0
+        return min(self.max_demotion, max(0, story['day'] - self.stale_after_days))
+
+    def _expire(self, today):
+        cutoff = (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=self.max_age_days)).strftime('%Y-%m-%d')
+        closed = [tid for tid, thread in self.threads.items() if thread['days'][-1] < cutoff]
+        if len(self.threads) - len(closed) > self.max_threads:
+            open_threads = sorted((t['days'][-1], tid) for tid, t in self.threads.items() if tid not in closed)
+            closed += [tid for _, tid in open_threads[:len(open_threads) - self.max_threads]]
+        if not closed:
+            return
+        closed = set(closed)
+        for thread_id in closed:
+            self._unindex(thread_id, self._index_keys(self.threads.pop(thread_id)['centroid']))
+        self.assigned = {link: tid for link, tid in self.assigned.items() if tid not in closed}
+
+    def save(self):
+        try:
+            with self.lock:
+                state = {
+                    'docs': self.docs,
+                    'df': base64.b64encode(zlib.compress(self.df.tobytes())).decode('ascii'),
+                    'threads': {tid: dict(thread, centroid=[[i, round(w, 5)] for i, w in thread['centroid'].items()])
+                                for tid, thread in self.threads.items()},
+                    'assigned': self.assigned,
+                }
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = self.state_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving story threads: {e}")
+
+    def load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error loading story threads, starting fresh: {e}")
+            return
+        self.docs = state['docs']
+        self.df = array('I', zlib.decompress(base64.b64decode(state['df'])))
+        for thread_id, thread in state['threads'].items():
+            thread['centroid'] = {int(i): w for i, w in thread['centroid']}
+            self.threads[thread_id] = thread
+            self._index(thread_id, self._index_keys(thread['centroid']))
+        self.assigned = state['assigned']
@@ -0,0 +1,158 @@
+"""
+Logging Setup Module
+One-time logging configuration for entry points: records go through a queue to a
+background listener thread that writes JSON lines to a rotating file and text to the console
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Standard LogRecord attributes; anything else was passed via extra= and goes into the JSON line
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_configured_pid = None
+_console_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most `burst` records per call site through every `interval` seconds
+    for levels WARNING..max_level; the next record after a quiet spell reports how many were dropped.
+    """
+
+    def __init__(self, interval=60, burst=5, max_level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_level = max_level
+        self.windows = {}  # (pathname, lineno) -> [window start, passed, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.max_level or record.levelno < logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar message(s) suppressed)"
+            record.args = None
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Keep the traceback as a separate field for the JSON formatter instead of
+        # QueueHandler's default of pasting it into the message
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def setup_logging(level=None, log_file=None, console=True, max_bytes=None, backups=None):
+    """
+    Configure the root logger once per process (LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUPS).
+    Calling it again in the same process is a no-op; a forked child gets its own listener.
+    """
+    global _listener, _configured_pid, _console_handler
+
+    if _configured_pid == os.getpid():
+        return
+    if _listener is not None:
+        # Inherited from the parent by fork: its listener thread doesn't exist here
+        _listener = None
+
+    level = level or os.getenv('LOG_LEVEL', 'INFO').upper()
+    log_file = log_file or os.getenv('LOG_FILE', 'logs/tech_news_digest.log')
+    max_bytes = max_bytes or int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    backups = backups if backups is not None else int(os.getenv('LOG_BACKUPS', '5'))
+
+    handlers = []
+    try:
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    except OSError as e:
+        print(f"Logging to console only, can't open {log_file}: {e}", file=sys.stderr)
+
+    _console_handler = None
+    if console:
+        _console_handler = logging.StreamHandler()
+        _console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(_console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _configured_pid = os.getpid()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush whatever is still queued and stop the listener (worker processes skip atexit)"""
+    global _listener, _configured_pid
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+    _listener = None
+    _configured_pid = None
+
+
+def set_console_level(level):
+    """Change the console threshold (the log file keeps everything)"""
+    if _console_handler is not None:
+        _console_handler.setLevel(level)
@@ -0,0 +1,251 @@
+"""
+Metrics Module
+Counters and histograms for sources, pipeline stages and delivery channels,
+exported as Prometheus text format and as a per-run JSON summary
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Bytes
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Items (entries per feed, articles per stage)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, '')) for name in label_names)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, key, extra=None):
+    pairs = [(name, value) for name, value in zip(label_names, key)]
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def prometheus_lines(self):
+        for key, value in sorted(self.snapshot().items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {value}"
+
+    def summarize(self, previous):
+        summary = {}
+        for key, value in self.snapshot().items():
+            delta = value - previous.get(key, 0)
+            if delta:
+                summary[','.join(key) or 'total'] = delta
+        return summary
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series = {}  # key -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            return {key: list(series) for key, series in self.series.items()}
+
+    def prometheus_lines(self):
+        for key, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', bound))} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]:.6f}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+    def _quantile(self, counts, total, q):
+        """Upper bucket bound containing quantile q (Prometheus-style estimate)"""
+        target = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return '+Inf'
+
+    def summarize(self, previous):
+        summary = {}
+        for key, series in self.snapshot().items():
+            before = previous.get(key, [0] * len(series))
+            delta = [now - then for now, then in zip(series, before)]
+            counts, total_sum = delta[:-1], delta[-1]
+            count = sum(counts)
+            if not count:
+                continue
+            summary[','.join(key) or 'total'] = {
+                'count': count,
+                'sum': round(total_sum, 6),
+                'mean': round(total_sum / count, 6),
+                'p50': self._quantile(counts, count, 0.5),
+                'p95': self._quantile(counts, count, 0.95),
+            }
+        return summary
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.run_snapshot = {}
+        self.server = None
+
+    def _get_or_create(self, cls, name, help_text, label_names, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, label_names, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def to_prometheus(self):
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.prometheus_lines())
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filename='data/metrics.prom'):
+        """Write the text exposition format (e.g. for node_exporter's textfile collector)"""
+        try:
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+            tmp_path = filename + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, filename)
+        except Exception as e:
+            logger.error(f"Error writing metrics: {e}")
+
+    def start_run(self):
+        """Mark the start of a run; summary() reports what happened since"""
+        self.run_snapshot = {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def summary(self):
+        """Per-run summary: counter deltas and histogram count/sum/mean/p50/p95 per label set"""
+        result = {}
+        for name, metric in sorted(self.metrics.items()):
+            values = metric.summarize(self.run_snapshot.get(name, {}))
+            if values:
+                result[name] = values
+        return result
+
+    def write_summary(self, filename):
+        try:
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, indent=2)
+            logger.info(f"Saved run metrics to {filename}")
+        except Exception as e:
+            logger.error(f"Error writing metrics summary: {e}")
+
+    def serve(self, port, host='127.0.0.1'):
+        """Expose /metrics over HTTP from a background thread (local only unless host says otherwise)"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+
+# Process-wide default registry
+registry = MetricsRegistry()
+
+FETCH_SECONDS = registry.histogram('digest_fetch_seconds', 'Feed download latency', ['source'])
+FETCH_BYTES = registry.histogram('digest_fetch_bytes', 'Feed payload size', ['source'], SIZE_BUCKETS)
+FETCH_ERRORS = registry.counter('digest_fetch_errors_total', 'Failed feed fetches or parses', ['source'])
+FEED_ENTRIES = registry.histogram('digest_feed_entries', 'Articles parsed per feed fetch', ['source'], COUNT_BUCKETS)
+SOURCES_SKIPPED = registry.counter('digest_sources_skipped_total', 'Sources left out of a scrape', ['source', 'reason'])
+PARSE_SECONDS = registry.histogram('digest_parse_seconds', 'Feed XML parse time', ['source'])
+CLEAN_SECONDS = registry.histogram('digest_clean_html_seconds', 'HTML cleaning time per article', ['source'])
+STAGE_SECONDS = registry.histogram('digest_stage_seconds', 'Wall time per pipeline stage', ['stage'])
+STAGE_ITEMS = registry.counter('digest_stage_items_total', 'Items processed per pipeline stage', ['stage'])
+DELIVERY_SECONDS = registry.histogram('digest_delivery_seconds', 'Delivery latency per destination', ['channel'])
+DELIVERIES = registry.counter('digest_deliveries_total', 'Delivery outcomes', ['channel', 'result'])
@@ -3,17 +3,101 @@ News Scraper Module
 Scrapes AI and tech news from multiple sources
 """
 
-import requests
-from bs4 import BeautifulSoup
-import feedparser
-from datetime import datetime, timedelta
+from datetime import datetime
+from html.parser import HTMLParser
+import calendar
+import html
 import json
 import os
+import re
+import time
 import logging
+import metrics
+from circuit_breaker import CircuitBreaker, SourceSkipped, DeadlineExceeded
+
+# requests, feedparser and bs4 are imported where they are used, so that
+# --help, --resume of later stages and other paths that never scrape start fast
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cleaned summary text kept per article; the digests shorten it per channel (summarizer.py)
+MAX_SUMMARY_CHARS = 2000
+
+# Raw feed markup, to find entries before parsing: an RSS <item> or Atom <entry>, and its ID
+_ENTRY_START = re.compile(rb'<(?:[\w-]+:)?(?:item|entry)[\s>]')
+_ENTRY_GUID = re.compile(rb'<(?:[\w-]+:)?(?:guid|id)\b[^>]*>(.*?)</', re.S)
+_ENTRY_LINK = re.compile(rb'<link(?:\s[^>]*)?(?<!/)>(.*?)</link>', re.S)
+
+
+def _raw_entry_id(chunk):
+    """The ID feedparser gives an entry (guid/id, else link), from its raw markup"""
+    match = _ENTRY_GUID.search(chunk) or _ENTRY_LINK.search(chunk)
+    if not match:
+        return None
+    value = match.group(1).strip()
+    if value.startswith(b'<![CDATA[') and value.endswith(b']]>'):
+        value = value[9:-3]
+    return html.unescape(value.decode('utf-8', 'replace')).strip()
+
+
+class _TextExtractor(HTMLParser):
+    """Dependency-free HTML to text (same output as BeautifulSoup.get_text for feed summaries)"""
+
+    SKIP_TAGS = {'script', 'style', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def text(self):
+        return ''.join(self.parts)
+
+
+_worker_scraper = None  # Per worker process, for parse_batch
+
+
+def parse_batch(feeds, html_cleaner='builtin', marks=None):
+    """
+    Process-pool entry point: parse and clean a batch of (source, raw feed bytes).
+    Returns one (source, rows, seconds, error, mark) per feed, where rows are plain
+    (title, link, summary, published) tuples: much cheaper to pickle back than dicts.
+    With marks ({source: high-water mark}), only newer entries are parsed and each
+    feed's advanced mark is returned; otherwise mark is None.
+    """
+    global _worker_scraper
+    if _worker_scraper is None:
+        _worker_scraper = NewsScraper()
+    _worker_scraper.html_cleaner = html_cleaner
+    _worker_scraper.high_water = None
+    if marks is not None:
+        from high_water import HighWaterMarks
+        _worker_scraper.high_water = HighWaterMarks(state_file=None)
+        _worker_scraper.high_water.marks = {source: mark for source, mark in marks.items() if mark}
+    results = []
+    for source_name, content in feeds:
+        started = time.perf_counter()
+        try:
+            articles = [_worker_scraper.clean_article(a) for a in _worker_scraper.parse_feed(content, source_name)]
+            rows = [(a['title'], a['link'], a['summary'], a['published']) for a in articles]
+            mark = _worker_scraper.high_water.get(source_name) if marks is not None else None
+            results.append((source_name, rows, time.perf_counter() - started, None, mark))
+        except Exception as e:
+            results.append((source_name, [], time.perf_counter() - started, str(e), None))
+    return results
+
 
 class NewsScraper:
     def __init__(self):
@@ -28,74 +112,254 @@ class NewsScraper:
             'theverge_ai': 'https://www.theverge.com/rss/ai-artificial-intelligence/index.xml',
             'openai_blog': 'https://openai.com/blog/rss/',
         }
+        # Seconds to connect / between bytes received, per feed request
+        self.connect_timeout = float(os.getenv('SCRAPE_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = float(os.getenv('SCRAPE_READ_TIMEOUT', '15'))
+        # Overall budget for scraping all sources; whatever isn't done by then is skipped
+        self.deadline_seconds = float(os.getenv('SCRAPE_DEADLINE', '300'))
+        self.breaker = CircuitBreaker()
+        self.skipped = {}  # source -> reason, for the last scrape_all_sources()
+        # 'builtin' (default, stdlib only) or 'bs4' to clean summaries with BeautifulSoup
+        self.html_cleaner = os.getenv('HTML_CLEANER', 'builtin').lower()
+        # Optional HighWaterMarks: with a mark, only entries newer than the last scrape are parsed;
+        # without one (first scrape of a source, or no marks kept) only the newest few are
+        self.high_water = None
+        self.first_scrape_entries = int(os.getenv('SCRAPE_FIRST_ENTRIES', '10'))
 
-    def scrape_rss_feed(self, url, source_name):
-        """Scrape news from RSS feed"""
+    def _get(self, url, source_name, headers, deadline=None):
+        """
+        GET with connect/read timeouts, streaming the body so the overall deadline
+        (a time.monotonic() value) also bounds slow trickling responses.
+        Returns (status code, headers, body bytes).
+        """
+        import requests
+
+        if not self.breaker.allow(source_name):
+            raise SourceSkipped(source_name, 'circuit open')
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded(source_name)
+
+        timeout = (self.connect_timeout, self.read_timeout)
+        if deadline is not None:
+            remaining = max(0.1, deadline - time.monotonic())
+            timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+        started = time.perf_counter()
         try:
-            feed = feedparser.parse(url)
+            with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code != 304:
+                    response.raise_for_status()
+                body = bytearray()
+                for chunk in response.iter_content(65536):
+                    body += chunk
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceeded(source_name)
+                status, response_headers = response.status_code, response.headers
+        except DeadlineExceeded:
+            metrics.FETCH_ERRORS.inc(source=source_name)
+            raise
+        except Exception as e:
+            metrics.FETCH_ERRORS.inc(source=source_name)
+            self.breaker.record_failure(source_name, e)
+            raise
+        self.breaker.record_success(source_name)
+        metrics.FETCH_SECONDS.observe(time.perf_counter() - started, source=source_name)
+        metrics.FETCH_BYTES.observe(len(body), source=source_name)
+        return status, response_headers, bytes(body)
+
+    def fetch_feed(self, url, source_name=None, deadline=None):
+        """Download raw feed bytes (raises SourceSkipped if the circuit is open or the deadline passed)"""
+        return self._get(url, source_name or url, self.headers, deadline)[2]
+
+    def fetch_feed_if_changed(self, url, source_name, validators=None, deadline=None):
+        """
+        Conditional GET using the ETag / Last-Modified of the previous fetch.
+        Returns (content, validators); content is None when the feed hasn't changed (304).
+        """
+        validators = validators or {}
+        headers = dict(self.headers)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        status, response_headers, content = self._get(url, source_name, headers, deadline)
+        if status == 304:
+            return None, validators
+        return content, {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified')
+        }
+
+    def parse_feed(self, content, source_name):
+        """
+        Parse raw feed bytes into articles (summary still HTML). With high-water marks,
+        returns only entries newer than the source's mark and advances it; feeds list the
+        newest entries first, so parsing stops after a few already-seen entries in a row.
+        """
+        import feedparser
+
+        with metrics.PARSE_SECONDS.time(source=source_name):
+            mark = self.high_water.get(source_name) if self.high_water else None
+            try:
+                feed = feedparser.parse(self._skip_seen_entries(content, mark))
+            except Exception:
+                metrics.FETCH_ERRORS.inc(source=source_name)
+                raise
+            if feed.bozo and not feed.entries:
+                # feedparser doesn't raise on a broken document; it flags it and finds nothing
+                metrics.FETCH_ERRORS.inc(source=source_name)
+                logger.warning(f"Could not parse feed from {source_name}: {feed.get('bozo_exception')}")
+            entries = feed.entries if mark else feed.entries[:self.first_scrape_entries]
             articles = []
+            parsed_entries = []  # (timestamp, entry id) of the articles returned
+            seen_in_a_row = 0
 
-            # Get articles from last 24 hours
-            cutoff_date = datetime.now() - timedelta(days=1)
-
-            for entry in feed.entries[:10]:  # Limit to 10 most recent
-                try:
-                    # Parse publication date
-                    pub_date = None
-                    if hasattr(entry, 'published_parsed'):
-                        pub_date = datetime(*entry.published_parsed[:6])
-                    elif hasattr(entry, 'updated_parsed'):
-                        pub_date = datetime(*entry.updated_parsed[:6])
-
-                    # Skip old articles (optional - comment out to get all)
-                    # if pub_date and pub_date < cutoff_date:
-                    #     continue
-
-                    article = {
-                        'title': entry.title if hasattr(entry, 'title') else 'No title',
-                        'link': entry.link if hasattr(entry, 'link') else '',
-                        'summary': self._clean_html(entry.summary if hasattr(entry, 'summary') else ''),
-                        'published': pub_date.strftime('%Y-%m-%d %H:%M') if pub_date else 'Unknown',
-                        'source': source_name
-                    }
-                    articles.append(article)
-                except Exception as e:
-                    logger.warning(f"Error parsing entry from {source_name}: {e}")
+            for entry in entries:
+                parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+                timestamp = calendar.timegm(parsed) if parsed else None
+                entry_id = entry.get('id') or entry.get('link', '')
+                if mark and self.high_water.seen(mark, timestamp, entry_id):
+                    seen_in_a_row += 1
+                    if seen_in_a_row >= self.high_water.stop_after:
+                        break
                     continue
+                seen_in_a_row = 0
+                article = self._parse_entry(entry, source_name, parsed)
+                if article:
+                    articles.append(article)
+                    parsed_entries.append((timestamp, entry_id))
+
+            if self.high_water is not None:
+                self.high_water.advance(source_name, parsed_entries)
+
+        metrics.FEED_ENTRIES.observe(len(articles), source=source_name)
+        return articles
+
+    @staticmethod
+    def _skip_seen_entries(content, mark):
+        """
+        Cut raw feed bytes before the entry at the source's mark, so feedparser only parses
+        the newer entries above it. Feeds whose entries can't be matched are left whole.
+        """
+        if not mark or not mark['ids'] or not isinstance(content, bytes):
+            return content
+        end = max(content.rfind(b'</item>'), content.rfind(b'</entry>'))
+        starts = [m.start() for m in _ENTRY_START.finditer(content)]
+        if end < 0 or not starts:
+            return content
+        ids = set(mark['ids'])
+        for start, next_start in zip(starts, starts[1:] + [end]):
+            if _raw_entry_id(content[start:next_start]) in ids:
+                # Keep the closing tags after the last entry, so the document stays well-formed
+                return content[:start] + content[content.index(b'>', end) + 1:]
+        return content
+
+    def _parse_entry(self, entry, source_name, parsed=None):
+        """Turn one feed entry into an article dict, or None if it can't be parsed"""
+        try:
+            # feedparser normalizes dates to UTC struct_time; format it without building a datetime
+            published = (f"{parsed[0]:04d}-{parsed[1]:02d}-{parsed[2]:02d} {parsed[3]:02d}:{parsed[4]:02d}"
+                         if parsed else 'Unknown')
+            return {
+                'title': entry.get('title', 'No title'),
+                'link': entry.get('link', ''),
+                'summary': entry.get('summary', ''),
+                'published': published,
+                'source': source_name
+            }
+        except Exception as e:
+            logger.warning(f"Error parsing entry from {source_name}: {e}")
+            return None
+
+    def clean_article(self, article):
+        """Strip HTML from the article summary in place"""
+        with metrics.CLEAN_SECONDS.time(source=article['source']):
+            article['summary'] = self._clean_html(article['summary'])
+        return article
+
+    def scrape_rss_feed(self, url, source_name, deadline=None):
+        """Scrape news from RSS feed"""
+        try:
+            content = self.fetch_feed(url, source_name, deadline)
+            articles = [self.clean_article(a) for a in self.parse_feed(content, source_name)]
 
             logger.info(f"Scraped {len(articles)} articles from {source_name}")
             return articles
 
+        except SourceSkipped as e:
+            self.skipped[source_name] = e.reason
+            logger.warning(f"Skipping {source_name}: {e.reason}")
+            return []
         except Exception as e:
             logger.error(f"Error scraping {source_name}: {e}")
             return []
 
     def _clean_html(self, html_text):
         """Remove HTML tags from text"""
-        soup = BeautifulSoup(html_text, 'html.parser')
-        return soup.get_text()[:300]  # Limit to 300 chars
+        if '<' not in html_text:
+            # Plain text (possibly with entities): no parsing needed
+            text = html.unescape(html_text) if '&' in html_text else html_text
+            return text[:MAX_SUMMARY_CHARS]
+
+        if self.html_cleaner == 'bs4':
+            try:
+                from bs4 import BeautifulSoup
+                return BeautifulSoup(html_text, 'html.parser').get_text()[:MAX_SUMMARY_CHARS]
+            except ImportError:
+                logger.warning("HTML_CLEANER=bs4 but beautifulsoup4 is not installed; using the built-in cleaner")
+                self.html_cleaner = 'builtin'
+
+        extractor = _TextExtractor()
+        extractor.feed(html_text)
+        extractor.close()
+        return extractor.text()[:MAX_SUMMARY_CHARS]
+
+    @staticmethod
+    def title_key(article):
+        """Key used to treat two articles as duplicates"""
+        return article['title'].lower()
+
+    def deduplicate(self, articles):
+        """Remove duplicates by title, keeping the first occurrence"""
+        seen_titles = set()
+        unique_articles = []
+        for article in articles:
+            title_lower = self.title_key(article)
+            if title_lower not in seen_titles:
+                seen_titles.add(title_lower)
+                unique_articles.append(article)
+        return unique_articles
 
     def scrape_all_sources(self):
-        """Scrape all configured news sources"""
+        """Scrape all configured news sources within the scrape deadline"""
         all_articles = []
+        self.skipped = {}
+        deadline = time.monotonic() + self.deadline_seconds
 
         for source_name, url in self.sources.items():
             logger.info(f"Scraping {source_name}...")
-            articles = self.scrape_rss_feed(url, source_name)
+            articles = self.scrape_rss_feed(url, source_name, deadline)
             all_articles.extend(articles)
 
+        self.report_skipped()
+
         # Sort by source and remove duplicates by title
-        seen_titles = set()
-        unique_articles = []
-        for article in all_articles:
-            title_lower = article['title'].lower()
-            if title_lower not in seen_titles:
-                seen_titles.add(title_lower)
-                unique_articles.append(article)
+        unique_articles = self.deduplicate(all_articles)
 
         logger.info(f"Total unique articles scraped: {len(unique_articles)}")
         return unique_articles
 
+    def report_skipped(self, skipped=None, total=None):
+        """Log and count the sources left out of a scrape ({source: reason}; default: the last scrape_all_sources())"""
+        skipped = self.skipped if skipped is None else skipped
+        total = len(self.sources) if total is None else total
+        for source_name, reason in skipped.items():
+            metrics.SOURCES_SKIPPED.inc(source=source_name, reason=reason)
+        if skipped:
+            logger.warning(f"Partial results: skipped {len(skipped)} of {total} sources "
+                           f"({', '.join(f'{s}: {r}' for s, r in sorted(skipped.items()))})")
+
     def save_articles(self, articles, filename='data/articles.json'):
         """Save articles to JSON file"""
         try:
@@ -112,6 +376,9 @@ class NewsScraper:
 
 
 if __name__ == "__main__":
+    from logging_setup import setup_logging
+    setup_logging()
+
     scraper = NewsScraper()
     articles = scraper.scrape_all_sources()
     scraper.save_articles(articles)
\ No newline at end of file
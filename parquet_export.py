@@ -0,0 +1,209 @@
+"""
+Parquet Export Module
+Appends each run's scraped and scored articles to a Parquet dataset partitioned by
+month and source (data/history/month=YYYY-MM/source=NAME/), for analytics. Each run
+adds one small file per partition; a partition is compacted into a single file sorted
+by date once it collects max_files files, and for good once its month is over.
+pyarrow is optional: without it the export is skipped.
+"""
+
+import os
+import glob
+import uuid
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _pyarrow():
+    """(pyarrow, pyarrow.dataset), or None when pyarrow is not installed"""
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.dataset
+
+
+def _schema(pa):
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('run_id', text),
+        ('month', pa.string()),    # Partition key: YYYY-MM of date
+        ('source', pa.string()),   # Partition key
+        ('date', pa.string()),     # Publication day (or run day when unknown); files are sorted by it
+        ('title', pa.string()),
+        ('link', pa.string()),
+        ('summary', pa.string()),
+        ('published', pa.timestamp('s')),
+        ('score', pa.int32()),
+    ])
+
+
+def _partitioning(pa, ds):
+    """Directory layout month=YYYY-MM/source=NAME"""
+    return ds.partitioning(pa.schema([('month', pa.string()), ('source', pa.string())]), flavor='hive')
+
+
+class ParquetExporter:
+    def __init__(self, root=None, compression='zstd', row_group_size=64 * 1024, max_files=4):
+        self.root = root or os.getenv('HISTORY_DIR', 'data/history')
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.max_files = max_files  # Per partition, before it is compacted
+        self.warned = False
+        self.lock = threading.Lock()  # Held while writing; retention.py moves old months out under it
+
+    def available(self):
+        if _pyarrow() is not None:
+            return True
+        if not self.warned:
+            logger.info("pyarrow is not installed; skipping the Parquet history export (pip install pyarrow)")
+            self.warned = True
+        return False
+
+    def _table(self, pa, articles, run_id, run_date):
+        columns = {name: [] for name in _schema(pa).names}
+        for article in articles:
+            try:
+                published = datetime.strptime(article.get('published', ''), '%Y-%m-%d %H:%M')
+            except ValueError:
+                published = None
+            date = published.strftime('%Y-%m-%d') if published else run_date
+            columns['run_id'].append(run_id)
+            columns['month'].append(date[:7])
+            columns['source'].append(article.get('source', ''))
+            columns['date'].append(date)
+            columns['title'].append(article.get('title', ''))
+            columns['link'].append(article.get('link', ''))
+            columns['summary'].append(article.get('summary', ''))
+            columns['published'].append(published)
+            columns['score'].append(article.get('score'))
+        return pa.table(columns, schema=_schema(pa)).sort_by([('date', 'ascending'), ('published', 'ascending')])
+
+    def export(self, articles, run_id, run_date=None):
+        """
+        Write one run's articles; returns the number of rows written. Files are named after
+        the run, so exporting the same run again (a resume) replaces its files instead of
+        appending duplicates.
+        """
+        modules = _pyarrow() if self.available() else None
+        if modules is None or not articles:
+            return 0
+        pa, ds = modules
+        run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+        table = self._table(pa, articles, run_id, run_date)
+        written = set()
+        with self.lock:
+            ds.write_dataset(
+                table, self.root, format='parquet',
+                partitioning=_partitioning(pa, ds),
+                basename_template=f'{run_id}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+                file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression,
+                                                                       use_dictionary=True),
+                max_rows_per_group=self.row_group_size,
+                file_visitor=lambda written_file: written.add(os.path.dirname(written_file.path)),
+            )
+            for partition in sorted(written):
+                # Re-exporting a run already merged into a compacted file: merge again to drop the old copy
+                self.compact(partition, force=self._compacted_run(partition, run_id))
+            self.compact_closed_months(run_date[:7])
+        logger.info(f"Exported {table.num_rows} articles to {self.root}")
+        return table.num_rows
+
+    @staticmethod
+    def _compacted_run(partition, run_id):
+        import pyarrow.parquet as pq
+        for path in glob.glob(os.path.join(partition, 'compacted-*.parquet')):
+            runs = (pq.read_schema(path).metadata or {}).get(b'runs', b'').decode().split(',')
+            if run_id in runs:
+                return True
+        return False
+
+    def compact_closed_months(self, current_month):
+        """Merge every partition of months before current_month ("YYYY-MM") down to one file"""
+        for month_dir in glob.glob(os.path.join(self.root, 'month=*')):
+            if os.path.basename(month_dir)[len('month='):] < current_month:
+                for partition in glob.glob(os.path.join(month_dir, 'source=*')):
+                    self.compact(partition, force=True)
+
+    def compact(self, partition, force=False):
+        """
+        Merge a partition directory's files into one, sorted by date, once it has more than
+        max_files of them (always with force). Returns True if it was rewritten.
+        """
+        modules = _pyarrow()
+        files = sorted(glob.glob(os.path.join(partition, '*.parquet')))
+        if modules is None or len(files) <= (1 if force else self.max_files):
+            return False
+        pa, _ = modules
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        # Newest first, so a run exported again replaces the copy merged earlier
+        files.sort(key=os.path.getmtime, reverse=True)
+        tables = []
+        runs = set()
+        for path in files:
+            table = pq.read_table(path)
+            present = set(table.column('run_id').unique().to_pylist())
+            if present & runs:
+                fresh = pa.array(sorted(present - runs), pa.string())
+                table = table.filter(pc.is_in(table.column('run_id').cast(pa.string()), fresh))
+            runs |= present
+            tables.append(table)
+        table = pa.concat_tables(tables).sort_by([('date', 'ascending'), ('published', 'ascending')])
+        table = table.replace_schema_metadata({'runs': ','.join(sorted(runs))})
+
+        # Hidden while being written (dataset discovery skips dot-files), then swapped in
+        tmp_path = os.path.join(partition, f'.compacting-{os.getpid()}.parquet')
+        pq.write_table(table, tmp_path, compression=self.compression, row_group_size=self.row_group_size)
+        os.replace(tmp_path, os.path.join(partition, f'compacted-{uuid.uuid4().hex[:12]}.parquet'))
+        for path in files:
+            os.remove(path)
+        logger.debug(f"Compacted {len(files)} files in {partition} ({table.num_rows} rows)")
+        return True
+
+
+def read_history(root='data/history', columns=None, sources=None, since=None, until=None, min_score=None):
+    """
+    pyarrow Table of exported articles. Filters are pushed down: sources and the
+    since/until dates ("YYYY-MM-DD", inclusive) prune whole partitions (by month), and
+    the dates and min_score skip row groups by their statistics.
+    """
+    modules = _pyarrow()
+    if modules is None:
+        raise ImportError("Reading the Parquet history requires pyarrow (pip install pyarrow)")
+    _, ds = modules
+    # Partition values come back dictionary-encoded, like the other repeated strings
+    dataset = ds.dataset(root, format='parquet', partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    return dataset.to_table(columns=columns, filter=history_filter(ds, sources, since, until, min_score))
+
+
+def history_filter(ds, sources=None, since=None, until=None, min_score=None):
+    """Dataset filter expression (None for no filter) over the month, source, date and score fields"""
+    conditions = []
+    if sources:
+        conditions.append(ds.field('source').isin(list(sources)))
+    if since:
+        conditions.append((ds.field('month') >= since[:7]) & (ds.field('date') >= since))
+    if until:
+        conditions.append((ds.field('month') <= until[:7]) & (ds.field('date') <= until))
+    if min_score is not None:
+        conditions.append(ds.field('score') >= min_score)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+if __name__ == "__main__":
+    import sys
+    table = read_history(sys.argv[1] if len(sys.argv) > 1 else 'data/history',
+                         columns=['date', 'source', 'score'])
+    print(f"{table.num_rows} articles")
+    for row in table.group_by('source').aggregate([('score', 'count'), ('score', 'mean')]).to_pylist():
+        print(f"  {row['source']:<24} {row['score_count']:>8} articles, mean score {row['score_mean'] or 0:.2f}")
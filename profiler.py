@@ -0,0 +1,148 @@
+"""
+Profiler Module
+Stage-level CPU (cProfile) and memory (tracemalloc) profiling for a digest run
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Profiler:
+    def __init__(self, top_allocations=15, top_functions=25):
+        self.top_allocations = top_allocations
+        self.top_functions = top_functions
+        self.output_dir = None
+        self.stages = []
+        self.lock = threading.Lock()
+        self.local = threading.local()  # .active: a cProfile stage is running in this thread
+
+    def start(self, output_dir):
+        """Begin profiling a run; results go to output_dir"""
+        self.output_dir = output_dir
+        self.stages = []
+        os.makedirs(output_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        self.run_started = time.perf_counter()
+        self.baseline = tracemalloc.take_snapshot()
+
+    @contextmanager
+    def stage(self, name, memory=True):
+        """
+        Profile a with-block as stage `name` in the calling thread.
+        Set memory=False for stages running concurrently with others (tracemalloc is process-wide).
+        A stage nested in another in the same thread (scrape.select in scrape) gets timings only:
+        a second profiler would stop the outer one (3.11) or fail to start (3.12+).
+        """
+        if self.output_dir is None:
+            yield
+            return
+
+        profile = None
+        if not getattr(self.local, 'active', False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self.local.active = True
+            except ValueError:
+                # Python 3.12+ allows only one active profiler per process; fall back to timings only
+                profile = None
+        if memory:
+            tracemalloc.reset_peak()
+            before_memory = tracemalloc.get_traced_memory()[0]
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield
+        finally:
+            cpu = time.thread_time() - cpu_started
+            wall = time.perf_counter() - wall_started
+            if profile is not None:
+                profile.disable()
+                self.local.active = False
+                profile.dump_stats(os.path.join(self.output_dir, f'{name}.prof'))
+                self._write_top_functions(name, profile)
+            record = {'stage': name, 'wall_seconds': round(wall, 4), 'cpu_seconds': round(cpu, 4),
+                      'profiled': profile is not None}
+            if memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['alloc_peak_bytes'] = peak - before_memory
+                record['alloc_retained_bytes'] = current - before_memory
+            with self.lock:
+                self.stages.append(record)
+
+    def _write_top_functions(self, name, profile):
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self.top_functions)
+        with open(os.path.join(self.output_dir, f'{name}.txt'), 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+
+    def finish(self):
+        """Write allocation sites, summary table and JSON, and log the table; returns the summary text"""
+        if self.output_dir is None:
+            return ''
+
+        # Leave out the profiler's own bookkeeping
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, path)
+            for path in (tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__,
+                         '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>')
+        ])
+        top = snapshot.compare_to(self.baseline, 'lineno')[:self.top_allocations]
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            for stat in top:
+                f.write(f"{stat}\n")
+
+        total_wall = time.perf_counter() - self.run_started
+        peak_rss = peak_rss_bytes()
+        _, traced_peak = tracemalloc.get_traced_memory()
+
+        lines = [f"{'Stage':<16}{'Wall (s)':>10}{'CPU (s)':>10}{'Alloc peak (KiB)':>18}{'Retained (KiB)':>16}"]
+        lines.append('-' * len(lines[0]))
+        for record in self.stages:
+            peak = record.get('alloc_peak_bytes')
+            retained = record.get('alloc_retained_bytes')
+            lines.append(f"{record['stage']:<16}{record['wall_seconds']:>10.3f}{record['cpu_seconds']:>10.3f}"
+                         f"{(f'{peak / 1024:.0f}' if peak is not None else '-'):>18}"
+                         f"{(f'{retained / 1024:.0f}' if retained is not None else '-'):>16}")
+        lines.append('-' * len(lines[0]))
+        lines.append(f"Total wall time: {total_wall:.3f}s")
+        lines.append(f"Peak traced memory: {traced_peak / 1048576:.1f} MiB")
+        lines.append(f"Peak RSS: {peak_rss / 1048576:.1f} MiB" if peak_rss else "Peak RSS: unavailable")
+        lines.append("")
+        lines.append("Top allocation sites (since run start):")
+        lines.extend(f"  {stat}" for stat in top[:5])
+        summary = '\n'.join(lines)
+
+        with open(os.path.join(self.output_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(summary + '\n')
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.stages, 'total_wall_seconds': round(total_wall, 4),
+                       'peak_traced_bytes': traced_peak, 'peak_rss_bytes': peak_rss}, f, indent=2)
+
+        logger.info(f"Profile written to {self.output_dir}:\n{summary}")
+        self.output_dir = None
+        return summary
@@ -0,0 +1,306 @@
+"""
+Rate Limiter Module
+Token-bucket rate limiting and fan-out scheduling for notification providers
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a provider answers with 429 / Retry-After"""
+
+    def __init__(self, provider, destination, retry_after):
+        super().__init__(f"{provider} rate limited for {destination}, retry after {retry_after:.1f}s")
+        self.provider = provider
+        self.destination = destination
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, tokens=1):
+        """Seconds until `tokens` could be taken (0 if available now)"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < tokens:
+                wait = max(wait, (tokens - self.tokens) / self.rate)
+            return wait
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; otherwise return the seconds to wait"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def block_for(self, seconds):
+        """Stop handing out tokens for `seconds` (used for Retry-After)"""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = now
+
+
+class RateLimiter:
+    """Per-provider and per-destination token buckets"""
+
+    # (requests per second, burst) for the whole provider and for a single destination.
+    # Telegram: ~30 msg/s per bot, 1 msg/s per chat.
+    # CallMeBot: free tier is meant for personal use, keep it slow.
+    # Gmail: ~100 recipients/hour on a personal account once spread out (a burst of 5 goes at once).
+    DEFAULT_LIMITS = {
+        'telegram': {'provider': (30, 30), 'destination': (1, 3)},
+        'callmebot': {'provider': (0.2, 1), 'destination': (0.2, 1)},
+        'gmail': {'provider': (100 / 3600, 5), 'destination': (0.5, 2)},
+    }
+
+    def __init__(self, limits=None):
+        self.limits = {name: dict(value) for name, value in self.DEFAULT_LIMITS.items()}
+        for name, value in (limits or {}).items():
+            self.limits.setdefault(name, {}).update(value)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _limit(self, provider, scope):
+        return self.limits.get(provider, {}).get(scope, (1, 1))
+
+    def _bucket(self, provider, destination=None):
+        key = (provider, destination)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                scope = 'provider' if destination is None else 'destination'
+                rate, capacity = self._limit(provider, scope)
+                bucket = TokenBucket(rate, capacity)
+                self.buckets[key] = bucket
+            return bucket
+
+    def provider_rate(self, provider):
+        return self._limit(provider, 'provider')[0]
+
+    def destination_rate(self, provider):
+        return self._limit(provider, 'destination')[0]
+
+    def wait_time(self, provider, destination):
+        """Seconds before a request to `destination` would be allowed"""
+        return max(self._bucket(provider).wait_time(),
+                   self._bucket(provider, destination).wait_time())
+
+    def acquire(self, provider, destination):
+        """Block until both the provider and destination buckets allow a request"""
+        provider_bucket = self._bucket(provider)
+        destination_bucket = self._bucket(provider, destination)
+        while True:
+            # Check the destination first so a busy chat doesn't burn provider tokens
+            wait = destination_bucket.wait_time()
+            if wait <= 0:
+                wait = provider_bucket.try_acquire()
+                if wait <= 0:
+                    wait = destination_bucket.try_acquire()
+                    if wait <= 0:
+                        return
+                    # Lost the race for the destination token; give the provider token back
+                    with provider_bucket.lock:
+                        provider_bucket.tokens = min(provider_bucket.capacity, provider_bucket.tokens + 1)
+            time.sleep(wait)
+
+    def penalize(self, provider, destination, retry_after, provider_wide=False):
+        """Honor a Retry-After for one destination (or the whole provider)"""
+        self._bucket(provider, destination).block_for(retry_after)
+        if provider_wide:
+            self._bucket(provider).block_for(retry_after)
+        logger.warning(f"{provider} rate limited ({destination}); backing off {retry_after:.1f}s")
+
+    @staticmethod
+    def retry_after(response, default=5.0):
+        """Extract the back-off delay from a 429 response, or None if not rate limited"""
+        if response.status_code != 429:
+            return None
+
+        # Telegram puts it in the JSON body
+        try:
+            data = response.json()
+            retry = data.get('parameters', {}).get('retry_after')
+            if retry is not None:
+                return float(retry)
+        except Exception:
+            pass
+
+        header = response.headers.get('Retry-After')
+        if header:
+            try:
+                return max(0.0, float(header))
+            except ValueError:
+                try:
+                    from email.utils import parsedate_to_datetime
+                    return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+                except Exception:
+                    pass
+
+        return default
+
+
+class FanOutScheduler:
+    """
+    Sends jobs to many destinations, every provider draining in parallel at its own rate.
+    Each job is a callable for a single (provider, destination) returning True/False;
+    it should call limiter.acquire() before every request it makes.
+    A job that raises RateLimitExceeded is re-queued after its back-off.
+    """
+
+    def __init__(self, limiter, workers_per_provider=None, max_retries=3, report_interval=10):
+        self.limiter = limiter
+        self.workers_per_provider = workers_per_provider or {'telegram': 4, 'callmebot': 1, 'gmail': 2}
+        self.max_retries = max_retries
+        self.report_interval = report_interval
+        self.queues = {}
+        self.in_flight = {}
+        self.results = {}
+        self.lock = threading.Condition()
+
+    def submit(self, provider, destination, func, *args, **kwargs):
+        """Queue a send for later; call run() to drain"""
+        with self.lock:
+            self.queues.setdefault(provider, deque()).append(
+                {'destination': destination, 'func': func, 'args': args, 'kwargs': kwargs, 'attempts': 0}
+            )
+            self.in_flight.setdefault(provider, 0)
+
+    def queue_depth(self):
+        """Jobs waiting (not counting in-flight) per provider"""
+        with self.lock:
+            return {provider: len(queue) for provider, queue in self.queues.items()}
+
+    def drain_eta(self):
+        """Estimated seconds until each provider's queue is empty"""
+        with self.lock:
+            etas = {}
+            for provider, queue in self.queues.items():
+                pending = len(queue) + self.in_flight.get(provider, 0)
+                per_destination = {}
+                for job in queue:
+                    per_destination[job['destination']] = per_destination.get(job['destination'], 0) + 1
+                busiest = max(per_destination.values(), default=0)
+                etas[provider] = max(pending / self.limiter.provider_rate(provider),
+                                     busiest / self.limiter.destination_rate(provider))
+            return etas
+
+    def status(self):
+        depths = self.queue_depth()
+        etas = self.drain_eta()
+        return {provider: {'queued': depths[provider], 'in_flight': self.in_flight.get(provider, 0),
+                           'eta_seconds': round(etas[provider], 1)}
+                for provider in depths}
+
+    def _next_job(self, provider):
+        """Pop the job whose destination is ready soonest; returns (job, wait)"""
+        queue = self.queues[provider]
+        if not queue:
+            return None, 0.0
+        best_index, best_wait = 0, None
+        for index, job in enumerate(queue):
+            wait = max(job.get('not_before', 0.0) - time.monotonic(),
+                       self.limiter.wait_time(provider, job['destination']))
+            if best_wait is None or wait < best_wait:
+                best_index, best_wait = index, wait
+            if wait <= 0:
+                break
+        if best_wait > 0:
+            return None, best_wait
+        job = queue[best_index]
+        del queue[best_index]
+        return job, 0.0
+
+    def _worker(self, provider):
+        while True:
+            with self.lock:
+                job, wait = self._next_job(provider)
+                if job is None:
+                    if not self.queues[provider] and self.in_flight[provider] == 0:
+                        self.lock.notify_all()
+                        return
+                    # Nothing ready: wait for a token, a new job or a peer finishing
+                    self.lock.wait(timeout=wait if wait > 0 else 0.5)
+                    continue
+                self.in_flight[provider] += 1
+
+            key = (provider, job['destination'])
+            started = time.perf_counter()
+            try:
+                ok = bool(job['func'](*job['args'], **job['kwargs']))
+                retry = None
+            except RateLimitExceeded as e:
+                ok, retry = False, e.retry_after
+            except Exception as e:
+                logger.error(f"Error sending via {provider} to {job['destination']}: {e}")
+                ok, retry = False, None
+            metrics.DELIVERY_SECONDS.observe(time.perf_counter() - started, channel=provider)
+            metrics.DELIVERIES.inc(channel=provider, result='ok' if ok else ('rate_limited' if retry is not None else 'failed'))
+
+            with self.lock:
+                self.in_flight[provider] -= 1
+                if retry is not None and job['attempts'] < self.max_retries:
+                    job['attempts'] += 1
+                    job['not_before'] = time.monotonic() + retry
+                    self.queues[provider].append(job)
+                else:
+                    self.results[key] = ok
+                self.lock.notify_all()
+
+    def run(self):
+        """Drain all queues, providers in parallel; returns {(provider, destination): bool}"""
+        threads = []
+        with self.lock:
+            providers = list(self.queues)
+        for provider in providers:
+            for i in range(self.workers_per_provider.get(provider, 1)):
+                thread = threading.Thread(target=self._worker, args=(provider,),
+                                          name=f"fanout-{provider}-{i}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        last_report = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+            if time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                for provider, info in self.status().items():
+                    if info['queued'] or info['in_flight']:
+                        logger.info(f"{provider}: {info['queued']} queued, {info['in_flight']} in flight, "
+                                    f"~{info['eta_seconds']}s to drain")
+
+        results, self.results = self.results, {}
+        with self.lock:
+            self.queues = {}
+            self.in_flight = {}
+        return results
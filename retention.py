@@ -0,0 +1,209 @@
+"""
+Retention Module
+Keeps the article history (parquet_export.py) from growing without bound, in tiers:
+full records stay in the hot dataset for hot_days; older months are reduced to metadata
+plus a hash of the summary and merged into one compressed segment per month in the warm
+dataset (data/history_warm/month=YYYY-MM/); warm months older than warm_days are dropped.
+Old run checkpoints are pruned as well. Runs as a background job after each digest.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import calendar
+import threading
+from datetime import datetime, timedelta
+import metrics
+from parquet_export import _pyarrow, history_filter, read_history
+
+logger = logging.getLogger(__name__)
+
+
+def _month_end(month):
+    """Last day ("YYYY-MM-DD") of a "YYYY-MM" month"""
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{month}-{calendar.monthrange(year, number)[1]:02d}"
+
+
+def _months(root):
+    """Months ("YYYY-MM") with a partition directory under root, oldest first"""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    return sorted(name[len('month='):] for name in names if name.startswith('month='))
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class RetentionManager:
+    def __init__(self, exporter=None, checkpoints=None, warm_root=None, hot_days=None, warm_days=None,
+                 checkpoint_days=None, compression_level=9, row_group_size=256 * 1024,
+                 report_file='data/retention_report.json'):
+        self.exporter = exporter        # ParquetExporter of the hot tier, or None when the export is off
+        self.checkpoints = checkpoints  # CheckpointStore to prune, or None
+        self.warm_root = warm_root or os.getenv('HISTORY_WARM_DIR', 'data/history_warm')
+        # Months move to the next tier once all of their days are older than these
+        self.hot_days = hot_days or int(os.getenv('HISTORY_HOT_DAYS', '90'))
+        self.warm_days = warm_days or int(os.getenv('HISTORY_WARM_DAYS', '730'))
+        self.checkpoint_days = checkpoint_days or int(os.getenv('CHECKPOINT_KEEP_DAYS', '30'))
+        self.compression_level = compression_level  # zstd level of warm segments: written once, read rarely
+        self.row_group_size = row_group_size
+        self.report_file = report_file
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self, now=None):
+        """Run a retention job in a background thread; False if the previous one is still running"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                logger.info("Retention job still running; skipping this one")
+                return False
+            # Not a daemon: a --once run waits for the job at exit instead of cutting it short
+            self.thread = threading.Thread(target=self._run_logged, args=(now,), name='retention')
+            self.thread.start()
+            return True
+
+    def _run_logged(self, now):
+        try:
+            self.run(now)
+        except Exception as e:
+            logger.error(f"Error in retention job: {e}", exc_info=True)
+
+    def run(self, now=None):
+        """Apply the tiers and prune checkpoints; returns (and saves) a report of what changed"""
+        now = now or datetime.now()
+        hot_cutoff = (now - timedelta(days=self.hot_days)).strftime('%Y-%m-%d')
+        warm_cutoff = (now - timedelta(days=self.warm_days)).strftime('%Y-%m-%d')
+        hot_months = _months(self.exporter.root) if self.exporter is not None and self.exporter.available() else []
+        demote = [m for m in hot_months if warm_cutoff <= _month_end(m) < hot_cutoff]
+        # Months past both tiers are dropped straight from whichever tier holds them
+        expired_hot = [m for m in hot_months if _month_end(m) < warm_cutoff]
+        expired_warm = [m for m in _months(self.warm_root) if _month_end(m) < warm_cutoff]
+        measure = bool(hot_months) and bool(demote or expired_hot)
+        report = {'date': now.strftime('%Y-%m-%d %H:%M'), 'demoted_months': demote,
+                  'dropped_months': sorted(set(expired_hot + expired_warm)), 'rows_demoted': 0,
+                  'checkpoints_pruned': 0, 'bytes_before': self._sizes(),
+                  'latency_before': self._query_latency(now) if measure else {}}
+
+        with metrics.STAGE_SECONDS.time(stage='retention'):
+            for month in demote:
+                report['rows_demoted'] += self._demote(month)
+            for month in expired_hot:
+                with self.exporter.lock:
+                    shutil.rmtree(os.path.join(self.exporter.root, f'month={month}'), ignore_errors=True)
+            for month in expired_warm:
+                shutil.rmtree(os.path.join(self.warm_root, f'month={month}'), ignore_errors=True)
+            if self.checkpoints is not None:
+                report['checkpoints_pruned'] = self.checkpoints.prune(self.checkpoint_days, now)
+
+        report['bytes_after'] = self._sizes()
+        report['latency_after'] = self._query_latency(now) if measure else {}
+        self._report(report)
+        return report
+
+    def _demote(self, month):
+        """Move a hot month to the warm tier as one segment; returns the number of rows moved"""
+        pa, ds = _pyarrow()
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        month_dir = os.path.join(self.exporter.root, f'month={month}')
+        segment_dir = os.path.join(self.warm_root, f'month={month}')
+        with self.exporter.lock:
+            hot = ds.dataset(month_dir, format='parquet',
+                             partitioning=ds.partitioning(pa.schema([('source', pa.string())]), flavor='hive')).to_table()
+            summary_hash = pa.array([hashlib.sha1(summary.encode('utf-8')).hexdigest()[:16] if summary else None
+                                     for summary in hot.column('summary').to_pylist()], pa.string())
+            table = pa.table({
+                'run_id': hot.column('run_id').cast(pa.string()),
+                'source': hot.column('source'),
+                'date': hot.column('date'),
+                'title': hot.column('title'),
+                'link': hot.column('link'),
+                'summary_hash': summary_hash,
+                'published': hot.column('published'),
+                'score': hot.column('score'),
+            })
+
+            segment_path = os.path.join(segment_dir, 'segment.parquet')
+            if os.path.exists(segment_path):
+                # A late article landed in an already demoted month (or a demotion was interrupted
+                # after writing its segment): merge, without the rows of runs being moved again
+                existing = pq.read_table(segment_path)
+                keys = pc.binary_join_element_wise(table.column('run_id'), table.column('link'), '\x1f')
+                existing_keys = pc.binary_join_element_wise(existing.column('run_id'), existing.column('link'), '\x1f')
+                existing = existing.filter(pc.invert(pc.is_in(existing_keys, keys)))
+                table = pa.concat_tables([existing, table])
+            table = table.sort_by([('date', 'ascending'), ('published', 'ascending')])
+
+            os.makedirs(segment_dir, exist_ok=True)
+            tmp_path = os.path.join(segment_dir, f'.segment-{os.getpid()}.parquet')
+            pq.write_table(table, tmp_path, compression='zstd', compression_level=self.compression_level,
+                           row_group_size=self.row_group_size, use_dictionary=['run_id', 'source', 'date'])
+            os.replace(tmp_path, segment_path)
+            shutil.rmtree(month_dir)
+        logger.info(f"Moved {hot.num_rows} articles of {month} to the warm history tier")
+        return hot.num_rows
+
+    def _sizes(self):
+        sizes = {'warm': _dir_size(self.warm_root)}
+        if self.exporter is not None:
+            sizes['hot'] = _dir_size(self.exporter.root)
+        if self.checkpoints is not None:
+            sizes['checkpoints'] = _dir_size(self.checkpoints.base_dir)
+        return sizes
+
+    def _query_latency(self, now):
+        """Seconds for a scan of the hot tier and for a last-7-days query, as analytics would run them"""
+        if not os.path.isdir(self.exporter.root):
+            return {}
+        since = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+        latency = {}
+        for name, kwargs in (('full_scan', {}), ('last_7_days', {'since': since})):
+            started = time.perf_counter()
+            read_history(self.exporter.root, columns=['source', 'score'], **kwargs)
+            latency[name] = round(time.perf_counter() - started, 4)
+        return latency
+
+    def _report(self, report):
+        before, after = report['bytes_before'], report['bytes_after']
+        sizes = ', '.join(f"{tier} {before.get(tier, 0) / 1e6:.1f} -> {after.get(tier, 0) / 1e6:.1f} MB"
+                          for tier in after)
+        latency = ', '.join(f"{name} {report['latency_before'][name] * 1000:.0f} -> {seconds * 1000:.0f} ms"
+                            for name, seconds in report['latency_after'].items() if name in report['latency_before'])
+        logger.info(f"Retention: {len(report['demoted_months'])} month(s) ({report['rows_demoted']} articles) moved "
+                    f"to warm, {len(report['dropped_months'])} dropped, {report['checkpoints_pruned']} checkpoint(s) "
+                    f"pruned; {sizes}" + (f"; hot queries {latency}" if latency else ""))
+        if not self.report_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.report_file) or '.', exist_ok=True)
+            with open(self.report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except Exception as e:
+            logger.error(f"Error saving retention report: {e}")
+
+
+def read_warm(root='data/history_warm', columns=None, sources=None, since=None, until=None, min_score=None):
+    """pyarrow Table of warm-tier articles (no summaries, a summary_hash instead); filters as in read_history"""
+    modules = _pyarrow()
+    if modules is None:
+        raise ImportError("Reading the Parquet history requires pyarrow (pip install pyarrow)")
+    _, ds = modules
+    dataset = ds.dataset(root, format='parquet', partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    return dataset.to_table(columns=columns, filter=history_filter(ds, sources, since, until, min_score))
+
+
+if __name__ == "__main__":
+    # Run a retention job now, in the foreground
+    from logging_setup import setup_logging
+    from checkpoint import CheckpointStore
+    from parquet_export import ParquetExporter
+    setup_logging()
+    print(json.dumps(RetentionManager(ParquetExporter(), CheckpointStore()).run(), indent=2))
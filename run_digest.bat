@@ -5,7 +5,7 @@ echo.
 cd /d C:\Users\axajo\OneDrive\Desktop\tech-news-digest
 
 echo Checking/installing all required packages...
-venv\Scripts\python.exe -m pip install --quiet requests beautifulsoup4 feedparser python-dotenv schedule
+venv\Scripts\python.exe -m pip install --quiet requests beautifulsoup4 feedparser python-dotenv tzdata
 
 echo.
 echo Running digest script...
@@ -0,0 +1,224 @@
+"""
+Scheduler Module
+Event-driven job scheduler: sleeps until the next due job instead of polling
+"""
+
+import os
+import heapq
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_POLICIES = ('skip', 'queue', 'parallel')
+
+
+def _get_timezone(name):
+    """ZoneInfo for name, or None for the system's local time"""
+    if not name:
+        return None
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(name)
+
+
+class CronTrigger:
+    """
+    Standard 5-field cron expression (minute hour day-of-month month day-of-week)
+    evaluated in a given timezone. Supports *, lists, ranges and steps.
+    "HH:MM" is accepted as shorthand for a daily run.
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]  # Day of week: 0 and 7 are Sunday
+
+    def __init__(self, expression, tz=None):
+        if ':' in expression and ' ' not in expression.strip():
+            hour, minute = expression.strip().split(':')
+            expression = f"{int(minute)} {int(hour)} * * *"
+        self.expression = expression
+        self.tz = _get_timezone(tz)
+
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression '{expression}': expected 5 fields")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        )
+        self.weekdays = sorted({day % 7 for day in self.weekdays})
+        # Cron rule: if both day fields are restricted, either one matching is enough
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/')
+                step = int(step)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-'))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field '{field}'")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def _day_matches(self, day):
+        cron_weekday = (day.weekday() + 1) % 7  # cron: 0 = Sunday
+        in_days = day.day in self.days
+        in_weekdays = cron_weekday in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, moment):
+        """First fire time strictly after `moment` (aware datetime), returned in UTC"""
+        # Work in naive wall-clock time of the trigger's timezone
+        local = moment.astimezone(self.tz).replace(second=0, microsecond=0, tzinfo=None) + timedelta(minutes=1)
+        day = local.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if day.month in self.months and self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= local:
+                            if self.tz is None:
+                                return candidate.astimezone().astimezone(timezone.utc)
+                            return candidate.replace(tzinfo=self.tz).astimezone(timezone.utc)
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+    def __str__(self):
+        return f"{self.expression} ({self.tz or 'local time'})"
+
+
+class Job:
+    def __init__(self, name, trigger, func, overlap='skip', catch_up=True):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy '{overlap}'. Choose from: {', '.join(OVERLAP_POLICIES)}")
+        self.name = name
+        self.trigger = trigger
+        self.func = func
+        self.overlap = overlap
+        self.catch_up = catch_up  # Run once on start if a fire time was missed while down
+        self.running = 0
+        self.queued = 0
+        self.next_run = None
+
+
+class Scheduler:
+    def __init__(self, max_workers=4, state_file='data/scheduler_state.json'):
+        self.jobs = {}
+        self.heap = []
+        self.sequence = 0
+        self.state_file = state_file
+        self.state = self._load_state()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+        except Exception as e:
+            logger.error(f"Error saving scheduler state: {e}")
+
+    def _push(self, job, when):
+        job.next_run = when
+        self.sequence += 1
+        heapq.heappush(self.heap, (when.timestamp(), self.sequence, job))
+
+    def add_job(self, name, trigger, func, overlap='skip', catch_up=True):
+        """Register a job; it is timed from now (plus a catch-up run if one was missed)"""
+        job = Job(name, trigger, func, overlap, catch_up)
+        now = datetime.now(timezone.utc)
+        with self.condition:
+            self.jobs[name] = job
+            last_fire = self.state.get(name, {}).get('last_fire')
+            if last_fire is None:
+                # First time this job is seen: run right away, as the old scheduler did on startup
+                self._push(job, now)
+            elif catch_up and trigger.next_after(datetime.fromisoformat(last_fire)) <= now:
+                logger.info(f"Job {name} missed a run since {last_fire}; catching up now")
+                self._push(job, now)
+            else:
+                self._push(job, trigger.next_after(now))
+            self.condition.notify()
+        logger.info(f"Scheduled {name} [{trigger}], next run {job.next_run.astimezone(trigger.tz):%Y-%m-%d %H:%M %Z}")
+        return job
+
+    def _dispatch(self, job, fired_at):
+        """Start a job according to its overlap policy (called with the lock held)"""
+        self.state[job.name] = {'last_fire': fired_at.isoformat()}
+        self._save_state()
+
+        if job.running and job.overlap == 'skip':
+            logger.warning(f"Job {job.name} is still running; skipping this run")
+            return
+        if job.running and job.overlap == 'queue':
+            job.queued += 1
+            logger.info(f"Job {job.name} is still running; queued ({job.queued} waiting)")
+            return
+        job.running += 1
+        self.executor.submit(self._run_job, job)
+
+    def _run_job(self, job):
+        while True:
+            started = time.monotonic()
+            logger.info(f"Running job {job.name}")
+            try:
+                job.func()
+            except Exception as e:
+                logger.error(f"Job {job.name} failed: {e}", exc_info=True)
+            logger.info(f"Job {job.name} finished in {time.monotonic() - started:.1f}s")
+
+            with self.condition:
+                if job.queued:
+                    # Queued runs start as soon as the previous one finishes
+                    job.queued -= 1
+                    continue
+                job.running -= 1
+                return
+
+    def run_forever(self):
+        """Sleep until the next due job, run it, repeat (until stop())"""
+        with self.condition:
+            while not self.stopped:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                due, _, job = self.heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    # Capped so a suspended machine or clock change is noticed within the hour
+                    self.condition.wait(timeout=min(delay, 3600))
+                    continue
+                heapq.heappop(self.heap)
+                fired_at = datetime.now(timezone.utc)
+                self._dispatch(job, fired_at)
+                self._push(job, job.trigger.next_after(fired_at))
+                logger.info(f"Next run of {job.name}: {job.next_run.astimezone(job.trigger.tz):%Y-%m-%d %H:%M %Z}")
+        self.executor.shutdown(wait=True)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
@@ -0,0 +1,299 @@
+"""
+Server Module
+Local HTTP API serving the latest digest and article queries from memory,
+with ETag/304, gzip and incremental reloads when a new run completes
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import bisect
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from checkpoint import CheckpointStore
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+# Smaller bodies aren't worth compressing
+GZIP_MIN_BYTES = 512
+
+
+def _tokens(text):
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+class DigestStore:
+    """
+    The latest completed run held in memory, with indexes by source, date and keyword.
+    Reloads apply only the articles that changed between runs.
+    """
+
+    def __init__(self, checkpoints=None):
+        self.checkpoints = checkpoints or CheckpointStore()
+        self.lock = threading.RLock()
+        self.run_id = None
+        self.version = 0
+        self.loaded_at = None
+        self.stage_hashes = {}
+        self.articles = {}    # link -> article
+        self.ranked = []
+        self.rendered = {}
+        self.by_source = {}   # source -> set of links
+        self.by_date = {}     # YYYY-MM-DD -> set of links
+        self.dates = []       # sorted keys of by_date
+        self.by_token = {}    # word -> set of links
+
+    def _latest_complete_run(self):
+        """Newest run whose rank and render stages have finished (the newest run may still be in progress)"""
+        try:
+            runs = sorted(os.listdir(self.checkpoints.base_dir), reverse=True)
+        except FileNotFoundError:
+            return None
+        for run_id in runs:
+            if {'rank', 'render'} <= set(self.checkpoints.completed_stages(run_id)):
+                return run_id
+        return None
+
+    def reload(self):
+        """Load the latest completed run if it changed; returns True when anything was updated"""
+        run_id = self._latest_complete_run()
+        if run_id is None:
+            return False
+        stages = self.checkpoints.load_manifest(run_id)['stages']
+        hashes = {stage: info['output_hash'] for stage, info in stages.items()}
+        if run_id == self.run_id and hashes == self.stage_hashes:
+            return False
+
+        changed = [stage for stage in ('scrape', 'rank', 'render')
+                   if stage in hashes and hashes[stage] != self.stage_hashes.get(stage)]
+        outputs = {stage: self.checkpoints.load(run_id, stage) for stage in changed}
+
+        with self.lock:
+            if 'scrape' in outputs:
+                added, removed = self._apply_articles(outputs['scrape'] or [])
+                logger.info(f"Articles: +{added} / -{removed} ({len(self.articles)} indexed)")
+            if 'rank' in outputs:
+                self.ranked = outputs['rank'] or []
+            if 'render' in outputs:
+                self.rendered = outputs['render'] or {}
+            self.run_id = run_id
+            self.stage_hashes = hashes
+            self.loaded_at = time.strftime('%Y-%m-%d %H:%M:%S')
+            self.version += 1
+        logger.info(f"Serving run {run_id} (reloaded: {', '.join(changed) or 'manifest'})")
+        return True
+
+    def _apply_articles(self, articles):
+        """Diff against the indexed articles by link and update only what changed"""
+        incoming = {a['link']: a for a in articles if a.get('link')}
+        removed = [link for link, article in self.articles.items() if incoming.get(link) != article]
+        added = [link for link, article in incoming.items() if self.articles.get(link) != article]
+        for link in removed:
+            self._unindex(link, self.articles.pop(link))
+        for link in added:
+            self.articles[link] = incoming[link]
+            self._index(link, incoming[link])
+        return len(added), len(removed)
+
+    def _index(self, link, article):
+        self.by_source.setdefault(article.get('source', ''), set()).add(link)
+        date = article.get('published', '')[:10]
+        if date[:1].isdigit():
+            if date not in self.by_date:
+                bisect.insort(self.dates, date)
+            self.by_date.setdefault(date, set()).add(link)
+        for token in _tokens(f"{article.get('title', '')} {article.get('summary', '')}"):
+            self.by_token.setdefault(token, set()).add(link)
+
+    def _unindex(self, link, article):
+        for index, key in [(self.by_source, article.get('source', ''))] + \
+                          [(self.by_date, article.get('published', '')[:10])] + \
+                          [(self.by_token, t) for t in _tokens(f"{article.get('title', '')} {article.get('summary', '')}")]:
+            links = index.get(key)
+            if links is not None:
+                links.discard(link)
+                if not links:
+                    del index[key]
+                    if index is self.by_date:
+                        self.dates.remove(key)
+
+    def query(self, source=None, date=None, since=None, q=None, limit=50):
+        """Articles matching all given filters, newest first"""
+        with self.lock:
+            candidates = None
+
+            def narrow(links):
+                nonlocal candidates
+                candidates = set(links) if candidates is None else candidates & links
+
+            if source:
+                narrow(self.by_source.get(source, set()))
+            if date:
+                narrow(self.by_date.get(date, set()))
+            if since:
+                recent = set()
+                for day in self.dates[bisect.bisect_left(self.dates, since):]:
+                    recent |= self.by_date[day]
+                narrow(recent)
+            if q:
+                words = WORD_PATTERN.findall(q.lower())
+                for word in sorted(words, key=lambda w: len(self.by_token.get(w, ()))):
+                    narrow(self.by_token.get(word, set()))
+                if len(words) > 1:
+                    # Multi-word queries match as a phrase
+                    phrase = ' '.join(words)
+                    candidates = {link for link in candidates
+                                  if phrase in f"{self.articles[link]['title']} {self.articles[link]['summary']}".lower()}
+
+            links = self.articles.keys() if candidates is None else candidates
+            matches = sorted((self.articles[link] for link in links),
+                             key=lambda a: a.get('published', ''), reverse=True)
+        return matches[:limit]
+
+    def sources(self):
+        with self.lock:
+            return {source: len(links) for source, links in sorted(self.by_source.items())}
+
+
+class ResponseCache:
+    """Encoded response bodies (plain and gzip) with their ETags, per store version"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        content_type, body = build()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        entry = (content_type, body, compressed, etag)
+        with self.lock:
+            self.entries[key] = entry
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+
+class DigestServer:
+    def __init__(self, store=None, host='127.0.0.1', port=8080, reload_interval=10):
+        self.store = store or DigestStore()
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.cache = ResponseCache()
+        self.httpd = None
+        self.stopped = threading.Event()
+
+    def _json(self, data):
+        return 'application/json; charset=utf-8', json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def route(self, path, params):
+        """Return a (content_type, body) builder for a request, or None for 404"""
+        store = self.store
+        first = lambda name: params.get(name, [None])[0]
+
+        if path == '/health':
+            return lambda: self._json({'run_id': store.run_id, 'loaded_at': store.loaded_at,
+                                       'articles': len(store.articles)})
+        if path == '/digest':
+            return lambda: self._json({'run_id': store.run_id, 'articles': store.ranked})
+        if path == '/digest/email':
+            return lambda: ('text/html; charset=utf-8', store.rendered.get('email_html', '').encode('utf-8'))
+        if path == '/digest/text':
+            return lambda: ('text/plain; charset=utf-8', store.rendered.get('whatsapp_message', '').encode('utf-8'))
+        if path == '/sources':
+            return lambda: self._json(store.sources())
+        if path == '/articles':
+            try:
+                limit = min(int(first('limit') or 50), 1000)
+            except ValueError:
+                limit = 50
+            return lambda: self._json(store.query(source=first('source'), date=first('date'),
+                                                  since=first('since'), q=first('q'), limit=limit))
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class DigestHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive
+            # Headers and body go out in separate writes; without this, Nagle's algorithm
+            # and delayed ACKs add ~40 ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body):
+                url = urlsplit(self.path)
+                builder = server.route(url.path.rstrip('/') or '/', parse_qs(url.query))
+                if builder is None:
+                    self.send_error(404)
+                    return
+                content_type, body, compressed, etag = server.cache.get((server.store.version, self.path), builder)
+
+                if etag in self.headers.get('If-None-Match', ''):
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                use_gzip = compressed is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+                payload = compressed if use_gzip else body
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Vary', 'Accept-Encoding')
+                if use_gzip:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+        return DigestHandler
+
+    def _watch(self):
+        """Poll the checkpoint manifests and reload when a new run completes"""
+        while not self.stopped.wait(self.reload_interval):
+            try:
+                self.store.reload()
+            except Exception as e:
+                logger.error(f"Error reloading digest: {e}")
+
+    def start(self):
+        """Load the latest run and serve from background threads"""
+        self.store.reload()
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self._watch, name='digest-reload', daemon=True).start()
+        threading.Thread(target=self.httpd.serve_forever, name='digest-http', daemon=True).start()
+        logger.info(f"Serving digest API on http://{self.host}:{self.port}/ (run {self.store.run_id})")
+
+    def stop(self):
+        self.stopped.set()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
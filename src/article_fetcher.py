@@ -0,0 +1,292 @@
+"""
+Article Fetcher Module
+Optional full-text stage: downloads the pages behind the top-ranked articles with a bounded
+number of concurrent requests per host, keeps their main text with a one-pass boilerplate
+filter (stdlib only), and caches that text on disk by canonical URL until it expires
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, wait
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_FETCHES = metrics.registry.counter('digest_article_fetch_total', 'Full-article page lookups', ['result'])
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|dclid|mc_cid|mc_eid|ref|ref_src|cmpid|ocid|guccounter)$', re.I)
+MAX_TEXT_CHARS = 20000
+# Error statuses worth caching: the page is gone, not just unavailable right now
+PERMANENT_STATUSES = {404, 410}
+
+
+def canonical_url(url):
+    """
+    Cache identity of a page: lowercase scheme and host, no default port, fragment or
+    tracking parameters, remaining query parameters sorted, no trailing slash
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'http'
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{port}'
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class _ContentExtractor(HTMLParser):
+    """One pass over a page, collecting text blocks (with their link text length) outside page chrome"""
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer', 'aside', 'form',
+                 'iframe', 'button', 'select', 'figure'}
+    BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'blockquote', 'pre', 'table', 'tr',
+                  'td', 'dd', 'dt', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    CONTENT_TAGS = {'article', 'main'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skipping = 0
+        self.content_depth = 0
+        self.link_depth = 0
+        self.parts = []
+        self.link_chars = 0
+        self.blocks = []  # (text, characters inside links, inside <article>/<main>)
+
+    def flush(self):
+        text = ' '.join(''.join(self.parts).split())
+        if text:
+            self.blocks.append((text, self.link_chars, self.content_depth > 0))
+        self.parts = []
+        self.link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skipping += 1
+            return
+        if tag in self.BLOCK_TAGS:
+            self.flush()
+        if tag in self.CONTENT_TAGS:
+            self.content_depth += 1
+        elif tag == 'a':
+            self.link_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            if self.skipping:
+                self.skipping -= 1
+            return
+        if tag in self.BLOCK_TAGS:
+            self.flush()
+        if tag in self.CONTENT_TAGS and self.content_depth:
+            self.content_depth -= 1
+        elif tag == 'a' and self.link_depth:
+            self.link_depth -= 1
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        self.parts.append(data)
+        if self.link_depth:
+            self.link_chars += len(data)
+
+
+def extract_text(page, min_block_chars=40, max_link_density=0.4):
+    """
+    Main text of an HTML page: its text blocks of at least min_block_chars that are mostly
+    not links (menus, related-story lists, bylines and buttons are short or link-heavy). When
+    the page marks its article with <article> or <main>, only blocks inside it are kept.
+    """
+    extractor = _ContentExtractor()
+    try:
+        extractor.feed(page)
+        extractor.close()
+    except Exception as e:
+        logger.debug(f"HTML parse stopped early: {e}")
+    extractor.flush()
+    blocks = [(text, in_content) for text, link_chars, in_content in extractor.blocks
+              if len(text) >= min_block_chars and link_chars <= max_link_density * len(text)]
+    content = [text for text, in_content in blocks if in_content]
+    texts = content if sum(len(t) for t in content) >= 200 else [text for text, _ in blocks]
+    return '\n'.join(texts)[:MAX_TEXT_CHARS]
+
+
+class ArticleFetcher:
+    def __init__(self, cache_dir='data/article_cache', ttl_days=None, max_workers=None, per_host=None,
+                 candidates=None, deadline_seconds=None, timeout=(5, 10), max_bytes=2 << 20):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = float(ttl_days or os.getenv('FETCH_CACHE_DAYS', '7')) * 86400
+        self.max_workers = max_workers or int(os.getenv('FETCH_WORKERS', '8'))
+        self.per_host = per_host or int(os.getenv('FETCH_PER_HOST', '2'))       # Concurrent requests to one site
+        self.candidates = candidates or int(os.getenv('FETCH_CANDIDATES', '20'))  # Top-ranked articles to fetch
+        self.deadline_seconds = deadline_seconds or float(os.getenv('FETCH_DEADLINE', '60'))
+        self.timeout = timeout      # (connect, read) seconds per request
+        self.max_bytes = max_bytes  # Pages are cut off here
+        self.headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        self.host_slots = {}  # host[:port] -> semaphore with per_host slots
+        self.in_flight = {}   # canonical URL -> Event set once its fetch finishes
+        self.lock = threading.Lock()
+
+    def _path(self, canonical):
+        key = hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def _read_cache(self, canonical):
+        """Cached text ('' for pages without any), or None if missing or expired"""
+        path = self._path(canonical)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['text']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, canonical, status, text):
+        try:
+            path = self._path(canonical)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': canonical, 'status': status, 'text': text}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing article cache entry: {e}")
+
+    def _host_slot(self, host):
+        with self.lock:
+            return self.host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+
+    def _download(self, url, deadline):
+        """(HTTP status, page text) within the deadline; text is None for error statuses and non-HTML pages"""
+        import requests
+
+        slot = self._host_slot(urlsplit(url).netloc.lower())
+        if not slot.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError('fetch deadline reached waiting for the host')
+        try:
+            timeout = tuple(min(t, max(0.1, deadline - time.monotonic())) for t in self.timeout)
+            with requests.get(url, headers=self.headers, timeout=timeout, stream=True) as response:
+                content_type = response.headers.get('Content-Type', '')
+                if response.status_code >= 400 or 'html' not in content_type:
+                    return response.status_code, None
+                body = bytearray()
+                for chunk in response.iter_content(65536):
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError('fetch deadline reached while downloading')
+                match = re.search(r'charset=([\w-]+)', content_type)
+                status, encoding = response.status_code, match.group(1) if match else 'utf-8'
+        finally:
+            slot.release()
+        try:
+            return status, body.decode(encoding, 'replace')
+        except LookupError:
+            return status, body.decode('utf-8', 'replace')
+
+    def _fetch(self, url, canonical, deadline):
+        """Extracted text of one page, or None if it couldn't be fetched; each page is fetched once at a time"""
+        while True:
+            with self.lock:
+                waiting = self.in_flight.get(canonical)
+                if waiting is None:
+                    self.in_flight[canonical] = threading.Event()
+                    break
+            # Another caller (e.g. a parallel edition) is fetching this page: use its result
+            waiting.wait(max(0.0, deadline - time.monotonic()))
+            return self._read_cache(canonical)
+
+        try:
+            cached = self._read_cache(canonical)
+            if cached is not None:
+                ARTICLE_FETCHES.inc(result='cache')
+                return cached
+            status, page = self._download(url, deadline)
+            text = extract_text(page) if page else ''
+            if 200 <= status < 300 or status in PERMANENT_STATUSES:
+                # Dead links and non-HTML pages are cached too (as ''), so they aren't requested every run;
+                # transient errors (rate limits, timeouts, server errors) are retried next time
+                self._write_cache(canonical, status, text)
+            ARTICLE_FETCHES.inc(result='fetched' if text else 'empty')
+            return text
+        except Exception as e:
+            ARTICLE_FETCHES.inc(result='failed')
+            logger.warning(f"Could not fetch article {url}: {e}")
+            return None
+        finally:
+            with self.lock:
+                self.in_flight.pop(canonical).set()
+
+    def fetch_texts(self, urls):
+        """
+        Main text of each URL's page, in order: '' when the page has none, None when it could not
+        be fetched before the deadline. Each canonical URL is looked up once; cached pages are
+        served without a request.
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        canonicals = [canonical_url(url) for url in urls]
+        texts = {}
+        by_host = {}
+        for url, canonical in zip(urls, canonicals):
+            if canonical in texts:
+                continue
+            texts[canonical] = self._read_cache(canonical)
+            if texts[canonical] is None:
+                by_host.setdefault(urlsplit(canonical).netloc, []).append((url, canonical))
+            else:
+                ARTICLE_FETCHES.inc(result='cache')
+        cached = sum(1 for text in texts.values() if text is not None)
+
+        # Round-robin over hosts, so workers don't all queue up for one site's slots
+        queued = [by_host[host][i] for i in range(max(map(len, by_host.values()), default=0))
+                  for host in by_host if i < len(by_host[host])]
+        if queued:
+            pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(queued)), thread_name_prefix='article-fetch')
+            futures = {pool.submit(self._fetch, url, canonical, deadline): canonical for url, canonical in queued}
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            pool.shutdown(wait=False, cancel_futures=True)
+            for future in done:
+                texts[futures[future]] = future.result()
+
+        fetched = sum(1 for text in texts.values() if text is not None) - cached
+        logger.info(f"Full article text: {cached} cached, {fetched} fetched, "
+                    f"{len(texts) - cached - fetched} failed or timed out ({len(texts)} pages)")
+        return [texts[canonical] for canonical in canonicals]
+
+    def prune(self):
+        """Delete cached pages older than the TTL; returns how many"""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+        except Exception as e:
+            logger.error(f"Error pruning article cache: {e}")
+        return removed
+
+
+if __name__ == "__main__":
+    # Print the extracted text of one page: python article_fetcher.py URL
+    import sys
+    from logging_setup import setup_logging
+    setup_logging()
+    print(ArticleFetcher().fetch_texts(sys.argv[1:2])[0])
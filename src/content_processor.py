@@ -6,15 +6,19 @@ Filters, ranks, and formats news articles
 import json
 import logging
 from datetime import datetime
+from summarizer import Summarizer, SUMMARIZER_VERSION
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever format_for_email / format_for_whatsapp output changes, so cached renders are not reused
+TEMPLATE_VERSION = 4
+
 
 class ContentProcessor:
-    def __init__(self):
-        # Keywords that indicate important AI/tech news
-        self.priority_keywords = [
+    def __init__(self, priority_keywords=None, exclude_keywords=None, title='AI & Tech'):
+        self.title = title  # Digest name used in headings
+        # Keywords that indicate important AI/tech news (editions can override both lists)
+        self.priority_keywords = priority_keywords or [
             'breakthrough', 'launch', 'release', 'new model', 'gpt', 'claude',
             'gemini', 'llm', 'ai model', 'open source', 'announcement',
             'research', 'study', 'mit', 'stanford', 'deepmind', 'openai',
@@ -23,21 +27,31 @@ class ContentProcessor:
             'robotics', 'autonomous', 'self-driving', 'quantum'
         ]
 
-        self.exclude_keywords = [
+        self.exclude_keywords = exclude_keywords if exclude_keywords is not None else [
             'sponsored', 'advertisement', 'ad:', 'promoted'
         ]
+        self.trends = None  # Optional TrendTracker; adds a boost for bursting topics
+        self.stories = None  # Optional StoryClusterer; demotes threads covered for many days
+        self.summarizer = Summarizer()  # Per-channel extractive summaries
+
+    def render_settings(self):
+        """Everything besides the articles and templates that changes the formatted output"""
+        return {'title': self.title, 'summary_chars': self.summarizer.budgets, 'summarizer': SUMMARIZER_VERSION}
 
     def rank_article(self, article):
         """Assign relevance score to article"""
         score = 0
         title_lower = article['title'].lower()
         summary_lower = article['summary'].lower()
+        # Full article text (when fetched) counts like the summary for priority keywords; exclusions stay
+        # on title and summary, since a long article can mention an excluded topic in passing
+        body_lower = f"{summary_lower}\n{article['content'].lower()}" if article.get('content') else summary_lower
 
         # Check for priority keywords
         for keyword in self.priority_keywords:
             if keyword in title_lower:
                 score += 3
-            if keyword in summary_lower:
+            if keyword in body_lower:
                 score += 1
 
         # Penalize excluded content
@@ -45,6 +59,14 @@ class ContentProcessor:
             if keyword in title_lower or keyword in summary_lower:
                 score -= 10
 
+        # Boost stories on topics that many sources picked up at once
+        if self.trends is not None:
+            score += self.trends.boost(article)
+
+        # Demote follow-ups to stories that have run for days
+        if self.stories is not None:
+            score -= self.stories.demotion(article)
+
         return score
 
     def filter_and_rank(self, articles, min_score=1, max_articles=15):
@@ -76,31 +98,35 @@ class ContentProcessor:
                 .article a:hover {{ text-decoration: underline; }}
                 .meta {{ color: #7f8c8d; font-size: 0.9em; margin-top: 5px; }}
                 .summary {{ margin-top: 10px; }}
+                .story {{ color: #e67e22; font-size: 0.9em; margin-bottom: 5px; }}
                 .footer {{ margin-top: 40px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; color: #7f8c8d; font-size: 0.9em; }}
             </style>
         </head>
         <body>
-            <h1>🚀 Your Daily AI & Tech News Digest</h1>
+            <h1>🚀 Your Daily {self.title} News Digest</h1>
             <p><strong>Date:</strong> {datetime.now().strftime('%B %d, %Y')}</p>
-            <p>Here are today's top {len(articles)} AI and technology stories:</p>
+            <p>Here are today's top {len(articles)} {self.title} stories:</p>
         """
 
-        for i, article in enumerate(articles, 1):
+        summaries = self.summarizer.summarize([a.get('content') or a['summary'] for a in articles], 'email')
+        for i, (article, summary) in enumerate(zip(articles, summaries), 1):
+            story = self._story_line(article, '<div class="story">🔄 Update to story: {title} (day {day})</div>')
             html += f"""
             <div class="article">
+                {story}
                 <h3>{i}. {article['title']}</h3>
                 <div class="meta">
                     <strong>Source:</strong> {article['source'].replace('_', ' ').title()} | 
                     <strong>Published:</strong> {article['published']}
                 </div>
-                <div class="summary">{article['summary']}</div>
+                <div class="summary">{summary}</div>
                 <p><a href="{article['link']}" target="_blank">Read full article →</a></p>
             </div>
             """
 
-        html += """
+        html += f"""
             <div class="footer">
-                <p>You're receiving this because you subscribed to daily AI & Tech news updates.</p>
+                <p>You're receiving this because you subscribed to daily {self.title} news updates.</p>
                 <p>Stay curious! 🧠</p>
             </div>
         </body>
@@ -110,21 +136,42 @@ class ContentProcessor:
 
     def format_for_whatsapp(self, articles):
         """Format articles as plain text for WhatsApp"""
-        text = f"🚀 *Daily AI & Tech News* - {datetime.now().strftime('%b %d, %Y')}\n\n"
+        text = f"🚀 *Daily {self.title} News* - {datetime.now().strftime('%b %d, %Y')}\n\n"
         text += f"Top {len(articles)} stories today:\n"
         text += "━━━━━━━━━━━━━━━━━━━━\n\n"
 
-        for i, article in enumerate(articles, 1):
+        summaries = self.summarizer.summarize([a.get('content') or a['summary'] for a in articles], 'whatsapp')
+        for i, (article, summary) in enumerate(zip(articles, summaries), 1):
+            text += self._story_line(article, "🔄 _Update to story: {title} (day {day})_\n")
             text += f"*{i}. {article['title']}*\n"
             text += f"📰 {article['source'].replace('_', ' ').title()}\n"
             text += f"📅 {article['published']}\n\n"
-            text += f"{article['summary'][:200]}...\n\n"
+            if summary:
+                text += f"{summary}\n\n"
             text += f"🔗 {article['link']}\n"
             text += "━━━━━━━━━━━━━━━━━━━━\n\n"
 
         text += "Stay curious! 🧠"
         return text
 
+    @staticmethod
+    def _story_line(article, template):
+        """template filled with the article's story thread, if it continues one from an earlier day"""
+        story = article.get('story')
+        if not story or not story['update']:
+            return ''
+        return template.format(title=story['title'], day=story['day'])
+
+    def format_alert(self, article):
+        """Format a single breaking-news article as a short plain-text alert"""
+        text = f"⚡ *Breaking: {article['title']}*\n"
+        text += f"📰 {article['source'].replace('_', ' ').title()} | 📅 {article['published']}\n\n"
+        summary = self.summarizer.summarize([article.get('content') or article['summary']], 'alert')[0]
+        if summary:
+            text += f"{summary}\n\n"
+        text += f"🔗 {article['link']}"
+        return text
+
     def process_articles(self, articles_file='data/articles.json'):
         """Main processing pipeline"""
         try:
@@ -149,6 +196,9 @@ class ContentProcessor:
 
 
 if __name__ == "__main__":
+    from logging_setup import setup_logging
+    setup_logging()
+
     processor = ContentProcessor()
     articles = processor.process_articles()
 
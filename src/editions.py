@@ -0,0 +1,195 @@
+"""
+Editions Module
+Several digests (different keywords, sources and audiences) from one shared scrape:
+the union of all editions' sources is fetched, parsed and cleaned once, then each
+edition is ranked, rendered and delivered in parallel
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from content_processor import ContentProcessor
+from checkpoint import CheckpointStore
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Edition:
+    def __init__(self, name, sources, title=None, priority_keywords=None, exclude_keywords=None,
+                 max_articles=10, min_score=1, audience=None):
+        self.name = name
+        self.sources = sources  # {source name: feed URL}
+        self.processor = ContentProcessor(priority_keywords, exclude_keywords, title or name)
+        self.max_articles = max_articles
+        self.min_score = min_score
+        # telegram_chat_ids / email_recipients / whatsapp; missing keys keep the .env destinations
+        self.audience = audience or {}
+
+
+def load_editions(path, known_sources):
+    """
+    Read an editions file. Each edition's "sources" lists names from known_sources
+    (NewsScraper.sources) or the file's own top-level "sources" map; omitted means all of them.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    available = dict(known_sources)
+    available.update(config.get('sources', {}))
+
+    editions = []
+    for entry in config['editions']:
+        names = entry.get('sources') or list(available)
+        unknown = [n for n in names if n not in available]
+        if unknown:
+            raise ValueError(f"Edition '{entry['name']}' uses unknown source(s): {', '.join(unknown)}")
+        editions.append(Edition(
+            name=entry['name'],
+            sources={n: available[n] for n in names},
+            title=entry.get('title'),
+            priority_keywords=entry.get('priority_keywords'),
+            exclude_keywords=entry.get('exclude_keywords'),
+            max_articles=entry.get('max_articles', 10),
+            min_score=entry.get('min_score', 1),
+            audience=entry.get('audience'),
+        ))
+    return editions
+
+
+class EditionRunner:
+    def __init__(self, digest, editions):
+        self.digest = digest  # TechNewsDigest: shared scraper, pipeline, notifier, checkpoints, render cache
+        self.editions = editions
+        for edition in editions:
+            # One shared trend baseline and set of story threads across editions
+            edition.processor.trends = digest.trends
+            edition.processor.stories = digest.stories
+            edition.processor.summarizer = digest.processor.summarizer  # One summary cache
+
+    def _scrape(self, run_id):
+        """Fetch, parse and clean the union of all editions' sources once"""
+        sources = {}
+        for edition in self.editions:
+            sources.update(edition.sources)
+
+        cached = self.digest.checkpoints.load(run_id, 'scrape')
+        if cached is not None:
+            logger.info(f"Loaded {len(cached)} scraped articles from checkpoint")
+            return cached
+
+        logger.info(f"Scraping {len(sources)} unique sources for {len(self.editions)} editions...")
+        with self.digest._stage('scrape'):
+            # Keep same-titled articles from different sources; each edition dedups its own subset
+            skipped = {}
+            articles, _ = self.digest.pipeline.run(dedup=False, sources=sources, skipped=skipped)
+        self.digest.checkpoint_scrape(run_id, articles, sources, skipped)
+        return articles
+
+    def _run_edition(self, run_id, edition, articles, trending=()):
+        """Rank, render and deliver one edition; checkpointed under data/runs/<RUN_ID>/editions/<name>/"""
+        checkpoints = CheckpointStore(os.path.join(self.digest.checkpoints.run_dir(run_id), 'editions'))
+        scraper = self.digest.scraper
+        processor = edition.processor
+
+        subset = scraper.deduplicate([a for a in articles if a['source'] in edition.sources])
+        rank_input = checkpoints.content_hash({
+            'articles': subset,
+            'priority_keywords': processor.priority_keywords,
+            'exclude_keywords': processor.exclude_keywords,
+            'max_articles': edition.max_articles,
+            'min_score': edition.min_score,
+            'trending': trending,
+            'full_text': self.digest.fetcher is not None
+        })
+        selected = checkpoints.load(edition.name, 'rank') if checkpoints.is_current(edition.name, 'rank', rank_input) else None
+        if selected is None:
+            with metrics.STAGE_SECONDS.time(stage=f'rank.{edition.name}'):
+                candidates = [dict(a) for a in subset]
+                selected = processor.filter_and_rank(candidates, edition.min_score, edition.max_articles)
+            # Pages shared with other editions come from the fetcher's cache (or its in-flight fetch)
+            selected = self.digest.with_full_text(candidates, selected, processor, edition.min_score, edition.max_articles)
+            checkpoints.save(edition.name, 'rank', selected, rank_input)
+        if not selected:
+            logger.warning(f"[{edition.name}] No articles passed filtering")
+            return None
+
+        cache = self.digest.render_cache
+        settings = processor.render_settings()
+        with metrics.STAGE_SECONDS.time(stage=f'render.{edition.name}'):
+            rendered = {
+                'whatsapp_message': cache.get_or_render(selected, 'whatsapp', processor.format_for_whatsapp,
+                                                        profile=edition.name, settings=settings),
+                'email_html': cache.get_or_render(selected, 'email', processor.format_for_email,
+                                                  profile=edition.name, settings=settings),
+                'email_subject': f"🚀 Your Daily {processor.title} Digest - {datetime.now().strftime('%b %d, %Y')}"
+            }
+        render_hash = checkpoints.content_hash(rendered)
+        checkpoints.save(edition.name, 'render', rendered, checkpoints.content_hash(selected))
+
+        previous = None
+        if checkpoints.is_current(edition.name, 'notify', render_hash):
+            previous = checkpoints.load(edition.name, 'notify')
+        notifier = self.digest.notifier.for_audience(**edition.audience)
+        with metrics.STAGE_SECONDS.time(stage=f'notify.{edition.name}'):
+            results = notifier.send_notifications(
+                whatsapp_message=rendered['whatsapp_message'],
+                email_subject=rendered['email_subject'],
+                email_html=rendered['email_html'],
+                telegram_message=rendered['whatsapp_message'],
+                skip_delivered=previous['delivered'] if previous else None
+            )
+        checkpoints.save(edition.name, 'notify', {'results': results, 'delivered': notifier.delivery_results},
+                         render_hash)
+        logger.info(f"[{edition.name}] {len(selected)} articles from {len(subset)} candidates; "
+                    f"sent: {', '.join(c for c, ok in results.items() if ok) or 'none'}")
+        return results
+
+    def run(self, run_id=None):
+        """Run every edition; returns {edition name: channel results (None if it had nothing to send or failed)}"""
+        checkpoints = self.digest.checkpoints
+        run_id = run_id or checkpoints.new_run_id()
+        metrics.registry.start_run()
+        self.digest.render_cache.start_run()
+        logger.info(f"Editions run {run_id}: {', '.join(e.name for e in self.editions)}")
+
+        outcomes = {}
+        try:
+            articles = self._scrape(run_id)
+            if not articles:
+                logger.warning("No articles found. Exiting.")
+                return outcomes
+            self.digest.scraper.save_articles(articles)
+            trending = self.digest.observe_trends(articles)
+            self.digest.assign_stories(articles)
+
+            with ThreadPoolExecutor(max_workers=len(self.editions), thread_name_prefix='edition') as executor:
+                futures = {e.name: executor.submit(self._run_edition, run_id, e, articles, trending)
+                           for e in self.editions}
+            failed = []
+            for name, future in futures.items():
+                try:
+                    outcomes[name] = future.result()
+                except Exception as e:
+                    logger.error(f"[{name}] Edition failed: {e}", exc_info=True)
+                    outcomes[name] = None
+                    failed.append(name)
+                else:
+                    if outcomes[name] is not None and not any(outcomes[name].values()):
+                        failed.append(name)
+            # One history row per scraped article, scored by the default ranking (editions rank copies)
+            self.digest._export_history(run_id, articles)
+            if failed:
+                logger.info(f"Retry failed editions ({', '.join(failed)}) with: "
+                            f"python main.py --editions --resume {run_id}")
+        finally:
+            self.digest.render_cache.report()
+            self.digest.processor.summarizer.save()
+            if self.digest.fetcher is not None:
+                self.digest.fetcher.prune()
+            metrics.registry.write_prometheus(os.getenv('METRICS_FILE', 'data/metrics.prom'))
+            metrics.registry.write_summary(os.path.join(checkpoints.run_dir(run_id), 'metrics.json'))
+            self.digest.start_retention()
+        return outcomes
@@ -0,0 +1,81 @@
+"""
+High-Water Marks Module
+Remembers, per source, the newest publication time seen and the entry IDs published at
+that time, so each scrape only parses and cleans entries newer than the previous one
+"""
+
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class HighWaterMarks:
+    def __init__(self, state_file='data/high_water_marks.json', stop_after=3, max_undated=200):
+        """state_file=None keeps the marks in memory only"""
+        self.state_file = state_file
+        self.stop_after = stop_after    # Consecutive already-seen entries before the rest of a feed is skipped
+        self.max_undated = max_undated  # IDs of entries without a date, remembered per source
+        self.marks = {}  # source -> {'published': epoch seconds (UTC), 'ids': [...], 'undated': [...]}
+        self.lock = threading.Lock()
+        self.dirty = False
+        if state_file:
+            self._load()
+
+    def get(self, source):
+        with self.lock:
+            return self.marks.get(source)
+
+    def set(self, source, mark):
+        with self.lock:
+            self.marks[source] = mark
+            self.dirty = True
+
+    @staticmethod
+    def seen(mark, timestamp, entry_id):
+        """Whether an entry is at or below a source's mark (an entry without a date: by ID)"""
+        if timestamp is None:
+            return entry_id in mark['undated']
+        return timestamp < mark['published'] or (timestamp == mark['published'] and entry_id in mark['ids'])
+
+    def advance(self, source, entries):
+        """Raise a source's mark past newly parsed (timestamp, entry id) pairs"""
+        with self.lock:
+            old = self.marks.get(source) or {'published': 0, 'ids': [], 'undated': []}
+            mark = {'published': old['published'], 'ids': list(old['ids']), 'undated': list(old['undated'])}
+            for timestamp, entry_id in entries:
+                if timestamp is None:
+                    if entry_id not in mark['undated']:
+                        mark['undated'].append(entry_id)
+                elif timestamp > mark['published']:
+                    mark['published'], mark['ids'] = timestamp, [entry_id]
+                elif timestamp == mark['published'] and entry_id not in mark['ids']:
+                    mark['ids'].append(entry_id)
+            mark['undated'] = mark['undated'][-self.max_undated:]
+            self.marks[source] = mark
+            self.dirty = True
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.marks = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error loading high-water marks, starting fresh: {e}")
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or not self.state_file:
+                return
+            marks, self.dirty = dict(self.marks), False
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = self.state_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(marks, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving high-water marks: {e}")
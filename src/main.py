@@ -3,42 +3,118 @@ Main Orchestrator
 Coordinates scraping, processing, and notification delivery
 """
 
-import schedule
-import time
+import os
+import sys
 import logging
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from news_scraper import NewsScraper
 from content_processor import ContentProcessor
 from notifier import Notifier
+from pipeline import StreamingPipeline
+from checkpoint import CheckpointStore, STAGES
+from circuit_breaker import DEADLINE_REACHED
+from render_cache import RenderCache
+import metrics
+from logging_setup import setup_logging, set_console_level
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/tech_news_digest.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
 class TechNewsDigest:
     def __init__(self):
         self.scraper = NewsScraper()
+        # Only scrape entries newer than the last run's (HIGH_WATER_MARKS=0 re-reads each feed's newest entries)
+        if os.getenv('HIGH_WATER_MARKS', '1') != '0':
+            from high_water import HighWaterMarks
+            self.scraper.high_water = HighWaterMarks()
         self.processor = ContentProcessor()
         self.notifier = Notifier()
+        self.pipeline = StreamingPipeline(self.scraper, self.processor)
+        self.checkpoints = CheckpointStore()
+        self.render_cache = RenderCache()
+        self.profiler = None  # Set by --profile
+        # SCRAPE_SHARDS=N scrapes through the lease queue with N worker processes
+        # (0 = only external `--worker` processes); unset keeps the in-process pipeline
+        self.scrape_shards = os.getenv('SCRAPE_SHARDS') or None
+        # Trending-topic boost in ranking (TRENDING=0 turns it off)
+        self.trends = None
+        if os.getenv('TRENDING', '1') != '0':
+            from trending import TrendTracker
+            self.trends = TrendTracker()
+        self.processor.trends = self.trends
+        # Multi-day story threads (STORY_CLUSTERING=0 turns them off)
+        self.stories = None
+        if os.getenv('STORY_CLUSTERING', '1') != '0':
+            from clustering import StoryClusterer
+            self.stories = StoryClusterer()
+        self.processor.stories = self.stories
+        # Parquet history for analytics (needs pyarrow; HISTORY_EXPORT=0 turns it off)
+        self.history = None
+        if os.getenv('HISTORY_EXPORT', '1') != '0':
+            from parquet_export import ParquetExporter
+            self.history = ParquetExporter()
+        # History tiers and checkpoint pruning, in the background after each run (RETENTION=0 turns it off)
+        self.retention = None
+        if os.getenv('RETENTION', '1') != '0':
+            from retention import RetentionManager
+            self.retention = RetentionManager(self.history, self.checkpoints)
+        # Full text of the top-ranked articles' pages, for ranking and summaries (FETCH_FULL_ARTICLES=1 turns it on)
+        self.fetcher = None
+        if os.getenv('FETCH_FULL_ARTICLES', '0') == '1':
+            from article_fetcher import ArticleFetcher
+            self.fetcher = ArticleFetcher()
+
+    @contextmanager
+    def _stage(self, name):
+        """Time a top-level stage (and profile it when --profile is on)"""
+        with metrics.STAGE_SECONDS.time(stage=name):
+            with self.profiler.stage(name) if self.profiler else nullcontext():
+                yield
+
+    def run_daily_digest(self, run_id=None, from_stage=None):
+        """
+        Main function to run the complete news digest pipeline.
+        Every stage is checkpointed under run_id; when resuming an existing run,
+        stages before from_stage (or already completed for the same input) are skipped.
+        """
+        resuming = run_id is not None
+        run_id = run_id or self.checkpoints.new_run_id()
+        metrics.registry.start_run()
+        self.render_cache.start_run()
+        if self.profiler:
+            self.profiler.start(os.path.join(self.checkpoints.run_dir(run_id), 'profile'))
+        start_index = STAGES.index(from_stage) if from_stage else 0
+        if resuming and not from_stage:
+            # Pick up after the last completed stage (re-check notify so failed channels are retried)
+            completed = self.checkpoints.completed_stages(run_id)
+            start_index = min(len(completed), STAGES.index('notify'))
 
-    def run_daily_digest(self):
-        """Main function to run the complete news digest pipeline"""
         logger.info("=" * 50)
-        logger.info("Starting daily tech news digest")
+        logger.info("Resuming tech news digest" if resuming else "Starting daily tech news digest")
         logger.info(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info(f"Run ID: {run_id}" + (f" (from stage: {STAGES[start_index]})" if resuming else ""))
         logger.info("=" * 50)
 
         try:
-            # Step 1: Scrape news
-            logger.info("Step 1: Scraping news sources...")
-            articles = self.scraper.scrape_all_sources()
+            # Steps 1-2: Scrape, clean, dedup and rank as a streaming pipeline;
+            # ranking starts as soon as the first feed arrives
+            articles, processed_articles = None, None
+            if start_index > STAGES.index('scrape'):
+                articles = self.checkpoints.load(run_id, 'scrape')
+            if articles is None:
+                skipped = {}
+                if self.scrape_shards is not None:
+                    logger.info(f"Step 1: Scraping news sources with {self.scrape_shards} worker process(es)...")
+                    with self._stage('scrape'):
+                        articles = self._scrape_sharded(run_id, skipped)
+                else:
+                    logger.info("Steps 1-2: Scraping and ranking news sources...")
+                    with self._stage('scrape'):
+                        articles, processed_articles = self.pipeline.run(max_articles=10, skipped=skipped)
+                self.checkpoint_scrape(run_id, articles, self.scraper.sources, skipped)
+            else:
+                logger.info(f"Loaded {len(articles)} scraped articles from checkpoint")
 
             if not articles:
                 logger.warning("No articles found. Exiting.")
@@ -47,9 +123,33 @@ class TechNewsDigest:
             # Save raw articles
             self.scraper.save_articles(articles)
 
-            # Step 2: Process and filter
-            logger.info("Step 2: Processing and filtering articles...")
-            processed_articles = self.processor.filter_and_rank(articles, max_articles=10)
+            trending = self.observe_trends(articles)
+            demoted = self.assign_stories(articles)
+            if trending or demoted:
+                # The streaming ranker scored before this run's bursts and stale story threads were known; re-rank
+                processed_articles = None
+
+            # Step 2: Ranking (only needed separately when resuming or when topics are trending)
+            rank_input = self.checkpoints.content_hash({
+                'articles': articles,
+                'priority_keywords': self.processor.priority_keywords,
+                'exclude_keywords': self.processor.exclude_keywords,
+                'trending': trending,
+                'full_text': self.fetcher is not None
+            })
+            if processed_articles is None:
+                processed_articles = self._resume_stage(run_id, 'rank', rank_input, start_index, from_stage)
+                if processed_articles is None:
+                    logger.info("Step 2: Processing and filtering articles...")
+                    with self._stage('rank'):
+                        processed_articles = self.processor.filter_and_rank(articles, max_articles=10)
+                    processed_articles = self.with_full_text(articles, processed_articles)
+                    self.checkpoints.save(run_id, 'rank', processed_articles, rank_input)
+            else:
+                processed_articles = self.with_full_text(articles, processed_articles)
+                self.checkpoints.save(run_id, 'rank', processed_articles, rank_input)
+
+            self._export_history(run_id, articles)
 
             if not processed_articles:
                 logger.warning("No articles passed filtering. Exiting.")
@@ -58,19 +158,40 @@ class TechNewsDigest:
             logger.info(f"Selected {len(processed_articles)} top articles")
 
             # Step 3: Format content
-            logger.info("Step 3: Formatting content...")
-            whatsapp_message = self.processor.format_for_whatsapp(processed_articles)
-            email_html = self.processor.format_for_email(processed_articles)
-            email_subject = f"🚀 Your Daily AI & Tech Digest - {datetime.now().strftime('%b %d, %Y')}"
+            render_input = self.checkpoints.content_hash(processed_articles)
+            rendered = self._resume_stage(run_id, 'render', render_input, start_index, from_stage)
+            if rendered is None:
+                logger.info("Step 3: Formatting content...")
+                with self._stage('render'):
+                    settings = self.processor.render_settings()
+                    rendered = {
+                        'whatsapp_message': self.render_cache.get_or_render(
+                            processed_articles, 'whatsapp', self.processor.format_for_whatsapp, settings=settings),
+                        'email_html': self.render_cache.get_or_render(
+                            processed_articles, 'email', self.processor.format_for_email, settings=settings),
+                        'email_subject': f"🚀 Your Daily {self.processor.title} Digest - {datetime.now().strftime('%b %d, %Y')}"
+                    }
+                self.checkpoints.save(run_id, 'render', rendered, render_input)
+
+            # Step 4: Send notifications (only to destinations that haven't received this digest yet)
+            notify_input = self.checkpoints.content_hash(rendered)
+            previous = None
+            if from_stage != 'notify' and self.checkpoints.is_current(run_id, 'notify', notify_input):
+                previous = self.checkpoints.load(run_id, 'notify')
 
-            # Step 4: Send notifications
             logger.info("Step 4: Sending notifications...")
-            results = self.notifier.send_notifications(
-                whatsapp_message=whatsapp_message,
-                email_subject=email_subject,
-                email_html=email_html,
-                telegram_message=whatsapp_message  # Reuse WhatsApp format for Telegram
-            )
+            with self._stage('notify'):
+                results = self.notifier.send_notifications(
+                    whatsapp_message=rendered['whatsapp_message'],
+                    email_subject=rendered['email_subject'],
+                    email_html=rendered['email_html'],
+                    telegram_message=rendered['whatsapp_message'],  # Reuse WhatsApp format for Telegram
+                    skip_delivered=previous['delivered'] if previous else None
+                )
+            self.checkpoints.save(run_id, 'notify', {
+                'results': results,
+                'delivered': self.notifier.delivery_results
+            }, notify_input)
 
             # Log results
             if results['whatsapp']:
@@ -88,60 +209,304 @@ class TechNewsDigest:
             else:
                 logger.warning("✗ Telegram notification failed or not configured")
 
+            failed = [d for outcomes in self.notifier.delivery_results.values() for d, ok in outcomes.items() if not ok]
+            if failed:
+                logger.info(f"Retry failed channels with: python main.py --resume {run_id}")
+
             logger.info("=" * 50)
             logger.info("Daily digest completed successfully")
             logger.info("=" * 50)
 
         except Exception as e:
             logger.error(f"Error in daily digest: {e}", exc_info=True)
+            logger.info(f"Resume with: python main.py --resume {run_id}")
+
+        finally:
+            self.render_cache.report()
+            self.render_cache.prune_disk()
+            self.processor.summarizer.save()
+            if self.fetcher is not None:
+                self.fetcher.prune()
+            metrics.registry.write_prometheus(os.getenv('METRICS_FILE', 'data/metrics.prom'))
+            metrics.registry.write_summary(os.path.join(self.checkpoints.run_dir(run_id), 'metrics.json'))
+            if self.profiler:
+                self.profiler.finish()
+            self.start_retention()
+
+    def start_retention(self):
+        if self.retention is not None:
+            self.retention.start()
+
+    def with_full_text(self, articles, selected, processor=None, min_score=1, max_articles=10):
+        """
+        Fetch the pages of the top-ranked candidates into article['content'] and rank again with
+        their full text; returns the new selection (unchanged when the fetcher is off)
+        """
+        if self.fetcher is None or not selected:
+            return selected
+        processor = processor or self.processor
+        candidates = sorted((a for a in articles if a.get('score', 0) >= min_score),
+                            key=lambda a: a['score'], reverse=True)[:max(self.fetcher.candidates, len(selected))]
+        with self._stage('fetch_articles'):
+            texts = self.fetcher.fetch_texts([a['link'] for a in candidates])
+        for article, text in zip(candidates, texts):
+            if text:
+                article['content'] = text
+        return processor.filter_and_rank(candidates, min_score, max_articles)
+
+    def save_high_water(self):
+        if self.scraper.high_water is not None:
+            self.scraper.high_water.save()
+
+    def checkpoint_scrape(self, run_id, articles, sources, skipped):
+        """
+        Checkpoint a finished scrape, then save the high-water marks. An empty scrape, or one cut
+        short by the deadline, isn't checkpointed: resuming the run scrapes again instead of
+        loading it as complete, so its high-water marks aren't saved either (scraping again
+        must see the same articles).
+        """
+        truncated = sorted(source for source, reason in skipped.items() if reason == DEADLINE_REACHED)
+        if not articles or truncated:
+            reason = f"deadline reached before {', '.join(truncated)}" if truncated else "no articles"
+            logger.warning(f"Scrape not checkpointed ({reason}); resuming run {run_id} will scrape again")
+            return
+        self.checkpoints.save(run_id, 'scrape', articles, self.checkpoints.content_hash(sources))
+        # Only once the articles are checkpointed: a failed run is resumed, not scraped again
+        self.save_high_water()
+
+    def _scrape_sharded(self, run_id, skipped=None):
+        """Fan the source list out over the lease queue, then merge and dedup the results"""
+        from work_queue import ShardCoordinator
+
+        coordinator = ShardCoordinator(self.scraper, os.getenv('WORK_QUEUE_DB', 'data/work_queue.db'),
+                                       workers=int(self.scrape_shards))
+        # Workers stop at the scrape deadline themselves; leave a little slack for stragglers
+        articles = coordinator.scrape(run_id, timeout=self.scraper.deadline_seconds + 30, skipped=skipped)
+        coordinator.queue.purge(run_id)
+        return articles
+
+    def _export_history(self, run_id, articles):
+        """Append the run's articles with their scores to the Parquet history (never fails the run)"""
+        if self.history is None or not self.history.available():
+            return
+        for article in articles:
+            if 'score' not in article:
+                # Scrape loaded from a checkpoint and rank reused: score it here
+                article['score'] = self.processor.rank_article(article)
+        try:
+            with self._stage('export'):
+                self.history.export(articles, run_id)
+        except Exception as e:
+            logger.error(f"Error exporting article history: {e}")
+
+    def assign_stories(self, articles):
+        """
+        Attach each article to a multi-day story thread (article['story']); returns whether any
+        article is demoted as a stale follow-up, i.e. whether scores changed (False if disabled)
+        """
+        if self.stories is None:
+            return False
+        self.stories.assign(articles)
+        self.stories.save()
+        return any(self.stories.demotion(article) for article in articles)
+
+    def observe_trends(self, articles):
+        """Feed a scrape into the trend tracker; returns the currently bursting terms (empty if disabled)"""
+        if self.trends is None:
+            return []
+        self.trends.observe(articles)
+        self.trends.save()
+        trending = self.trends.trending()
+        if trending:
+            logger.info("Trending: " + ', '.join(f"{term} ({sources} sources)" for term, _, sources in trending))
+        return trending
+
+    def _resume_stage(self, run_id, stage, input_hash, start_index, from_stage=None):
+        """Reuse a checkpointed stage output if it is before the resume point or its input is unchanged"""
+        # An explicit --from-stage always re-runs that stage
+        if stage == from_stage:
+            return None
+        if STAGES.index(stage) < start_index or self.checkpoints.is_current(run_id, stage, input_hash):
+            output = self.checkpoints.load(run_id, stage)
+            if output is not None:
+                logger.info(f"Skipping {stage}: reusing checkpoint")
+                return output
+        return None
 
     def run_once(self):
         """Run the digest once (for testing)"""
         self.run_daily_digest()
 
-    def start_scheduler(self, run_time="09:00"):
-        """Start the scheduler to run daily at specified time"""
-        logger.info(f"Scheduler started. Will run daily at {run_time}")
+    def start_scheduler(self, run_times=("09:00",), tz=None, overlap='skip'):
+        """
+        Run the digest at each of run_times ("HH:MM" or 5-field cron expressions) in timezone tz.
+        Sleeps until the next due run; missed runs are caught up once after a restart.
+        """
+        from scheduler import Scheduler, CronTrigger
 
-        # Schedule the job
-        schedule.every().day.at(run_time).do(self.run_daily_digest)
+        scheduler = Scheduler()
+        for run_time in run_times:
+            scheduler.add_job(f"digest {run_time}", CronTrigger(run_time, tz), self.run_daily_digest, overlap=overlap)
 
-        # Run immediately on startup (optional - comment out if not needed)
-        logger.info("Running initial digest on startup...")
-        self.run_daily_digest()
+        logger.info(f"Scheduler started with {len(run_times)} job(s)")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            logger.info("Scheduler stopped")
+            scheduler.stop()
+
+def print_usage():
+    print("Usage:")
+    print("  python main.py --once              # Run once and exit")
+    print("  python main.py --schedule [TIME ...] [--tz ZONE] [--overlap skip|queue|parallel]")
+    print("                                     # Run at each TIME (HH:MM or cron, default: 09:00)")
+    print("  python main.py --resume [RUN_ID] [--from-stage STAGE]")
+    print(f"                                     # Resume a run (default: latest); stages: {', '.join(STAGES)}")
+    print("  python main.py --worker [RUN_ID]   # Scrape sources leased from the shared work queue")
+    print("                                     # (default: the newest queued run; see SCRAPE_SHARDS)")
+    print("  python main.py --editions [FILE] [--resume RUN_ID]")
+    print("                                     # Run every edition in FILE (default: editions.json) from one scrape")
+    print("  python main.py --watch             # Poll continuously and alert on breaking news")
+    print("                                     # (ALERT_SCORE_THRESHOLD, ALERTS_PER_HOUR, WATCH_INTERVAL)")
+    print("  python main.py --serve [--host 127.0.0.1] [--port 8080]")
+    print("                                     # Serve the latest digest and article queries over HTTP")
+    print("  Add --profile to any mode to write CPU/memory profiles per stage")
+
+
+def enable_profiling(digest):
+    """Profile every stage of each run into data/runs/<RUN_ID>/profile/"""
+    from profiler import Profiler
+
+    digest.profiler = Profiler()
+    digest.pipeline.profiler = digest.profiler
+    # Keep console logging from skewing the timings; the log file still gets everything
+    set_console_level(logging.WARNING)
+    logger.info("Profiling enabled")
 
-        # Keep the script running
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+
+def _option_value(args, name, default=None):
+    """Value following `name` in args, e.g. --from-stage render"""
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
 
 
 def main():
     """Main entry point"""
-    import sys
+    if len(sys.argv) > 1 and sys.argv[1] in ('--help', '-h'):
+        # Fast path: nothing to construct or import
+        print_usage()
+        return
+
+    setup_logging()
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        # Scrape worker for a sharded run; needs no notifier or checkpoints
+        from work_queue import LeaseQueue, run_worker
+        queue_path = os.getenv('WORK_QUEUE_DB', 'data/work_queue.db')
+        run_id = sys.argv[2] if len(sys.argv) > 2 else LeaseQueue(queue_path).latest_run_id()
+        if not run_id:
+            print(f"No queued runs found in {queue_path}")
+            return
+        logger.info(f"Worker joining run {run_id}")
+        run_worker(queue_path, run_id, idle_exit=False)
+        return
+
+    # --profile can be combined with any mode
+    profile = '--profile' in sys.argv
+    if profile:
+        sys.argv.remove('--profile')
 
     digest = TechNewsDigest()
+    if profile:
+        enable_profiling(digest)
+
+    # Optional live /metrics endpoint (useful with --schedule)
+    if os.getenv('METRICS_PORT'):
+        metrics.registry.serve(int(os.getenv('METRICS_PORT')), os.getenv('METRICS_HOST', '127.0.0.1'))
 
     # Check command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--once':
-            # Run once and exit
-            logger.info("Running in single-run mode")
-            digest.run_once()
-        elif sys.argv[1] == '--schedule':
-            # Run on schedule
-            run_time = sys.argv[2] if len(sys.argv) > 2 else "09:00"
-            logger.info(f"Running in scheduled mode at {run_time}")
-            digest.start_scheduler(run_time)
+    try:
+        if len(sys.argv) > 1:
+            if sys.argv[1] == '--once':
+                # Run once and exit
+                logger.info("Running in single-run mode")
+                digest.run_once()
+            elif sys.argv[1] == '--schedule':
+                # Run on schedule: any number of times / cron expressions, optional --tz and --overlap
+                run_times = []
+                for arg in sys.argv[2:]:
+                    if arg.startswith('--'):
+                        break
+                    run_times.append(arg)
+                run_times = run_times or ["09:00"]
+                tz = _option_value(sys.argv, '--tz', os.getenv('DIGEST_TIMEZONE'))
+                overlap = _option_value(sys.argv, '--overlap', 'skip')
+                logger.info(f"Running in scheduled mode at {', '.join(run_times)}" + (f" ({tz})" if tz else ""))
+                digest.start_scheduler(run_times, tz=tz, overlap=overlap)
+            elif sys.argv[1] == '--resume':
+                # Resume a checkpointed run (default: the latest one)
+                run_id = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else None
+                if run_id and not digest.checkpoints.exists(run_id):
+                    print(f"Unknown run ID '{run_id}': no checkpoint in {digest.checkpoints.run_dir(run_id)}")
+                    sys.exit(1)
+                run_id = run_id or digest.checkpoints.latest_run_id()
+                from_stage = _option_value(sys.argv, '--from-stage')
+                if not run_id:
+                    print("No checkpointed runs found in data/runs")
+                elif from_stage and from_stage not in STAGES:
+                    print(f"Unknown stage '{from_stage}'. Choose from: {', '.join(STAGES)}")
+                else:
+                    logger.info(f"Resuming run {run_id}")
+                    digest.run_daily_digest(run_id=run_id, from_stage=from_stage)
+            elif sys.argv[1] == '--editions':
+                # Several digests from one shared scrape
+                from editions import load_editions, EditionRunner
+                path = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else \
+                    os.getenv('EDITIONS_FILE', 'editions.json')
+                try:
+                    editions = load_editions(path, digest.scraper.sources)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Can't load editions from {path}: {e}")
+                    return
+                run_id = _option_value(sys.argv, '--resume')
+                if run_id and not (digest.checkpoints.exists(run_id) or
+                                   os.path.isdir(os.path.join(digest.checkpoints.run_dir(run_id), 'editions'))):
+                    print(f"Unknown run ID '{run_id}': no checkpoint in {digest.checkpoints.run_dir(run_id)}")
+                    sys.exit(1)
+                EditionRunner(digest, editions).run(run_id=run_id)
+            elif sys.argv[1] == '--watch':
+                # Continuous polling with immediate alerts for high-scoring new articles
+                from watcher import Watcher
+                digest.scraper.high_water = None  # The watcher tracks seen links itself; leave the digest's marks alone
+                watcher = Watcher(digest.scraper, digest.processor, digest.notifier)
+                try:
+                    watcher.run_forever()
+                except KeyboardInterrupt:
+                    logger.info("Watcher stopped")
+                    watcher.stop()
+            elif sys.argv[1] == '--serve':
+                # Local HTTP API over the latest completed run; picks up new runs as they finish
+                from server import DigestServer
+                server = DigestServer(host=_option_value(sys.argv, '--host', '127.0.0.1'),
+                                      port=int(_option_value(sys.argv, '--port', '8080')))
+                server.start()
+                try:
+                    server.stopped.wait()
+                except KeyboardInterrupt:
+                    logger.info("Server stopped")
+                    server.stop()
+            else:
+                print_usage()
         else:
-            print("Usage:")
-            print("  python main.py --once              # Run once and exit")
-            print("  python main.py --schedule [TIME]   # Run daily at TIME (default: 09:00)")
-    else:
-        # Default: run once
-        logger.info("No arguments provided. Running once.")
-        digest.run_once()
-
+            # Default: run once
+            logger.info("No arguments provided. Running once.")
+            digest.run_once()
+    finally:
+        # Stop parse worker processes before interpreter shutdown tears down their pipes
+        digest.pipeline.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
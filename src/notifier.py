@@ -5,21 +5,21 @@ All services are 100% free!
 """
 
 import os
+import copy
 import logging
-import requests
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from urllib.parse import quote
-from dotenv import load_dotenv
+from rate_limiter import RateLimiter, RateLimitExceeded, FanOutScheduler
 
-load_dotenv()
-logging.basicConfig(level=logging.INFO)
+# requests, smtplib/email.mime and dotenv are imported where they are used,
+# so paths that never send (e.g. --help) don't pay for them
 logger = logging.getLogger(__name__)
 
 
 class Notifier:
     def __init__(self):
+        from dotenv import load_dotenv
+        load_dotenv()
+
         # CallMeBot configuration (for WhatsApp) - FREE!
         self.callmebot_phone = os.getenv('CALLMEBOT_PHONE')  # Your phone number
         self.callmebot_apikey = os.getenv('CALLMEBOT_APIKEY')  # Your API key
@@ -27,11 +27,114 @@ class Notifier:
         # Gmail SMTP configuration (for Email) - FREE!
         self.gmail_user = os.getenv('GMAIL_USER')  # Your Gmail address
         self.gmail_app_password = os.getenv('GMAIL_APP_PASSWORD')  # App-specific password
-        self.email_to = os.getenv('EMAIL_TO')  # Recipient email
+        self.email_to = os.getenv('EMAIL_TO')  # Recipient email(s), comma-separated
+        self.email_recipients = [e.strip() for e in (self.email_to or '').split(',') if e.strip()]
 
         # Telegram Bot configuration (for Telegram) - FREE & EASIEST!
         self.telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
+        self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')  # One or more chat IDs, comma-separated
+        self.telegram_chat_ids = [c.strip() for c in (self.telegram_chat_id or '').split(',') if c.strip()]
+        self._telegram_session = None
+
+        # Shared by every send so fan-out stays within each provider's limits
+        self.rate_limiter = RateLimiter()
+
+    def for_audience(self, telegram_chat_ids=None, email_recipients=None, whatsapp=True):
+        """
+        A notifier for a subset of destinations (None keeps the configured ones).
+        It shares this notifier's credentials, rate limiter and HTTP session.
+        """
+        if self.telegram_bot_token:
+            self._get_telegram_session()  # Create it once so every audience reuses the connection pool
+        audience = copy.copy(self)
+        if telegram_chat_ids is not None:
+            audience.telegram_chat_ids = [str(c) for c in telegram_chat_ids]
+        if email_recipients is not None:
+            audience.email_recipients = list(email_recipients)
+        if not whatsapp:
+            audience.callmebot_phone = None
+        audience.delivery_results = {}
+        return audience
+
+    def _check_rate_limit(self, provider, destination, response):
+        """Raise RateLimitExceeded (and back off the buckets) on a 429 response"""
+        retry_after = RateLimiter.retry_after(response)
+        if retry_after is not None:
+            # Telegram's global flood limit applies to the whole bot
+            self.rate_limiter.penalize(provider, destination, retry_after, provider_wide=(provider != 'telegram'))
+            raise RateLimitExceeded(provider, destination, retry_after)
+
+    def _fan_out(self, jobs):
+        """Run (provider, destination, func, *args) jobs in parallel per provider.
+        Returns {provider: True if every destination succeeded}; per-destination
+        outcomes are kept in self.delivery_results"""
+        scheduler = FanOutScheduler(self.rate_limiter)
+        for provider, destination, func, *args in jobs:
+            scheduler.submit(provider, destination, func, *args)
+
+        results = {}
+        self.delivery_results = {}
+        for (provider, destination), ok in scheduler.run().items():
+            if not ok:
+                logger.error(f"{provider} delivery to {destination} failed")
+            self.delivery_results.setdefault(provider, {})[destination] = ok
+            results[provider] = results.get(provider, True) and ok
+        return results
+
+    def _get_telegram_session(self):
+        """One pooled session reused for every chat and chunk"""
+        if self._telegram_session is None:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            session.mount('https://', adapter)
+            self._telegram_session = session
+        return self._telegram_session
+
+    @staticmethod
+    def _split_message(message, limit=4000, separator='━━━━━━━━━━━━━━━━━━━━\n\n'):
+        """
+        Pack whole article blocks into chunks of at most `limit` characters.
+        Blocks end with `separator`; a block that is too long on its own falls back
+        to line boundaries, and a single overlong line to the last space.
+        """
+        if len(message) <= limit:
+            return [message]
+
+        parts = message.split(separator)
+        blocks = [part + separator for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+
+        chunks = []
+        current = ''
+        for block in blocks:
+            if len(current) + len(block) <= limit:
+                current += block
+                continue
+            if current:
+                chunks.append(current)
+                current = ''
+            if len(block) <= limit:
+                current = block
+                continue
+
+            # Oversized block: pack it line by line
+            for line in block.splitlines(keepends=True):
+                while len(line) > limit:
+                    cut = line.rfind(' ', 0, limit)
+                    cut = cut + 1 if cut > 0 else limit
+                    if current:
+                        chunks.append(current)
+                        current = ''
+                    chunks.append(line[:cut])
+                    line = line[cut:]
+                if len(current) + len(line) > limit:
+                    chunks.append(current)
+                    current = ''
+                current += line
+
+        if current:
+            chunks.append(current)
+        return chunks
 
     def send_whatsapp_callmebot(self, message):
         """
@@ -42,6 +145,13 @@ class Notifier:
             logger.error("CallMeBot credentials not found. WhatsApp disabled.")
             return False
 
+        jobs = [('callmebot', self.callmebot_phone, self._send_whatsapp_to, message)]
+        return self._fan_out(jobs).get('callmebot', False)
+
+    def _send_whatsapp_to(self, message):
+        """Send one WhatsApp message; raises RateLimitExceeded on 429"""
+        import requests
+
         try:
             # CallMeBot has a 3000 character limit
             if len(message) > 2900:
@@ -53,7 +163,9 @@ class Notifier:
             # CallMeBot API endpoint
             url = f"https://api.callmebot.com/whatsapp.php?phone={self.callmebot_phone}&text={encoded_message}&apikey={self.callmebot_apikey}"
 
+            self.rate_limiter.acquire('callmebot', self.callmebot_phone)
             response = requests.get(url, timeout=30)
+            self._check_rate_limit('callmebot', self.callmebot_phone, response)
 
             if response.status_code == 200:
                 logger.info("✓ WhatsApp message sent via CallMeBot")
@@ -62,6 +174,8 @@ class Notifier:
                 logger.error(f"CallMeBot error: {response.status_code} - {response.text}")
                 return False
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error sending WhatsApp via CallMeBot: {e}")
             return False
@@ -75,11 +189,21 @@ class Notifier:
             logger.error("Gmail credentials not found. Email disabled.")
             return False
 
+        jobs = [('gmail', recipient, self._send_email_to, recipient, subject, html_content)
+                for recipient in self.email_recipients]
+        return self._fan_out(jobs).get('gmail', False)
+
+    def _send_email_to(self, recipient, subject, html_content):
+        """Send the email to one recipient; raises RateLimitExceeded on SMTP throttling"""
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
         try:
             # Create message
             msg = MIMEMultipart('alternative')
             msg['From'] = self.gmail_user
-            msg['To'] = self.email_to
+            msg['To'] = recipient
             msg['Subject'] = subject
 
             # Attach HTML content
@@ -87,13 +211,21 @@ class Notifier:
             msg.attach(html_part)
 
             # Connect to Gmail SMTP server
+            self.rate_limiter.acquire('gmail', recipient)
             with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
                 server.login(self.gmail_user, self.gmail_app_password)
                 server.send_message(msg)
 
-            logger.info("✓ Email sent via Gmail")
+            logger.info(f"✓ Email sent via Gmail to {recipient}")
             return True
 
+        except smtplib.SMTPResponseException as e:
+            # 421/45x are Gmail's "slow down" replies; anything else is a real failure
+            if e.smtp_code == 421 or 450 <= e.smtp_code <= 454:
+                self.rate_limiter.penalize('gmail', recipient, 60, provider_wide=True)
+                raise RateLimitExceeded('gmail', recipient, 60)
+            logger.error(f"Error sending email via Gmail: {e}")
+            return False
         except Exception as e:
             logger.error(f"Error sending email via Gmail: {e}")
             return False
@@ -103,66 +235,110 @@ class Notifier:
         Send message via Telegram Bot (FREE & EASIEST!)
         Setup: Create bot with @BotFather on Telegram
         """
-        if not self.telegram_bot_token or not self.telegram_chat_id:
+        if not self.telegram_bot_token or not self.telegram_chat_ids:
             logger.error("Telegram credentials not found. Telegram disabled.")
             return False
 
+        return self._fan_out(self._telegram_jobs(message)).get('telegram', False)
+
+    def _telegram_jobs(self, message, chat_ids=None):
+        """One fan-out job per chat; the message is split once and shared"""
+        # Telegram supports up to 4096 characters with Markdown
+        chunks = self._split_message(message, 4000)
+        # Progress survives a rate-limited retry so sent chunks aren't repeated
+        return [('telegram', chat_id, self._send_telegram_to, chat_id, chunks, {'sent': 0})
+                for chat_id in (chat_ids or self.telegram_chat_ids)]
+
+    def _send_telegram_to(self, chat_id, chunks, progress):
+        """Send all chunks to one chat; raises RateLimitExceeded on 429"""
         try:
             url = f"https://api.telegram.org/bot{self.telegram_bot_token}/sendMessage"
-
-            # Telegram supports up to 4096 characters with Markdown
-            chunks = []
-            if len(message) > 4000:
-                # Split into chunks
-                for i in range(0, len(message), 4000):
-                    chunks.append(message[i:i + 4000])
-            else:
-                chunks = [message]
+            session = self._get_telegram_session()
 
             # Send each chunk
             for i, chunk in enumerate(chunks):
+                if i < progress['sent']:
+                    continue
                 payload = {
-                    'chat_id': self.telegram_chat_id,
+                    'chat_id': chat_id,
                     'text': chunk,
                     'parse_mode': 'Markdown',
                     'disable_web_page_preview': False
                 }
 
-                response = requests.post(url, json=payload, timeout=30)
+                self.rate_limiter.acquire('telegram', chat_id)
+                response = session.post(url, json=payload, timeout=30)
+                self._check_rate_limit('telegram', chat_id, response)
 
                 if response.status_code != 200:
-                    logger.error(f"Telegram error: {response.text}")
+                    logger.error(f"Telegram error ({chat_id}): {response.text}")
                     return False
+                progress['sent'] = i + 1
 
-            logger.info("✓ Telegram message sent")
+            logger.info(f"✓ Telegram message sent to {chat_id} ({len(chunks)} part(s))")
             return True
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error sending Telegram message: {e}")
             return False
 
     def send_notifications(self, whatsapp_message=None, email_subject=None,
-                           email_html=None, telegram_message=None):
-        """Send notifications via all configured channels"""
+                           email_html=None, telegram_message=None, skip_delivered=None):
+        """
+        Send notifications via all configured channels.
+        skip_delivered: previous delivery_results; destinations that already
+        succeeded are not sent to again (used when retrying a run)
+        """
         results = {
             'whatsapp': False,
             'email': False,
             'telegram': False
         }
 
-        if whatsapp_message and self.callmebot_phone:
-            results['whatsapp'] = self.send_whatsapp_callmebot(whatsapp_message)
-
-        if email_subject and email_html and self.gmail_user:
-            results['email'] = self.send_email_gmail(email_subject, email_html)
-
-        if telegram_message and self.telegram_bot_token:
-            results['telegram'] = self.send_telegram(telegram_message)
+        # Queue everything up front so all providers drain in parallel
+        jobs = []
+        if whatsapp_message and self.callmebot_phone and self.callmebot_apikey:
+            jobs.append(('callmebot', self.callmebot_phone, self._send_whatsapp_to, whatsapp_message))
+
+        if email_subject and email_html and self.gmail_user and self.gmail_app_password:
+            jobs.extend(('gmail', recipient, self._send_email_to, recipient, email_subject, email_html)
+                        for recipient in self.email_recipients)
+
+        if telegram_message and self.telegram_bot_token and self.telegram_chat_ids:
+            jobs.extend(self._telegram_jobs(telegram_message))
+
+        if skip_delivered:
+            already = {(provider, destination) for provider, outcomes in skip_delivered.items()
+                       for destination, ok in outcomes.items() if ok}
+            skipped = [job for job in jobs if (job[0], job[1]) in already]
+            jobs = [job for job in jobs if (job[0], job[1]) not in already]
+            if skipped:
+                logger.info(f"Skipping {len(skipped)} destination(s) that already received this digest")
+
+        sent = self._fan_out(jobs)
+        if skip_delivered:
+            # Previously delivered destinations still count towards the channel result
+            for provider, destination, *_ in skipped:
+                self.delivery_results.setdefault(provider, {})[destination] = True
+                sent[provider] = sent.get(provider, True)
+        results['whatsapp'] = sent.get('callmebot', False)
+        results['email'] = sent.get('gmail', False)
+        results['telegram'] = sent.get('telegram', False)
+
+        chats = self.delivery_results.get('telegram', {})
+        if len(chats) > 1:
+            delivered = sum(1 for ok in chats.values() if ok)
+            logger.info(f"Telegram delivered to {delivered}/{len(chats)} chats")
 
         return results
 
 
 if __name__ == "__main__":
+    from logging_setup import setup_logging
+    setup_logging()
+
     # Test the notifier
     notifier = Notifier()
 
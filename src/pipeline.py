@@ -0,0 +1,284 @@
+"""
+Streaming Pipeline Module
+Runs fetch -> parse -> clean -> dedup -> score -> select as concurrent stages
+connected by bounded queues, so articles flow downstream as soon as their feed arrives.
+With PARSE_WORKERS set, parse and clean (CPU-bound, so serialized by the GIL) run in
+batches on a process pool instead
+"""
+
+import os
+import heapq
+import queue
+import time
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+import metrics
+from circuit_breaker import SourceSkipped, DEADLINE_REACHED
+from news_scraper import parse_batch
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class StreamingPipeline:
+    def __init__(self, scraper, processor, queue_size=100, fetch_workers=8, parse_workers=None,
+                 batch_feeds=8, batch_bytes=4 << 20):
+        self.scraper = scraper
+        self.processor = processor
+        self.queue_size = queue_size  # Bounded queues give backpressure between stages
+        self.fetch_workers = fetch_workers
+        # Processes for parse + clean: PARSE_WORKERS=N, or 'auto' for one per core; 0/unset keeps them in threads
+        if parse_workers is None:
+            setting = os.getenv('PARSE_WORKERS', '0').lower()
+            parse_workers = (os.cpu_count() or 1) if setting == 'auto' else int(setting)
+        self.parse_workers = parse_workers
+        self.batch_feeds = batch_feeds  # Feeds per batch sent to a worker process...
+        self.batch_bytes = batch_bytes  # ...or fewer, once they add up to this many bytes
+        self.process_pool = None
+        self.pool_lock = threading.Lock()
+        self.profiler = None  # Optional profiler.Profiler
+
+    def _profile(self, name):
+        """Per-thread CPU profile of a stage; memory isn't split since stages run concurrently"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(f'scrape.{name}', memory=False)
+
+    def _fetch(self, outbox, run):
+        """Fetch every source concurrently, emitting (source, content) as each one arrives"""
+        sources = run['sources']
+        deadline = run['deadline']
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.fetch_workers, len(sources))))
+        futures = {pool.submit(self.scraper.fetch_feed, url, name, deadline): name for name, url in sources.items()}
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                source_name = futures[future]
+                try:
+                    outbox.put((source_name, future.result()))
+                    metrics.STAGE_ITEMS.inc(stage='fetch')
+                    logger.info(f"Fetched {source_name} after {time.monotonic() - run['started']:.2f}s")
+                except SourceSkipped as e:
+                    run['skipped'][source_name] = e.reason
+                except Exception as e:
+                    logger.error(f"Error scraping {source_name}: {e}")
+        except FuturesTimeoutError:
+            # Don't wait for stragglers; they stop on their own at the deadline
+            for future, source_name in futures.items():
+                if not future.done():
+                    run['skipped'][source_name] = DEADLINE_REACHED
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _parse(self, item):
+        source_name, content = item
+        articles = self.scraper.parse_feed(content, source_name)
+        logger.info(f"Scraped {len(articles)} articles from {source_name}")
+        return articles
+
+    def _clean(self, article):
+        return [self.scraper.clean_article(article)]
+
+    def _pool(self):
+        """The parse process pool, started on first use and kept across runs"""
+        # Imported here: multiprocessing adds to startup, and most runs never use it
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self.pool_lock:
+            if self.process_pool is None:
+                # Not fork: the pipeline's other threads may hold locks a forked child would inherit
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self.process_pool = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context)
+            return self.process_pool
+
+    def close(self):
+        """Stop the parse worker processes, if any were started"""
+        with self.pool_lock:
+            if self.process_pool is not None:
+                self.process_pool.shutdown(wait=True, cancel_futures=True)
+                self.process_pool = None
+
+    def _next_batch(self, inbox, block):
+        """
+        Up to batch_feeds fetched feeds (or batch_bytes of them) from inbox, without waiting
+        for more than the first; returns (batch, done) where done means inbox has ended.
+        """
+        batch, size = [], 0
+        while len(batch) < self.batch_feeds and size < self.batch_bytes:
+            try:
+                # Wait for the first feed; while batches are in flight only briefly, to collect their results
+                item = inbox.get(timeout=None if block else 0.05) if not batch else inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+            size += len(item[1] or b'')
+        return batch, False
+
+    def _emit_batch(self, future, outbox):
+        """Push a finished batch's articles downstream as dicts again"""
+        processed = 0
+        for source_name, rows, seconds, error, mark in future.result():
+            if error is not None:
+                logger.warning(f"Pipeline stage parse failed on {source_name}: {error}")
+                continue
+            if mark is not None and self.scraper.high_water is not None:
+                self.scraper.high_water.set(source_name, mark)
+            metrics.PARSE_SECONDS.observe(seconds, source=source_name)
+            metrics.FEED_ENTRIES.observe(len(rows), source=source_name)
+            logger.info(f"Scraped {len(rows)} articles from {source_name}")
+            for title, link, summary, published in rows:
+                outbox.put({'title': title, 'link': link, 'summary': summary, 'published': published,
+                            'source': source_name})
+                processed += 1
+        return processed
+
+    def _parse_offloaded(self, inbox, outbox):
+        """
+        Parse and clean stage on the process pool: fetched feeds are sent in batches (their raw
+        bytes pickle cheaply) with up to two batches per worker in flight, and cleaned articles
+        are pushed downstream as each batch finishes.
+        """
+        processed = feeds = 0
+        started = time.perf_counter()
+        pool = self._pool()
+        in_flight = set()
+        done = False
+        try:
+            with self._profile('parse'):
+                while not done or in_flight:
+                    accepting = not done and len(in_flight) < 2 * self.parse_workers
+                    if accepting:
+                        batch, done = self._next_batch(inbox, block=not in_flight)
+                        if batch:
+                            feeds += len(batch)
+                            marks = None
+                            if self.scraper.high_water is not None:
+                                marks = {source_name: self.scraper.high_water.get(source_name) for source_name, _ in batch}
+                            in_flight.add(pool.submit(parse_batch, batch, self.scraper.html_cleaner, marks))
+                    # Only block on the workers when there is nothing else to do
+                    finished, in_flight = wait(in_flight, timeout=0 if accepting else None, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        try:
+                            processed += self._emit_batch(future, outbox)
+                        except Exception as e:
+                            logger.warning(f"Pipeline stage parse failed on a batch: {e}")
+        finally:
+            outbox.put(_DONE)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage='parse')
+            metrics.STAGE_ITEMS.inc(feeds, stage='parse')
+            metrics.STAGE_ITEMS.inc(processed, stage='clean')
+            logger.debug(f"Stage parse finished ({feeds} feeds, {processed} articles on {self.parse_workers} processes)")
+
+    def _dedup(self, article, run):
+        key = self.scraper.title_key(article)
+        if run['dedup'] and key in run['seen_titles']:
+            return []
+        run['seen_titles'].add(key)
+        run['articles'].append(article)
+        return [article]
+
+    def _score(self, article):
+        article['score'] = self.processor.rank_article(article)
+        return [article]
+
+    def _stage(self, name, func, inbox, outbox):
+        """Apply func to every item from inbox, pushing its outputs downstream"""
+        processed = 0
+        started = time.perf_counter()
+        try:
+            with self._profile(name):
+                while True:
+                    item = inbox.get()
+                    if item is _DONE:
+                        break
+                    processed += 1
+                    try:
+                        for output in func(item):
+                            outbox.put(output)
+                    except Exception as e:
+                        logger.warning(f"Pipeline stage {name} failed on an item: {e}")
+        finally:
+            outbox.put(_DONE)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+            metrics.STAGE_ITEMS.inc(processed, stage=name)
+            logger.debug(f"Stage {name} finished ({processed} items)")
+
+    def _select(self, inbox, min_score, max_articles):
+        """Keep the top max_articles by score; ties keep arrival order like a stable sort"""
+        heap = []
+        sequence = 0
+        while True:
+            article = inbox.get()
+            if article is _DONE:
+                break
+            if article['score'] < min_score:
+                continue
+            entry = (article['score'], -sequence, article)
+            sequence += 1
+            if len(heap) < max_articles:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        return [article for _, _, article in sorted(heap, key=lambda e: e[:2], reverse=True)]
+
+    def run(self, min_score=1, max_articles=15, deadline_seconds=None, dedup=True, sources=None, skipped=None):
+        """
+        Run all stages; returns (unique articles, ranked selection).
+        Sources not fetched within deadline_seconds (default: the scraper's) are skipped
+        and reported in the log and metrics, and in the skipped dict ({source: reason})
+        if one is passed. sources overrides scraper.sources for this run;
+        dedup=False keeps same-titled articles from different sources (for callers that
+        deduplicate subsets of sources themselves).
+        """
+        started = time.monotonic()
+        # Per-run state, so overlapping runs can share one pipeline
+        run = {'started': started, 'seen_titles': set(), 'articles': [], 'skipped': {}, 'dedup': dedup,
+               'sources': sources if sources is not None else self.scraper.sources,
+               'deadline': started + (deadline_seconds or self.scraper.deadline_seconds)}
+
+        fetched, parsed, cleaned, unique, scored = (queue.Queue(self.queue_size) for _ in range(5))
+
+        def fetch_stage():
+            try:
+                with metrics.STAGE_SECONDS.time(stage='fetch'), self._profile('fetch'):
+                    self._fetch(fetched, run)
+            finally:
+                fetched.put(_DONE)
+
+        if self.parse_workers > 0:
+            parse_threads = [threading.Thread(target=self._parse_offloaded, args=(fetched, cleaned),
+                                              name='pipeline-parse')]
+        else:
+            parse_threads = [
+                threading.Thread(target=self._stage, args=('parse', self._parse, fetched, parsed), name='pipeline-parse'),
+                threading.Thread(target=self._stage, args=('clean', self._clean, parsed, cleaned), name='pipeline-clean'),
+            ]
+        threads = [
+            threading.Thread(target=fetch_stage, name='pipeline-fetch'),
+            *parse_threads,
+            threading.Thread(target=self._stage, args=('dedup', lambda article: self._dedup(article, run), cleaned, unique), name='pipeline-dedup'),
+            threading.Thread(target=self._stage, args=('score', self._score, unique, scored), name='pipeline-score'),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        with metrics.STAGE_SECONDS.time(stage='select'), self._profile('select'):
+            selected = self._select(scored, min_score, max_articles)
+        metrics.STAGE_ITEMS.inc(len(selected), stage='select')
+        for thread in threads:
+            thread.join()
+
+        self.scraper.report_skipped(run['skipped'], len(run['sources']))
+        if skipped is not None:
+            skipped.update(run['skipped'])
+        logger.info(f"Pipeline finished in {time.monotonic() - run['started']:.2f}s: "
+                    f"{len(run['articles'])} unique articles, {len(selected)} selected")
+        return run['articles'], selected
@@ -0,0 +1,162 @@
+"""
+Render Cache Module
+Caches rendered digests keyed by (ordered article selection, template version, channel, profile bucket,
+render settings) in a size-bounded in-memory LRU backed by an on-disk tier
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from content_processor import TEMPLATE_VERSION
+import metrics
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE = metrics.registry.counter('digest_render_cache_total', 'Render cache lookups',
+                                        ['channel', 'result'])
+
+
+def article_id(article):
+    """Identity of an article as rendered: its link plus the fields the templates print"""
+    fields = [article.get(k, '') for k in ('link', 'title', 'summary', 'content', 'source', 'published', 'story')]
+    return hashlib.sha1('\x1f'.join(str(f) for f in fields).encode('utf-8')).hexdigest()[:16]
+
+
+class RenderCache:
+    def __init__(self, cache_dir='data/render_cache', max_entries=256, max_disk_entries=2000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.in_flight = {}  # key -> Event, so concurrent identical renders happen once
+        self.stats = {}      # channel -> {'memory': n, 'disk': n, 'miss': n} since start_run()
+
+    @staticmethod
+    def key(articles, channel, profile='default', settings=None):
+        """
+        Cache key; the date is included because the templates print it, and settings (the digest
+        title, summary budgets, ...) because they change the output too
+        """
+        data = {
+            'articles': [article_id(a) for a in articles],
+            'template': TEMPLATE_VERSION,
+            'channel': channel,
+            'profile': profile,
+            'settings': settings,
+            'date': datetime.now().strftime('%Y-%m-%d'),
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def _record(self, channel, result):
+        RENDER_CACHE.inc(channel=channel, result=result)
+        with self.lock:
+            counts = self.stats.setdefault(channel, {'memory': 0, 'disk': 0, 'miss': 0})
+            counts[result] += 1
+
+    def _remember(self, key, output):
+        with self.lock:
+            self.memory[key] = output
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                output = json.load(f)['output']
+            # prune_disk() evicts by modification time: mark the entry as recently used
+            os.utime(path)
+            return output
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, channel, output):
+        try:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'channel': channel, 'output': output}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing render cache entry: {e}")
+
+    def get_or_render(self, articles, channel, render, profile='default', settings=None):
+        """Rendered output for this selection, calling render(articles) only on a miss"""
+        key = self.key(articles, channel, profile, settings)
+        while True:
+            with self.lock:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    output = self.memory[key]
+                    break
+                waiting = self.in_flight.get(key)
+                if waiting is None:
+                    self.in_flight[key] = threading.Event()
+                    output = None
+                    break
+            # Someone else is rendering the same digest; wait and re-check memory
+            waiting.wait()
+
+        if output is not None:
+            self._record(channel, 'memory')
+            return output
+
+        try:
+            output = self._read_disk(key)
+            if output is not None:
+                self._record(channel, 'disk')
+            else:
+                output = render(articles)
+                self._record(channel, 'miss')
+                self._write_disk(key, channel, output)
+            self._remember(key, output)
+            return output
+        finally:
+            with self.lock:
+                self.in_flight.pop(key).set()
+
+    def start_run(self):
+        with self.lock:
+            self.stats = {}
+
+    def hit_ratios(self):
+        """{channel: share of lookups served from memory or disk} since start_run()"""
+        with self.lock:
+            return {channel: (c['memory'] + c['disk']) / (c['memory'] + c['disk'] + c['miss'])
+                    for channel, c in self.stats.items()}
+
+    def report(self):
+        with self.lock:
+            stats = {channel: dict(c) for channel, c in self.stats.items()}
+        for channel, c in sorted(stats.items()):
+            total = c['memory'] + c['disk'] + c['miss']
+            logger.info(f"Render cache [{channel}]: {(c['memory'] + c['disk']) / total:.0%} hit ratio "
+                        f"({c['memory']} memory, {c['disk']} disk, {c['miss']} rendered)")
+        return stats
+
+    def prune_disk(self):
+        """Keep the max_disk_entries most recently used files on disk"""
+        try:
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                files.extend(os.path.join(root, n) for n in names if n.endswith('.json'))
+            if len(files) <= self.max_disk_entries:
+                return 0
+            files.sort(key=os.path.getmtime)
+            stale = files[:len(files) - self.max_disk_entries]
+            for path in stale:
+                os.remove(path)
+            return len(stale)
+        except Exception as e:
+            logger.error(f"Error pruning render cache: {e}")
+            return 0
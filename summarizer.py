@@ -0,0 +1,201 @@
+"""
+Summarizer Module
+Extractive summaries within a per-channel character budget: sentences are scored by
+TF-IDF centrality (similarity to the rest of their article), computed for a whole batch
+of articles at once with numpy, and results are cached by content hash
+"""
+
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bump when the summarization method changes, so cached summaries are not reused
+SUMMARIZER_VERSION = 1
+DIMENSIONS = 1 << 20  # Hashed term space
+
+SENTENCE_END = re.compile(r'(?<=[.!?…])["\')\]]*\s+(?=[A-Z0-9"\'(\[])')
+WORD = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(' '.join(text.split())) if s.strip()]
+
+
+def _shorten(text, budget):
+    """Cut at a word boundary so text plus an ellipsis fits the budget"""
+    if len(text) <= budget:
+        return text
+    cut = text[:max(1, budget - 1)]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip(' ,;:-') + '…'
+
+
+class Summarizer:
+    def __init__(self, budgets=None, cache_file='data/summary_cache.json', max_entries=20000):
+        """cache_file=None keeps the cache in memory only"""
+        # Characters per summary for each channel
+        self.budgets = budgets or {
+            'email': int(os.getenv('SUMMARY_CHARS_EMAIL', '500')),
+            'whatsapp': int(os.getenv('SUMMARY_CHARS_WHATSAPP', '200')),
+            'alert': 200,
+        }
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.cache = OrderedDict()  # content hash -> summary
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.dirty = False
+        self.warned = False
+        self.stats = {'hit': 0, 'miss': 0}
+
+    @staticmethod
+    def _key(text, budget):
+        return hashlib.sha1(f"{SUMMARIZER_VERSION}\x1f{budget}\x1f{text}".encode('utf-8')).hexdigest()[:20]
+
+    def summarize(self, texts, channel):
+        """Summaries of texts within the channel's budget; only uncached texts are summarized"""
+        budget = self.budgets.get(channel, 200)
+        self._load()
+        keys = [self._key(text, budget) for text in texts]
+        results = [None] * len(texts)
+        pending = []
+        with self.lock:
+            for i, key in enumerate(keys):
+                summary = self.cache.get(key)
+                if summary is None:
+                    pending.append(i)
+                else:
+                    self.cache.move_to_end(key)
+                    results[i] = summary
+            self.stats['hit'] += len(texts) - len(pending)
+            self.stats['miss'] += len(pending)
+
+        if pending:
+            computed = self._summarize_batch([texts[i] for i in pending], budget)
+            with self.lock:
+                for i, summary in zip(pending, computed):
+                    results[i] = summary
+                    self.cache[keys[i]] = summary
+                while len(self.cache) > self.max_entries:
+                    self.cache.popitem(last=False)
+                self.dirty = True
+        return results
+
+    def _summarize_batch(self, texts, budget):
+        sentences = [split_sentences(text) for text in texts]
+        try:
+            import numpy
+        except ImportError:
+            if not self.warned:
+                logger.warning("numpy is not installed; summaries use leading sentences only (pip install numpy)")
+                self.warned = True
+            scores = [[-i for i in range(len(s))] for s in sentences]
+        else:
+            scores = self._centrality(numpy, sentences)
+        return [self._select(s, sc, budget) for s, sc in zip(sentences, scores)]
+
+    @staticmethod
+    def _centrality(np, articles):
+        """
+        Per article, each sentence's summed cosine similarity to the article's other sentences,
+        over hashed TF-IDF vectors (a sentence is a document). With unit vectors x_i and the
+        article sum s, sum over j != i of x_i . x_j = x_i . s - 1, so a few passes over the
+        nonzeros of the whole batch replace the per-article pairwise loops.
+        """
+        rows, cols, counts, owner = [], [], [], []
+        row = 0
+        for index, sentences in enumerate(articles):
+            for sentence in sentences:
+                terms = {}
+                for word in WORD.findall(sentence.lower()):
+                    if len(word) > 2:
+                        column = zlib.crc32(word.encode('utf-8')) & (DIMENSIONS - 1)
+                        terms[column] = terms.get(column, 0) + 1
+                for column, count in terms.items():
+                    rows.append(row)
+                    cols.append(column)
+                    counts.append(count)
+                owner.append(index)
+                row += 1
+        if not row:
+            return [[] for _ in articles]
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        owner = np.asarray(owner, dtype=np.int64)
+        _, terms, df = np.unique(cols, return_inverse=True, return_counts=True)
+        values = (1 + np.log(np.asarray(counts, dtype=np.float64))) * (np.log((row + 1) / (df[terms] + 1)) + 1)
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=row))
+        values /= np.where(norms > 0, norms, 1)[rows]
+        # Article sum vectors, sparse: one entry per (article, term)
+        _, cells = np.unique(owner[rows] * DIMENSIONS + cols, return_inverse=True)
+        sums = np.bincount(cells, weights=values)
+        centrality = np.bincount(rows, weights=values * sums[cells], minlength=row) - 1
+        centrality[norms == 0] = -1  # No usable terms
+
+        scores = []
+        row = 0
+        for sentences in articles:
+            scores.append(centrality[row:row + len(sentences)].tolist())
+            row += len(sentences)
+        return scores
+
+    @staticmethod
+    def _select(sentences, scores, budget):
+        """Most central sentences that fit the budget, in their original order; the lead breaks ties"""
+        if not sentences:
+            return ''
+        if sum(len(s) + 1 for s in sentences) - 1 <= budget:
+            return ' '.join(sentences)
+        # News leads usually state the story: favour the first sentence a little
+        ranked = sorted(range(len(sentences)), key=lambda i: (scores[i] + (0.5 if i == 0 else 0), -i), reverse=True)
+        chosen, used = [], 0
+        for i in ranked:
+            length = len(sentences[i]) + (1 if chosen else 0)
+            if used + length <= budget:
+                chosen.append(i)
+                used += length
+        if not chosen:
+            return _shorten(sentences[ranked[0]], budget)
+        return ' '.join(sentences[i] for i in sorted(chosen))
+
+    def _load(self):
+        with self.lock:
+            if self.loaded or not self.cache_file:
+                return
+            self.loaded = True
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.cache.update(json.load(f))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error loading summary cache: {e}")
+
+    def save(self):
+        """Persist the cache (if anything was added) and log this run's hit ratio"""
+        with self.lock:
+            hits, misses = self.stats['hit'], self.stats['miss']
+            self.stats = {'hit': 0, 'miss': 0}
+            dirty, self.dirty = self.dirty, False
+            entries = dict(self.cache) if dirty else None
+        if hits + misses:
+            logger.info(f"Summary cache: {hits}/{hits + misses} hits")
+        if not dirty or not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            tmp_path = self.cache_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.error(f"Error saving summary cache: {e}")
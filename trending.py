@@ -0,0 +1,258 @@
+"""
+Trending Module
+Streaming burst detection for terms across sources: count-min sketches in time-bucketed
+sliding windows (fixed memory regardless of vocabulary), burst scores against a baseline,
+and a ranking boost for articles that mention trending terms
+"""
+
+import os
+import re
+import zlib
+import base64
+import json
+import math
+import time
+import calendar
+import hashlib
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.+\-]*[a-z0-9+]|[a-z0-9]")
+STOPWORDS = frozenset('''
+    a about after all also an and any are as at be been but by can could did do does for from had has have
+    how in into is it its just more most new news not of on one or our out over said says than that the
+    their them then there these they this to up us was we what when which while who why will with would
+    you your how-to today week year years first last get gets make makes use using via vs
+'''.split())
+
+
+def extract_terms(article):
+    """Unigrams and bigrams of the title and summary, lowercased, stopwords dropped"""
+    text = f"{article.get('title', '')} {article.get('summary', '')}".lower()
+    words = [w for w in TOKEN_PATTERN.findall(text) if len(w) >= 3 or w[0].isdigit()]
+    terms = {w for w in words if w not in STOPWORDS and not w.isdigit()}
+    for first, second in zip(words, words[1:]):
+        if first not in STOPWORDS and second not in STOPWORDS:
+            terms.add(f"{first} {second}")
+    return terms
+
+
+def _hashes(key, depth, width):
+    """depth column indexes for key (double hashing over one stable 128-bit digest)"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % width for i in range(depth)]
+
+
+class CountMinSketch:
+    """Approximate counts in depth x width 32-bit cells; estimates never undercount"""
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        self.cells = array('I', bytes(4 * width * depth))
+
+    def add(self, key, count=1):
+        """Add and return the new estimate"""
+        estimate = None
+        for row, column in enumerate(_hashes(key, self.depth, self.width)):
+            index = row * self.width + column
+            self.cells[index] += count
+            value = self.cells[index]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key):
+        return min(self.cells[row * self.width + column]
+                   for row, column in enumerate(_hashes(key, self.depth, self.width)))
+
+
+def _pair_key(term, source):
+    """Stable 64-bit hash of a (term, source) pair"""
+    digest = hashlib.blake2b(f"{term}\x1f{source}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _encode(cells):
+    return base64.b64encode(zlib.compress(cells.tobytes())).decode('ascii')
+
+
+def _decode(text, typecode='I'):
+    return array(typecode, zlib.decompress(base64.b64decode(text)))
+
+
+class _Bucket:
+    """One time slice: how many distinct sources mentioned each term"""
+
+    def __init__(self, start, width, depth):
+        self.start = start
+        self.sources = CountMinSketch(width, depth)  # term -> distinct sources
+        # Hashes of the (term, source) pairs seen in this bucket. Exact, unlike a sketch: a pair
+        # colliding with another would never be counted. Grows with the bucket's articles, not the vocabulary.
+        self.pairs = set()
+
+
+class TrendTracker:
+    """
+    A ring of `buckets` time buckets of `bucket_seconds` each. The newest `window` buckets
+    are compared against the average of the older ones (the baseline).
+    """
+
+    def __init__(self, bucket_seconds=3600, buckets=48, window=3, width=1024, depth=4,
+                 min_sources=3, threshold=3.0, max_boost=5, top_terms=500,
+                 state_file='data/trending_state.json'):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.window = window
+        self.width = width
+        self.depth = depth
+        self.min_sources = min_sources
+        self.threshold = threshold
+        self.max_boost = max_boost
+        self.top_terms = top_terms
+        self.state_file = state_file
+        self.ring = {}        # bucket index -> _Bucket
+        self.candidates = {}  # term -> [last bucket index, sources] within the window (bounded, for reporting)
+        self.scores = {}      # term -> burst score, cleared on observe()
+        self.lock = threading.Lock()
+        self.load()
+
+    def _bucket_index(self, timestamp):
+        return int(timestamp // self.bucket_seconds)
+
+    def _published(self, article, now):
+        try:
+            # news_scraper writes published times in UTC
+            return calendar.timegm(time.strptime(article.get('published', ''), '%Y-%m-%d %H:%M'))
+        except ValueError:
+            return now
+
+    def observe(self, articles, now=None):
+        """
+        Count each article's terms in the bucket of its publication time. A term counts once per
+        source and bucket, so observing the same articles again (every poll or run) changes nothing.
+        """
+        now = now or time.time()
+        current = self._bucket_index(now)
+        with self.lock:
+            self._expire(current)
+            for article in articles:
+                index = min(self._bucket_index(self._published(article, now)), current)
+                if index <= current - self.buckets:
+                    continue  # Older than the ring
+                bucket = self.ring.get(index)
+                if bucket is None:
+                    bucket = self.ring[index] = _Bucket(index, self.width, self.depth)
+                source = article.get('source', '')
+                for term in extract_terms(article):
+                    # Count each source once per term and bucket
+                    pair = _pair_key(term, source)
+                    if pair not in bucket.pairs:
+                        bucket.pairs.add(pair)
+                        bucket.sources.add(term)
+                        if index > current - self.window:
+                            candidate = self.candidates.setdefault(term, [index, 0])
+                            candidate[0] = max(candidate[0], index)
+                            candidate[1] += 1
+            if len(self.candidates) > self.top_terms:
+                keep = sorted(self.candidates.items(), key=lambda item: item[1][1], reverse=True)[:self.top_terms]
+                self.candidates = dict(keep)
+            self.scores = {}
+
+    def _expire(self, current):
+        for index in [i for i in self.ring if i <= current - self.buckets]:
+            del self.ring[index]
+        self.candidates = {term: c for term, c in self.candidates.items() if c[0] > current - self.window}
+
+    def burst(self, term, now=None):
+        """(burst score, sources in the window): window count versus the per-window baseline average"""
+        current = self._bucket_index(now or time.time())
+        with self.lock:
+            window_count = 0
+            baseline_total = 0
+            for index in range(current - self.buckets + 1, current + 1):
+                bucket = self.ring.get(index)
+                count = bucket.sources.estimate(term) if bucket else 0
+                if index > current - self.window:
+                    window_count += count
+                else:
+                    baseline_total += count
+            warming_up = not self.ring or min(self.ring) > current - 2 * self.window
+        if warming_up:
+            # No baseline yet (fresh state): everything would look like a burst
+            return 0.0, window_count
+        baseline_windows = (self.buckets - self.window) / self.window
+        expected = baseline_total / baseline_windows
+        return (window_count - expected) / math.sqrt(expected + 1), window_count
+
+    def term_score(self, term):
+        score = self.scores.get(term)
+        if score is None:
+            burst, sources = self.burst(term)
+            score = burst if sources >= self.min_sources else 0.0
+            self.scores[term] = score
+        return score
+
+    def boost(self, article):
+        """Extra ranking points for an article mentioning a bursting term (0..max_boost)"""
+        best = max((self.term_score(t) for t in extract_terms({'title': article.get('title', '')})), default=0.0)
+        if best < self.threshold:
+            return 0
+        return min(self.max_boost, int(round(best - self.threshold)) + 1)
+
+    def trending(self, top=10):
+        """[(term, burst score, sources)] for the currently bursting candidate terms"""
+        results = []
+        for term in list(self.candidates):
+            score, sources = self.burst(term)
+            if sources >= self.min_sources and score >= self.threshold:
+                results.append((term, round(score, 2), sources))
+        results.sort(key=lambda r: r[1], reverse=True)
+        # Drop unigrams already covered by a trending bigram
+        bigrams = [term for term, _, _ in results if ' ' in term]
+        results = [r for r in results if ' ' in r[0] or not any(r[0] in b.split() for b in bigrams)]
+        return results[:top]
+
+    def save(self):
+        """Persist the ring so baselines survive restarts"""
+        try:
+            with self.lock:
+                state = {
+                    'bucket_seconds': self.bucket_seconds, 'width': self.width, 'depth': self.depth,
+                    'pairs': 'exact', 'candidates': self.candidates,
+                    'ring': {str(i): [_encode(b.sources.cells), _encode(array('Q', sorted(b.pairs)))]
+                             for i, b in self.ring.items()},
+                }
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = self.state_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving trending state: {e}")
+
+    def load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error loading trending state, starting fresh: {e}")
+            return
+        if (state['bucket_seconds'], state['width'], state['depth']) != (self.bucket_seconds, self.width, self.depth):
+            logger.info("Trending settings changed; starting a fresh baseline")
+            return
+        if state.get('pairs') != 'exact':
+            logger.info("Trending state is from an older version; starting a fresh baseline")
+            return
+        self.candidates = state['candidates']
+        for index, (sources, pairs) in state['ring'].items():
+            bucket = _Bucket(int(index), self.width, self.depth)
+            bucket.sources.cells = _decode(sources)
+            bucket.pairs = set(_decode(pairs, 'Q'))
+            self.ring[int(index)] = bucket
@@ -0,0 +1,164 @@
+"""
+Watcher Module
+Continuous watch mode: polls sources with conditional GETs, scores only new arrivals
+and sends an immediate alert for articles above a score threshold
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from circuit_breaker import SourceSkipped
+
+logger = logging.getLogger(__name__)
+
+ALERT_LATENCY = metrics.registry.histogram('digest_alert_latency_seconds',
+                                           'Time from detecting an article to delivering its alert')
+ALERTS = metrics.registry.counter('digest_alerts_total', 'Breaking-news alert decisions', ['result'])
+
+# Links remembered per source to tell new arrivals from entries already seen
+SEEN_PER_SOURCE = 500
+# How long an alerted story blocks re-alerts of the same title
+ALERT_MEMORY_SECONDS = 7 * 24 * 3600
+
+
+class Watcher:
+    def __init__(self, scraper, processor, notifier, threshold=None, alerts_per_hour=None,
+                 poll_interval=None, state_file='data/watch_state.json'):
+        self.scraper = scraper
+        self.processor = processor
+        self.notifier = notifier
+        self.threshold = threshold if threshold is not None else int(os.getenv('ALERT_SCORE_THRESHOLD', '6'))
+        self.alerts_per_hour = alerts_per_hour if alerts_per_hour is not None else int(os.getenv('ALERTS_PER_HOUR', '5'))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('WATCH_INTERVAL', '30'))
+        self.state_file = state_file
+        self.stopped = threading.Event()
+        self.state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        except Exception as e:
+            logger.error(f"Error loading watch state, starting fresh: {e}")
+            state = {}
+        state.setdefault('validators', {})  # source -> {'etag', 'last_modified'}
+        state.setdefault('seen', {})        # source -> recent links, oldest first
+        state.setdefault('alerted', {})     # title key -> alert timestamp
+        state.setdefault('sent_at', [])     # alert timestamps within the last hour
+        return state
+
+    def _save_state(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = self.state_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving watch state: {e}")
+
+    def _poll_source(self, source_name, url):
+        """New articles from one source since the last poll (none on the first poll: it sets the baseline)"""
+        content, validators = self.scraper.fetch_feed_if_changed(url, source_name,
+                                                                 self.state['validators'].get(source_name))
+        self.state['validators'][source_name] = validators
+        if content is None:
+            return []
+
+        articles = self.scraper.parse_feed(content, source_name)
+        seen = self.state['seen'].get(source_name)
+        first_poll = seen is None
+        seen = seen or []
+        seen_links = set(seen)
+        new = [a for a in articles if a['link'] not in seen_links]
+        seen.extend(a['link'] for a in new)
+        self.state['seen'][source_name] = seen[-SEEN_PER_SOURCE:]
+        return [] if first_poll else new
+
+    def _under_cap(self, now):
+        self.state['sent_at'] = [t for t in self.state['sent_at'] if now - t < 3600]
+        return len(self.state['sent_at']) < self.alerts_per_hour
+
+    def _alert(self, article, detected_at):
+        message = self.processor.format_alert(article)
+        results = self.notifier.send_notifications(whatsapp_message=message, telegram_message=message)
+        if not any(results.values()):
+            ALERTS.inc(result='failed')
+            logger.warning(f"Alert not delivered: {article['title']}")
+            return False
+        latency = time.monotonic() - detected_at
+        ALERT_LATENCY.observe(latency)
+        ALERTS.inc(result='sent')
+        logger.info(f"Alert sent in {latency:.1f}s: {article['title']}")
+        return True
+
+    def poll_once(self):
+        """One pass over all sources; returns the number of alerts sent"""
+        with ThreadPoolExecutor(max_workers=min(8, len(self.scraper.sources) or 1)) as executor:
+            futures = {executor.submit(self._poll_source, name, url): name
+                       for name, url in self.scraper.sources.items()}
+            arrivals = []
+            for future, name in futures.items():
+                try:
+                    arrivals.extend(future.result())
+                except SourceSkipped as e:
+                    logger.debug(str(e))
+                except Exception as e:
+                    logger.error(f"Error polling {name}: {e}")
+        detected_at = time.monotonic()
+
+        now = time.time()
+        self.state['alerted'] = {key: t for key, t in self.state['alerted'].items()
+                                 if now - t < ALERT_MEMORY_SECONDS}
+        sent = 0
+        candidates = []
+        arrivals = [self.scraper.clean_article(article) for article in arrivals]
+        if self.processor.trends is not None and arrivals:
+            # Score new arrivals against bursts that include them
+            self.processor.trends.observe(arrivals)
+            self.processor.trends.save()
+        for article in arrivals:
+            article['score'] = self.processor.rank_article(article)
+            if article['score'] >= self.threshold:
+                candidates.append(article)
+        for article in sorted(candidates, key=lambda a: a['score'], reverse=True):
+            key = self.scraper.title_key(article)
+            if key in self.state['alerted']:
+                ALERTS.inc(result='duplicate')
+                continue
+            if not self._under_cap(now):
+                ALERTS.inc(result='capped')
+                logger.warning(f"Alert cap ({self.alerts_per_hour}/hour) reached; not alerting: {article['title']}")
+                continue
+            if self._alert(article, detected_at):
+                self.state['alerted'][key] = now
+                self.state['sent_at'].append(now)
+                sent += 1
+
+        if arrivals:
+            logger.info(f"{len(arrivals)} new article(s), {len(candidates)} above threshold, {sent} alert(s) sent")
+        if sent:
+            self.processor.summarizer.save()
+        self._save_state()
+        return sent
+
+    def run_forever(self):
+        """Poll every poll_interval seconds until stop(); sleeps (no CPU) between polls"""
+        logger.info(f"Watching {len(self.scraper.sources)} sources every {self.poll_interval:g}s "
+                    f"(threshold {self.threshold}, max {self.alerts_per_hour} alerts/hour)")
+        while not self.stopped.is_set():
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Error in watch poll: {e}", exc_info=True)
+            self.stopped.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self.stopped.set()
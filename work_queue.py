@@ -0,0 +1,286 @@
+"""
+Work Queue Module
+SQLite lease-based work queue for sharding feed scraping across worker processes or hosts
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+from circuit_breaker import SourceSkipped, DEADLINE_REACHED
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseQueue:
+    """
+    Tasks are leased for `visibility_timeout` seconds. A worker that dies (or stalls)
+    lets its lease expire, and the task is handed to the next worker that asks.
+    Any process that can open the database file can take part (shared disk for several hosts).
+    """
+
+    def __init__(self, path='data/work_queue.db', visibility_timeout=120, max_attempts=3):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    run_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    mark TEXT,
+                    new_mark TEXT,
+                    PRIMARY KEY (run_id, source)
+                )''')
+            # Queues created before high-water marks were sent with the leases
+            columns = {row[1] for row in db.execute('PRAGMA table_info(tasks)')}
+            for column in ('mark', 'new_mark'):
+                if column not in columns:
+                    db.execute(f'ALTER TABLE tasks ADD COLUMN {column} TEXT')
+
+    def _connect(self):
+        # isolation_level=None: explicit BEGIN IMMEDIATE makes leasing atomic across processes
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, run_id, sources, marks=None):
+        """
+        Add {source: url} tasks for a run (already-queued sources are left alone). marks
+        ({source: high-water mark}, or None when marks are off) go out with the leases.
+        """
+        with self._connect() as db:
+            db.executemany('INSERT OR IGNORE INTO tasks (run_id, source, url, mark) VALUES (?, ?, ?, ?)',
+                           [(run_id, source, url, json.dumps(marks.get(source) or {}) if marks is not None else None)
+                            for source, url in sources.items()])
+
+    def lease(self, run_id, worker_id):
+        """Claim the next pending (or expired) task; returns (source, url, mark) or None"""
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('''
+                SELECT source, url, mark FROM tasks
+                WHERE run_id = ? AND attempts < ?
+                  AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+                ORDER BY attempts, source LIMIT 1''', (run_id, self.max_attempts, now)).fetchone()
+            if row is None:
+                db.execute('COMMIT')
+                return None
+            db.execute('''
+                UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE run_id = ? AND source = ?''', (worker_id, now + self.visibility_timeout, run_id, row[0]))
+            db.execute('COMMIT')
+            source, url, mark = row
+            # mark: None when marks are off, else the source's mark ({} before its first scrape)
+            return source, url, json.loads(mark) if mark is not None else None
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        finally:
+            db.close()
+
+    def complete(self, run_id, source, worker_id, articles, mark=None, skipped=None):
+        """
+        Store a task's result (and the source's advanced mark, or the reason it was skipped);
+        ignored if the lease was lost to another worker
+        """
+        with self._connect() as db:
+            updated = db.execute('''
+                UPDATE tasks SET state = 'done', result = ?, new_mark = ?, error = ?, lease_expires = NULL
+                WHERE run_id = ? AND source = ? AND lease_owner = ? AND state = 'leased' ''',
+                (json.dumps(articles, ensure_ascii=False), json.dumps(mark) if mark else None, skipped,
+                 run_id, source, worker_id)).rowcount
+        return updated == 1
+
+    def fail(self, run_id, source, worker_id, error):
+        """Release a task for retry (it becomes 'failed' once max_attempts is reached)"""
+        with self._connect() as db:
+            db.execute('''
+                UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                 error = ?, lease_owner = NULL, lease_expires = NULL
+                WHERE run_id = ? AND source = ? AND lease_owner = ?''',
+                (self.max_attempts, str(error), run_id, source, worker_id))
+
+    def status(self, run_id):
+        """Task counts by state, with expired leases counted as pending"""
+        now = time.time()
+        with self._connect() as db:
+            rows = db.execute('''
+                SELECT CASE WHEN state = 'leased' AND lease_expires < ? AND attempts < ? THEN 'pending'
+                            WHEN state = 'leased' AND lease_expires < ? THEN 'failed'
+                            ELSE state END, COUNT(*)
+                FROM tasks WHERE run_id = ? GROUP BY 1''', (now, self.max_attempts, now, run_id)).fetchall()
+        return dict(rows)
+
+    def results(self, run_id):
+        """{source: articles} for every completed task"""
+        with self._connect() as db:
+            rows = db.execute("SELECT source, result FROM tasks WHERE run_id = ? AND state = 'done' ORDER BY source",
+                              (run_id,)).fetchall()
+        return {source: json.loads(result) for source, result in rows}
+
+    def skipped(self, run_id):
+        """{source: reason} of tasks skipped by their worker, or still unfinished (out of time)"""
+        with self._connect() as db:
+            rows = db.execute("SELECT source, state, error FROM tasks WHERE run_id = ? AND "
+                              "((state = 'done' AND error IS NOT NULL) OR state IN ('pending', 'leased'))",
+                              (run_id,)).fetchall()
+        return {source: error if state == 'done' else DEADLINE_REACHED for source, state, error in rows}
+
+    def marks(self, run_id):
+        """{source: high-water mark} advanced by completed tasks"""
+        with self._connect() as db:
+            rows = db.execute("SELECT source, new_mark FROM tasks WHERE run_id = ? AND state = 'done' "
+                              "AND new_mark IS NOT NULL", (run_id,)).fetchall()
+        return {source: json.loads(mark) for source, mark in rows}
+
+    def latest_run_id(self):
+        """Newest run with unfinished tasks (run IDs sort by time), or None"""
+        with self._connect() as db:
+            row = db.execute("SELECT MAX(run_id) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()
+        return row[0]
+
+    def purge(self, run_id):
+        with self._connect() as db:
+            db.execute('DELETE FROM tasks WHERE run_id = ?', (run_id,))
+
+
+def run_worker(queue_path, run_id, worker_id=None, scraper=None, idle_exit=True):
+    """
+    Lease and scrape sources until the run has nothing left to lease.
+    Usable as a multiprocessing target or via `python main.py --worker RUN_ID`.
+    """
+    from news_scraper import NewsScraper
+    from high_water import HighWaterMarks
+
+    queue = LeaseQueue(queue_path)
+    scraper = scraper or NewsScraper()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    deadline = time.monotonic() + scraper.deadline_seconds
+    scraped = 0
+
+    while True:
+        task = queue.lease(run_id, worker_id)
+        if task is None:
+            status = queue.status(run_id)
+            if idle_exit or not (status.get('pending') or status.get('leased')):
+                break
+            time.sleep(1)  # Others still hold leases that may expire
+            continue
+
+        source, url, mark = task
+        # The lease carries the coordinator's mark for the source; the advanced mark goes back with the result
+        marks = None
+        if mark is not None:
+            marks = HighWaterMarks(state_file=None)
+            if mark:
+                marks.set(source, mark)
+        own_marks, scraper.high_water = scraper.high_water, marks
+        try:
+            content = scraper.fetch_feed(url, source, deadline)
+            articles = [scraper.clean_article(a) for a in scraper.parse_feed(content, source)]
+            if queue.complete(run_id, source, worker_id, articles, marks.get(source) if marks else None):
+                scraped += 1
+                logger.info(f"[{worker_id}] Scraped {len(articles)} articles from {source}")
+            else:
+                logger.warning(f"[{worker_id}] Lease on {source} expired before completion; result dropped")
+        except SourceSkipped as e:
+            # Not worth retrying elsewhere: record an empty result
+            logger.warning(f"[{worker_id}] Skipping {source}: {e.reason}")
+            queue.complete(run_id, source, worker_id, [], skipped=e.reason)
+        except Exception as e:
+            logger.error(f"[{worker_id}] Error scraping {source}: {e}")
+            queue.fail(run_id, source, worker_id, e)
+        finally:
+            scraper.high_water = own_marks
+
+    return scraped
+
+
+def _worker_process(queue_path, run_id):
+    """Entry point of a local worker process started by ShardCoordinator"""
+    from logging_setup import setup_logging, shutdown_logging
+
+    setup_logging()
+    try:
+        run_worker(queue_path, run_id)
+    finally:
+        shutdown_logging()
+
+
+class ShardCoordinator:
+    """Queues a run's sources, starts local workers, waits, then merges and deduplicates"""
+
+    def __init__(self, scraper, queue_path='data/work_queue.db', workers=4, visibility_timeout=120):
+        self.scraper = scraper
+        self.queue_path = queue_path
+        self.workers = workers
+        self.queue = LeaseQueue(queue_path, visibility_timeout)
+
+    def scrape(self, run_id, timeout=None, worker_target=_worker_process, skipped=None):
+        """
+        Scrape all sources with `workers` local processes (0 = only wait for external workers);
+        sources skipped or not finished in time go into the skipped dict ({source: reason}), if given
+        """
+        import multiprocessing
+
+        high_water = self.scraper.high_water
+        self.queue.enqueue(run_id, self.scraper.sources,
+                           {source: high_water.get(source) for source in self.scraper.sources} if high_water else None)
+        # Not fork: this process runs logging and pipeline threads whose locks a forked child would inherit
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        processes = [context.Process(target=worker_target, args=(self.queue_path, run_id),
+                                     name=f'scrape-worker-{i}', daemon=True)
+                     for i in range(self.workers)]
+        for process in processes:
+            process.start()
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            status = self.queue.status(run_id)
+            outstanding = status.get('pending', 0) + status.get('leased', 0)
+            if not outstanding:
+                break
+            if deadline and time.monotonic() > deadline:
+                logger.warning(f"Shard scrape timed out with {outstanding} source(s) outstanding")
+                break
+            if processes and not any(p.is_alive() for p in processes):
+                # All local workers exited while leases are still live elsewhere (or just expiring):
+                # pick up the rest in-process
+                run_worker(self.queue_path, run_id, scraper=self.scraper, idle_exit=False)
+                continue
+            time.sleep(0.2)
+
+        for process in processes:
+            process.join(timeout=5)
+
+        results = self.queue.results(run_id)
+        if skipped is not None:
+            skipped.update(self.queue.skipped(run_id))
+        if high_water is not None:
+            for source, mark in self.queue.marks(run_id).items():
+                high_water.set(source, mark)
+        failed = self.queue.status(run_id).get('failed', 0)
+        if failed:
+            logger.warning(f"{failed} source(s) failed after retries")
+
+        # Merge in the configured source order so dedup keeps the same article as a serial scrape
+        merged = []
+        for source in self.scraper.sources:
+            merged.extend(results.get(source, []))
+        unique_articles = self.scraper.deduplicate(merged)
+        logger.info(f"Total unique articles scraped by {self.workers} worker(s): {len(unique_articles)}")
+        return unique_articles